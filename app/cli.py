@@ -0,0 +1,111 @@
+# app/cli.py
+"""
+Bakım komutları.
+
+    python -m app.cli recalc [--run-id 1 --run-id 2] [--include-running] [--chunk-size 500]
+    python -m app.cli reconcile-dashboard
+    python -m app.cli export --since 2024-01-01 --until 2024-02-01 [--run-id 1] [--model-name m]
+                             [--format csv|ndjson|parquet] [--gzip] -o metrics.csv
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from app.utils.bulk_recalc import RECALC_CHUNK_SIZE, RecalcJob, run_job
+from app.utils.dashboard_summary import reconcile
+from app.utils.export import EXPORT_CHUNK_ROWS, EXPORT_FORMATS, check_format, export_stream, select_run_ids
+
+
+def _print_progress(job: RecalcJob):
+    print(
+        f"[RECALC] {job.processed}/{job.total} run "
+        f"(güncellenen: {job.updated}, atlanan: {job.skipped}, {job.elapsed_s:.1f} sn)",
+        flush=True,
+    )
+
+
+def cmd_recalc(args) -> int:
+    job = RecalcJob(args.run_id, args.include_running, args.region, args.chunk_size)
+    run_job(job, progress=_print_progress)
+
+    if job.status != "done":
+        print("[RECALC] Hata:", job.error, file=sys.stderr)
+        return 1
+    print(f"[RECALC] Bitti: {job.updated} emisyon kaydı güncellendi, {job.skipped} run atlandı.")
+    return 0
+
+
+def cmd_reconcile_dashboard(args) -> int:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db)
+    finally:
+        db.close()
+
+    if drift["summary"] or drift["models"]:
+        print("[DASHBOARD] Özet düzeltildi:", drift)
+    else:
+        print("[DASHBOARD] Özet güncel.")
+    return 0
+
+
+def cmd_export(args) -> int:
+    from app.database import SessionLocal
+
+    try:
+        check_format(args.format, args.gzip)
+    except ValueError as e:
+        print("[EXPORT] Hata:", e, file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    started = time.monotonic()
+    written = 0
+    try:
+        ids = select_run_ids(db, args.run_id, args.since, args.until, args.model_name)
+        print(f"[EXPORT] {len(ids)} run → {args.output}", flush=True)
+        with open(args.output, "wb") as f:
+            for part in export_stream(db, ids, args.format, args.since, args.until, args.gzip, args.chunk_size):
+                f.write(part)
+                written += len(part)
+    finally:
+        db.close()
+
+    print(f"[EXPORT] Bitti: {written / 1e6:.1f} MB, {time.monotonic() - started:.1f} sn")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    recalc = sub.add_parser("recalc", help="Enerji / emisyonu toplu yeniden hesapla")
+    recalc.add_argument("--run-id", type=int, action="append", help="Sadece bu run'lar (tekrarlanabilir)")
+    recalc.add_argument("--include-running", action="store_true", help="Bitmemiş run'ları da hesapla")
+    recalc.add_argument("--region", default="TR")
+    recalc.add_argument("--chunk-size", type=int, default=RECALC_CHUNK_SIZE)
+    recalc.set_defaults(func=cmd_recalc)
+
+    reconcile_cmd = sub.add_parser("reconcile-dashboard", help="Dashboard özetini tablolarla eşitle")
+    reconcile_cmd.set_defaults(func=cmd_reconcile_dashboard)
+
+    export = sub.add_parser("export", help="Metrikleri dosyaya aktar (CSV / NDJSON / Parquet)")
+    export.add_argument("-o", "--output", required=True)
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--gzip", action="store_true", help="Çıktıyı gzip'le (csv / ndjson)")
+    export.add_argument("--run-id", type=int, action="append", help="Sadece bu run'lar (tekrarlanabilir)")
+    export.add_argument("--model-name")
+    export.add_argument("--since", type=datetime.fromisoformat, help="Metrik ts alt sınırı (ISO tarih)")
+    export.add_argument("--until", type=datetime.fromisoformat, help="Metrik ts üst sınırı, hariç (ISO tarih)")
+    export.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_ROWS)
+    export.set_defaults(func=cmd_export)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 from fastapi import (
     FastAPI,
@@ -6,6 +6,7 @@ from fastapi import (
     Depends,
     Form,
     HTTPException,
+    Query,
     status,
 )
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -17,9 +18,22 @@ from sqlalchemy.orm import Session
 
 from app.database import engine, get_db
 from app import models
+from app.migrations import run_migrations
 from app.routes import auth_routes, user_routes, devices, runs, metrics, emissions, dashboard
 from app.routes import monitor  # sistem canlı izleme
-
+from app.utils.ingest_queue import ingest_queue
+
+from app.utils.archive import load_series, start_archiver
+from app.utils.carbon_intensity import get_region, list_regions
+from app.utils.downsample import CHART_FIELDS, downsample_indices, downsample_rows
+from app.utils.emission_calc import cumulative_energy_wh, emission_for_series, series_arrays
+from app.utils.pagination import MAX_PAGE_SIZE, paginate
+from app.utils.rollups import load_chart_rollups, rollup_arrays, rollup_row
+from app.utils.run_detail_cache import run_detail_cache
+from app.utils.principal_cache import LazyUser, principal_cache, subject_id
+from app.utils.dashboard_summary import start_reconciler
+from app.utils.partitions import setup_partitioning
+from app.utils.run_energy import start_finalizer
 from app.utils.auth import (
     verify_api_key,
     create_access_token,
@@ -79,17 +93,28 @@ app.include_router(dashboard.router)
 app.include_router(monitor.router)
 
 # ============================
-# DB tablolarını oluştur
+# DB tablolarını oluştur + migration'lar
 # ============================
 models.Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+setup_partitioning(engine)   # METRICS_PARTITIONING=1 ise (sadece Postgres)
+start_reconciler()           # dashboard özeti için periyodik mutabakat
+start_archiver()             # bitmiş run'ların serisini arşivle (bekleme süresinden sonra)
+start_finalizer()            # stop'tan sonra örnek alan run'ların emisyonunu düzelt
+
+# ============================
+# Kapanışta metrik kuyruğunu boşalt
+# ============================
+@app.on_event("shutdown")
+def flush_ingest_queue():
+    ingest_queue.stop()
 
 # ============================
 # Yardımcı: Cookie'den kullanıcıyı çöz
 # ============================
 def get_current_user_from_cookie(
     request: Request,
-    db: Session = Depends(get_db),
-) -> models.User:
+):
     token = request.cookies.get("session_token")
     if not token:
         raise HTTPException(
@@ -104,14 +129,14 @@ def get_current_user_from_cookie(
             detail="Invalid token",
         )
 
-    user_id = payload.get("sub")
+    user_id = subject_id(payload)
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
         )
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    user = principal_cache.get(user_id)
 
     if not user:
         raise HTTPException(
@@ -124,27 +149,26 @@ def get_current_user_from_cookie(
 # ============================
 # MIDDLEWARE: request.state.current_user
 # ============================
+# Kullanıcıya hiç bakmayan yollar: token bile çözülmez
+PUBLIC_PATH_PREFIXES = ("/static/", "/docs", "/redoc", "/openapi.json")
+
+
 @app.middleware("http")
 async def add_current_user(request: Request, call_next):
     """
     Tüm isteklerde cookie'deki token'i çöz ve
-    request.state.current_user içine kullanıcıyı koy.
-    (Login olmayanlarda None olur.)
+    request.state.current_user içine kullanıcı vekilini (LazyUser) koy.
+    Kullanıcı sadece bir handler / şablon ona baktığında, principal
+    cache üzerinden yüklenir. (Login olmayanlarda None olur.)
     """
     request.state.current_user = None
 
-    token = request.cookies.get("session_token")
-    if token:
-        payload = decode_access_token(token)
-        if payload:
-            user_id = payload.get("sub")
-            db_gen = get_db()
-            db = next(db_gen)
-            try:
-                user = db.query(models.User).filter(models.User.id == int(user_id)).first()
-                request.state.current_user = user
-            finally:
-                db.close()
+    if not request.url.path.startswith(PUBLIC_PATH_PREFIXES):
+        token = request.cookies.get("session_token")
+        if token:
+            user_id = subject_id(decode_access_token(token))
+            if user_id is not None:
+                request.state.current_user = LazyUser(user_id)
 
     response = await call_next(request)
     return response
@@ -265,35 +289,32 @@ def dashboard_page(request: Request):
 # ============================
 # RUN DETAIL PAGE – Login zorunlu
 # ============================
-@app.get("/run/{run_id}", response_class=HTMLResponse)
-def run_detail(
-    run_id: int,
-    request: Request,
-    db: Session = Depends(get_db),
-):
-    # Login kontrolü
-    if not getattr(request.state, "current_user", None):
-        return RedirectResponse("/login", status_code=302)
+# Tablo ve enerji grafiğinde gösterilen en fazla nokta (hesaplar tüm seriyle yapılır)
+RUN_DETAIL_MAX_POINTS = 2000
 
-    # Run kaydı
-    run = db.query(models.Run).filter(models.Run.id == run_id).first()
-    if not run:
-        raise HTTPException(status_code=404, detail="Run bulunamadı")
 
-    # Metrikler (ts'e göre sırala)
-    metrics = (
-        db.query(models.Metric)
-        .filter(models.Metric.run_id == run_id)
-        .order_by(models.Metric.ts.asc())
-        .all()
-    )
-
-    # Emisyon kaydı
-    emission = (
-        db.query(models.Emission)
-        .filter(models.Emission.run_id == run_id)
-        .first()
-    )
+def _run_detail_derived(db: Session, run, emission, max_points: int) -> dict:
+    """
+    Sayfanın metrik serisinden türetilen kısmı: enerji serisi, bölge
+    senaryoları, GreenScore ve render edilmiş metrik tablosu.
+    Örnek sayısı max_points'i aşan run'larda ham seri okunmaz; hepsi
+    özetlerden (bkz. app/utils/rollups.py) hesaplanır.
+    """
+    rolled = load_chart_rollups(db, run.id, max_points)
+    if rolled is None:
+        # Metrikler (ts sırasıyla; bitmiş run'larda arşivden)
+        metrics = load_series(db, run)
+        metrics_total = len(metrics)
+        resolution_s = None
+
+        # Enerji hesapları için (epoch saniye, güç W) dizileri
+        ts_s, power_w = series_arrays(metrics)
+        times = [m.ts.strftime("%H:%M:%S") for m in metrics if m.ts is not None]
+    else:
+        resolution_s, metrics_total, buckets = rolled
+        metrics = [rollup_row(b) for b in buckets]
+        ts_s, power_w = rollup_arrays(buckets, resolution_s)
+        times = [b.bucket_ts.strftime("%H:%M:%S") for b in buckets]
 
     # === BÖLGESEL KARŞILAŞTIRMA SENARYOLARI ===
     region_scenarios = []
@@ -307,36 +328,34 @@ def run_detail(
         if total_energy_kwh > 0:
             tr_factor = total_emission_kg / total_energy_kwh
 
+        actual_code = emission.region_code or "TR"
         region_scenarios.append(
             {
-                "code": emission.region_code or "TR",
-                "label": f"Türkiye (gerçek bölge: {emission.region_code or 'TR'})",
+                "code": actual_code,
+                "label": f"{get_region(actual_code).label} (gerçek bölge: {actual_code})",
                 "factor": tr_factor,
                 "co2_kg": total_emission_kg,
             }
         )
 
-        # 2) Senaryo bölgeleri (aynı enerji, farklı emisyon faktörü)
-        scenario_regions = [
-            {
-                "code": "EU-FR",
-                "label": "AB - Fransa (EU, France)",
-                "factor": 0.06,
-            },
-            {
-                "code": "US-IA",
-                "label": "ABD - Iowa (US, Iowa)",
-                "factor": 0.40,
-            },
-        ]
+        # 2) Senaryo bölgeleri (aynı enerji, farklı bölge): karbon yoğunluğu
+        #    kaydından, her aralık o an geçerli yoğunlukla ağırlıklandırılır
+        for reg in list_regions():
+            if reg.code == actual_code:
+                continue
+
+            series_wh, series_kg = emission_for_series(ts_s, power_w, reg.code)
+            if series_wh > 0:
+                factor = series_kg / series_wh * 1000.0
+            else:
+                factor = reg.at_one(run.started_at.replace(tzinfo=timezone.utc).timestamp() if run.started_at else None)
 
-        for reg in scenario_regions:
             region_scenarios.append(
                 {
-                    "code": reg["code"],
-                    "label": reg["label"],
-                    "factor": reg["factor"],
-                    "co2_kg": total_energy_kwh * reg["factor"],
+                    "code": reg.code,
+                    "label": reg.label,
+                    "factor": factor,
+                    "co2_kg": total_energy_kwh * factor,
                 }
             )
 
@@ -369,54 +388,72 @@ def run_detail(
             greenscore_comment = None
 
     # === Kümülatif enerji serisi (kWh) ===
+    # Emisyon hesabıyla aynı entegrasyon motoru (gerçek zaman farkları)
     energy_series = []
     if metrics:
-        cumulative_kwh = 0.0
-        prev_ts = None
-        raw_series = []
+        cumulative_kwh = cumulative_energy_wh(ts_s, power_w) / 1000.0
 
-        for m in metrics:
-            if not m.ts:
-                continue
+        # Eğer emisyon tablosunda toplam enerji varsa, seriyi ona scale edelim
+        try:
+            if emission and emission.energy_kwh and len(cumulative_kwh) and cumulative_kwh[-1] > 0:
+                cumulative_kwh *= float(emission.energy_kwh) / cumulative_kwh[-1]
+        except Exception:
+            pass
 
-            # İlk nokta: 0 kWh ile başlasın
-            if prev_ts is None:
-                prev_ts = m.ts
-                raw_series.append(
-                    {
-                        "time": m.ts.strftime("%H:%M:%S"),
-                        "kwh": round(cumulative_kwh, 6),
-                    }
-                )
-                continue
+        # Gösterim için seyreltilir (tepeler ve son değer korunur)
+        keep = downsample_indices(ts_s, [cumulative_kwh, power_w], max_points)
+        energy_series = [
+            {"time": times[i], "kwh": kwh}
+            for i, kwh in zip(keep.tolist(), cumulative_kwh[keep].round(6).tolist())
+        ]
 
-            delta_s = (m.ts - prev_ts).total_seconds()
-            if delta_s < 0:
-                delta_s = 0
+    return {
+        "metrics_table_html": templates.get_template("run_detail_metrics.html").render(
+            metrics=downsample_rows(metrics, max_points, CHART_FIELDS),
+            metrics_total=metrics_total,
+            resolution_s=resolution_s,
+        ),
+        "region_scenarios": region_scenarios,
+        "greenscore": greenscore,
+        "greenscore_comment": greenscore_comment,
+        "energy_series": energy_series,
+    }
 
-            power_w = float(m.gpu_power_w or 0.0)
-            incremental = power_w * delta_s / 3_600_000.0  # Wh -> kWh
-            cumulative_kwh += incremental
 
-            raw_series.append(
-                {
-                    "time": m.ts.strftime("%H:%M:%S"),
-                    "kwh": round(cumulative_kwh, 6),
-                }
-            )
-            prev_ts = m.ts
+@app.get("/run/{run_id}", response_class=HTMLResponse)
+def run_detail(
+    run_id: int,
+    request: Request,
+    max_points: int = Query(RUN_DETAIL_MAX_POINTS, ge=10, le=100000),
+    db: Session = Depends(get_db),
+):
+    # Login kontrolü
+    if not getattr(request.state, "current_user", None):
+        return RedirectResponse("/login", status_code=302)
 
-        # Eğer emisyon tablosunda toplam enerji varsa, seriyi ona scale edelim
-        try:
-            if emission and emission.energy_kwh and cumulative_kwh > 0:
-                target_kwh = float(emission.energy_kwh)
-                scale = target_kwh / cumulative_kwh
-                for p in raw_series:
-                    p["kwh"] = round(p["kwh"] * scale, 6)
-        except Exception:
-            pass
+    # Run kaydı
+    run = db.query(models.Run).filter(models.Run.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run bulunamadı")
 
-        energy_series = raw_series
+    # Emisyon kaydı
+    emission = (
+        db.query(models.Emission)
+        .filter(models.Emission.run_id == run_id)
+        .first()
+    )
+
+    # Bitmiş run'ın serisi değişmez: türetilmiş veri (run, emisyon sürümü) ile cache'lenir
+    key = None
+    derived = None
+    if run.ended_at is not None:
+        key = run_detail_cache.key(run.id, emission.version if emission else None, max_points)
+        derived = run_detail_cache.get(key)
+
+    if derived is None:
+        derived = _run_detail_derived(db, run, emission, max_points)
+        if key is not None:
+            run_detail_cache.put(key, derived)
 
     # Template'e gönder
     return templates.TemplateResponse(
@@ -424,58 +461,71 @@ def run_detail(
         {
             "request": request,
             "run": run,
-            "metrics": metrics,
             "emission": emission,
-            "region_scenarios": region_scenarios,
-            "greenscore": greenscore,
-            "greenscore_comment": greenscore_comment,
-            "energy_series": energy_series,
+            **derived,
         },
     )
 
 # ============================
 # LIST PAGES FOR RUNS / DEVICES / USERS – Login zorunlu
 # ============================
+# Liste sayfaları keyset ile sayfalanır (bkz. app/utils/pagination.py)
+LIST_PAGE_SIZE = 50
+
+
+def _page_context(page, cursor: str | None, limit: int, sort: str) -> dict:
+    return {"next_cursor": page.next_cursor, "cursor": cursor, "limit": limit, "sort": sort}
+
+
 @app.get("/runs/list", response_class=HTMLResponse)
 def runs_list(
     request: Request,
+    cursor: str | None = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: str = "-id",
     db: Session = Depends(get_db),
 ):
     if not getattr(request.state, "current_user", None):
         return RedirectResponse("/login", status_code=302)
 
-    runs = db.query(models.Run).all()
+    page = paginate(db, models.Run, runs.RUN_SORTS, sort, limit, cursor)
     return templates.TemplateResponse(
         "runs_list.html",
-        {"request": request, "runs": runs},
+        {"request": request, "runs": page.items, **_page_context(page, cursor, limit, sort)},
     )
 
 
 @app.get("/devices/list", response_class=HTMLResponse)
 def devices_list(
     request: Request,
+    cursor: str | None = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: str = "id",
     db: Session = Depends(get_db),
 ):
     if not getattr(request.state, "current_user", None):
         return RedirectResponse("/login", status_code=302)
 
-    devices = db.query(models.Device).all()
+    page = paginate(db, models.Device, devices.DEVICE_SORTS, sort, limit, cursor)
     return templates.TemplateResponse(
         "devices_list.html",
-        {"request": request, "devices": devices},
+        {"request": request, "devices": page.items, **_page_context(page, cursor, limit, sort)},
     )
 
 
 @app.get("/users/list", response_class=HTMLResponse)
 def users_list(
     request: Request,
+    cursor: str | None = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort: str = "id",
     db: Session = Depends(get_db),
 ):
     if not getattr(request.state, "current_user", None):
         return RedirectResponse("/login", status_code=302)
 
-    users = db.query(models.User).all()
+    page = paginate(db, models.User, user_routes.USER_SORTS, sort, limit, cursor)
     return templates.TemplateResponse(
         "users_list.html",
-        {"request": request, "users": users},
+        {"request": request, "users": page.items, **_page_context(page, cursor, limit, sort)},
     )
@@ -0,0 +1,212 @@
+# app/migrations.py
+"""
+Basit, sıralı şema migration'ları.
+
+create_all sadece eksik tabloları oluşturur; var olan tablolara index / kolon
+eklemez. Bu yüzden şema değişiklikleri burada sürüm numarasıyla tutulur ve
+uygulama açılışında (ya da `python -m app.migrations` ile) bir kez çalıştırılır.
+Uygulanan sürümler schema_migrations tablosunda saklanır.
+
+Her migration (conn, dialect) alan bir fonksiyondur ve AUTOCOMMIT bağlantıda
+çalışır (Postgres'te CREATE INDEX CONCURRENTLY transaction içinde çalışmaz).
+Migration'lar idempotent yazılır (IF NOT EXISTS), yeni kurulumda create_all'un
+oluşturduğu nesnelerle çakışmaz.
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+# ============================
+# Migration'lar
+# ============================
+def _m001_metrics_run_id_ts_index(conn: Connection, dialect: str):
+    """
+    metrics üzerindeki tüm okuma yolları run_id ile filtreleyip ts'e göre sıralar.
+    Postgres'te gpu_power_w INCLUDE edilir: enerji hesabı (ts, güç) index-only
+    scan ile okunur.
+    """
+    if dialect == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_metrics_run_id_ts "
+            "ON metrics (run_id, ts) INCLUDE (gpu_power_w)"
+        ))
+    else:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_metrics_run_id_ts ON metrics (run_id, ts)"
+        ))
+
+
+def _m002_emissions_run_id_index(conn: Connection, dialect: str):
+    concurrently = "CONCURRENTLY " if dialect == "postgresql" else ""
+    conn.execute(text(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS ix_emissions_run_id ON emissions (run_id)"
+    ))
+
+
+def _m003_metric_rollups_backfill(conn: Connection, dialect: str):
+    """metric_rollups tablosunu (create_all oluşturur) var olan metriklerden doldurur."""
+    from sqlalchemy.orm import Session
+
+    from app.utils.rollups import rebuild_rollups
+
+    with Session(bind=conn) as db:
+        rebuild_rollups(db)
+
+
+def _m004_run_energy_backfill(conn: Connection, dialect: str):
+    """Var olan run'lar için run_energy toplamlarını ham seriden üretir."""
+    from sqlalchemy.orm import Session
+
+    from app import models
+    from app.utils.run_energy import rebuild_run_energy
+
+    with Session(bind=conn) as db:
+        for run in db.query(models.Run).order_by(models.Run.id.asc()).all():
+            rebuild_run_energy(db, run)
+
+
+def _m005_emissions_run_id_unique(conn: Connection, dialect: str):
+    """
+    Run başına tek emisyon kaydı: önce eski tekrarlar (en yeni kayıt kalır)
+    silinir, sonra ix_emissions_run_id unique olarak yeniden oluşturulur.
+    """
+    conn.execute(text(
+        "DELETE FROM emissions WHERE run_id IS NOT NULL AND id NOT IN "
+        "(SELECT max(id) FROM emissions WHERE run_id IS NOT NULL GROUP BY run_id)"
+    ))
+    concurrently = "CONCURRENTLY " if dialect == "postgresql" else ""
+    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS ix_emissions_run_id"))
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS ix_emissions_run_id ON emissions (run_id)"
+    ))
+
+
+def _m006_run_energy_emission_kg(conn: Connection, dialect: str):
+    """run_energy'ye zamana bağlı CO2 toplamı kolonu eklenir ve toplamlar yeniden üretilir."""
+    from sqlalchemy import inspect
+
+    columns = {c["name"] for c in inspect(conn).get_columns("run_energy")}
+    if "emission_kg" not in columns:
+        conn.execute(text(
+            "ALTER TABLE run_energy ADD COLUMN emission_kg DOUBLE PRECISION NOT NULL DEFAULT 0"
+        ))
+    _m004_run_energy_backfill(conn, dialect)
+
+
+def _m007_metrics_run_id_id_index(conn: Connection, dialect: str):
+    """Canlı grafik imleci (run_id = ? AND id > since) için."""
+    concurrently = ""
+    if dialect == "postgresql":
+        from app.utils.partitions import is_partitioned
+
+        # Bölümlü tabloda CONCURRENTLY desteklenmez
+        concurrently = "" if is_partitioned(conn) else "CONCURRENTLY "
+    conn.execute(text(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS ix_metrics_run_id_id ON metrics (run_id, id)"
+    ))
+
+
+def _m008_list_sort_indexes(conn: Connection, dialect: str):
+    """Liste uçlarının keyset sıralamaları (bkz. app/utils/pagination.py)."""
+    concurrently = "CONCURRENTLY " if dialect == "postgresql" else ""
+    conn.execute(text(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS ix_runs_started_at_id ON runs (started_at, id)"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS ix_users_name_id ON users (name, id)"
+    ))
+
+
+def _m009_dashboard_summary_backfill(conn: Connection, dialect: str):
+    """dashboard_summary / model_stats tablolarını (create_all oluşturur) var olan verilerden doldurur."""
+    from sqlalchemy.orm import Session
+
+    from app.utils.dashboard_summary import reconcile
+
+    with Session(bind=conn) as db:
+        reconcile(db, snapshot=False)
+
+
+def _m010_emissions_version(conn: Connection, dialect: str):
+    """Run detay cache'inin anahtarı için emisyon sürüm kolonu."""
+    from sqlalchemy import inspect
+
+    columns = {c["name"] for c in inspect(conn).get_columns("emissions")}
+    if "version" not in columns:
+        conn.execute(text(
+            "ALTER TABLE emissions ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+        ))
+
+
+def _m011_run_energy_finalized_count(conn: Connection, dialect: str):
+    """Stop sonrası gelen örnekleri fark etmek için sonlandırma anındaki örnek sayısı."""
+    from sqlalchemy import inspect
+
+    columns = {c["name"] for c in inspect(conn).get_columns("run_energy")}
+    if "finalized_count" not in columns:
+        conn.execute(text("ALTER TABLE run_energy ADD COLUMN finalized_count INTEGER"))
+
+
+MIGRATIONS = [
+    (1, "metrics_run_id_ts_index", _m001_metrics_run_id_ts_index),
+    (2, "emissions_run_id_index", _m002_emissions_run_id_index),
+    (3, "metric_rollups_backfill", _m003_metric_rollups_backfill),
+    (4, "run_energy_backfill", _m004_run_energy_backfill),
+    (5, "emissions_run_id_unique", _m005_emissions_run_id_unique),
+    (6, "run_energy_emission_kg", _m006_run_energy_emission_kg),
+    (7, "metrics_run_id_id_index", _m007_metrics_run_id_id_index),
+    (8, "list_sort_indexes", _m008_list_sort_indexes),
+    (9, "dashboard_summary_backfill", _m009_dashboard_summary_backfill),
+    (10, "emissions_version", _m010_emissions_version),
+    (11, "run_energy_finalized_count", _m011_run_energy_finalized_count),
+]
+
+
+# ============================
+# Çalıştırıcı
+# ============================
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " name VARCHAR NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Uygulanmamış migration'ları sırayla çalıştırır, uygulananların adını döner."""
+    done = applied_versions(engine)
+    dialect = engine.dialect.name
+    applied = []
+
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            migrate(conn, dialect)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.utcnow()},
+            )
+        applied.append(name)
+
+    return applied
+
+
+if __name__ == "__main__":
+    from app.database import engine
+    from app import models
+
+    models.Base.metadata.create_all(bind=engine)
+    names = run_migrations(engine)
+    print("Uygulanan migration'lar:", ", ".join(names) if names else "yok (şema güncel)")
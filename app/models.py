@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, ForeignKey, Index, LargeBinary, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -19,6 +19,11 @@ class User(Base):
 
     runs = relationship("Run", back_populates="user")
 
+    # /users/?sort=name keyset sayfalaması
+    __table_args__ = (
+        Index("ix_users_name_id", "name", "id"),
+    )
+
 
 # ============================
 # DEVICES
@@ -55,6 +60,11 @@ class Run(Base):
     metrics = relationship("Metric", back_populates="run")
     emission = relationship("Emission", back_populates="run", uselist=False)
 
+    # /runs/?sort=started_at keyset sayfalaması
+    __table_args__ = (
+        Index("ix_runs_started_at_id", "started_at", "id"),
+    )
+
 
 # ============================
 # METRICS
@@ -72,6 +82,119 @@ class Metric(Base):
 
     run = relationship("Run", back_populates="metrics")
 
+    # Tüm okuma yolları run_id ile filtreleyip ts'e göre sıralar.
+    # Var olan kurulumlarda app/migrations.py oluşturur.
+    __table_args__ = (
+        Index("ix_metrics_run_id_ts", "run_id", "ts", postgresql_include=["gpu_power_w"]),
+        # /runs/{id}/live imleci (id > since)
+        Index("ix_metrics_run_id_id", "run_id", "id"),
+    )
+
+
+# ============================
+# METRIC ROLLUPS (1s / 10s / 1dk özetler)
+# ============================
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+
+    run_id = Column(Integer, ForeignKey("runs.id"), primary_key=True)
+    resolution_s = Column(Integer, primary_key=True)
+    bucket_ts = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    # Her kolon için min / max / toplam / dolu değer sayısı
+    cpu_util_min = Column(Float)
+    cpu_util_max = Column(Float)
+    cpu_util_sum = Column(Float, nullable=False, default=0.0)
+    cpu_util_n = Column(Integer, nullable=False, default=0)
+
+    gpu_util_min = Column(Float)
+    gpu_util_max = Column(Float)
+    gpu_util_sum = Column(Float, nullable=False, default=0.0)
+    gpu_util_n = Column(Integer, nullable=False, default=0)
+
+    gpu_power_w_min = Column(Float)
+    gpu_power_w_max = Column(Float)
+    gpu_power_w_sum = Column(Float, nullable=False, default=0.0)
+    gpu_power_w_n = Column(Integer, nullable=False, default=0)
+
+    mem_used_mb_min = Column(Float)
+    mem_used_mb_max = Column(Float)
+    mem_used_mb_sum = Column(Float, nullable=False, default=0.0)
+    mem_used_mb_n = Column(Integer, nullable=False, default=0)
+
+
+# ============================
+# RUN ENERGY (ingest sırasında güncellenen enerji toplamları)
+# ============================
+class RunEnergy(Base):
+    __tablename__ = "run_energy"
+
+    run_id = Column(Integer, ForeignKey("runs.id"), primary_key=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    energy_wh = Column(Float, nullable=False, default=0.0)
+    # Aralık başındaki bölge yoğunluğuyla (DEFAULT_REGION) toplanan CO2
+    emission_kg = Column(Float, nullable=False, default=0.0)
+    first_ts = Column(DateTime, nullable=True)
+    last_ts = Column(DateTime, nullable=True)
+    last_power_w = Column(Float, nullable=True)
+    # last_ts'ten eski gelen örnekler; > 0 ise toplam yeniden hesaplanmalı
+    out_of_order = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # Emission yazıldığı andaki sample_count; farklıysa stop'tan sonra örnek gelmiştir
+    finalized_count = Column(Integer, nullable=True)
+
+
+# ============================
+# RUN ARCHIVES (bitmiş run'ların sıkıştırılmış kolon bazlı serisi)
+# ============================
+class RunArchive(Base):
+    __tablename__ = "run_archives"
+
+    run_id = Column(Integer, ForeignKey("runs.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    n_rows = Column(Integer, nullable=False)
+    codec = Column(String, nullable=False)          # "zlib" | "zstd"
+    raw_bytes = Column(Integer, nullable=False)     # sıkıştırılmamış kolon boyutu
+    blob = Column(LargeBinary, nullable=False)
+    raw_purged = Column(Boolean, nullable=False, default=False)
+
+
+# ============================
+# DASHBOARD ÖZETİ (ingest sırasında artımlı güncellenir)
+# ============================
+class DashboardSummary(Base):
+    """
+    Sayaçlar ve CPU / GPU ortalamaları için toplamlar. Yazma çakışmasını
+    azaltmak için birkaç satıra (shard) bölünür; okurken satırlar toplanır.
+    """
+    __tablename__ = "dashboard_summary"
+
+    shard = Column(Integer, primary_key=True)
+    users = Column(Integer, nullable=False, default=0)
+    devices = Column(Integer, nullable=False, default=0)
+    runs = Column(Integer, nullable=False, default=0)
+    metrics = Column(BigInteger, nullable=False, default=0)
+    cpu_util_sum = Column(Float, nullable=False, default=0.0)
+    cpu_util_n = Column(BigInteger, nullable=False, default=0)
+    gpu_util_sum = Column(Float, nullable=False, default=0.0)
+    gpu_util_n = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # Sadece shard 0'da: son mutabakat (reconcile) zamanı
+    reconciled_at = Column(DateTime, nullable=True)
+
+
+class ModelStat(Base):
+    """Model adı bazında run sayısı ve enerji / emisyon toplamları."""
+    __tablename__ = "model_stats"
+
+    model_name = Column(String, primary_key=True)   # model adı yoksa ""
+    run_count = Column(Integer, nullable=False, default=0)
+    emission_count = Column(Integer, nullable=False, default=0)
+    energy_kwh_sum = Column(Float, nullable=False, default=0.0)
+    emission_kg_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 
 # ============================
 # EMISSIONS
@@ -80,11 +203,14 @@ class Emission(Base):
     __tablename__ = "emissions"
 
     id = Column(Integer, primary_key=True, index=True)
-    run_id = Column(Integer, ForeignKey("runs.id"))
+    # Run başına tek kayıt (toplu upsert için unique)
+    run_id = Column(Integer, ForeignKey("runs.id"), index=True, unique=True)
 
     energy_kwh = Column(Float)
     emission_kg = Column(Float)
     region_code = Column(String)
+    # Her yazımda artar; run detay cache anahtarı (bkz. app/utils/run_detail_cache.py)
+    version = Column(Integer, nullable=False, default=0)
 
     # 🔥 Eksik olan ilişki — eklendi!
     run = relationship("Run", back_populates="emission")
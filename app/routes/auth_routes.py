@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models
 from app.utils.auth import verify_api_key, create_access_token, decode_access_token
+from app.utils.principal_cache import principal_cache, subject_id
 
 # Bu router sadece API autentikasyonu için
 router = APIRouter(tags=["Auth"])
@@ -63,7 +64,6 @@ def api_login(data: LoginRequest, db: Session = Depends(get_db)):
 # ============================
 def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
 ):
     """
     Authorization: Bearer <token> içinden kullanıcıyı çözer.
@@ -77,14 +77,15 @@ def get_current_user(
             detail="Geçersiz veya süresi dolmuş token",
         )
 
-    user_id = payload.get("sub")
+    user_id = subject_id(payload)
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Geçersiz token payload",
         )
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    # Kısa TTL'li principal cache (bkz. app/utils/principal_cache.py)
+    user = principal_cache.get(user_id)
 
     if not user:
         raise HTTPException(
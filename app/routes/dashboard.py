@@ -1,73 +1,58 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.database import get_db
 from app import models
+from app.utils.dashboard_summary import read_model_stats, read_summary
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
 @router.get("/stats")
 def dashboard_stats(db: Session = Depends(get_db)):
+    """
+    Sayaçlar ve ortalamalar önceden hesaplanmış özetten okunur (bkz.
+    app/utils/dashboard_summary.py); büyük tablolar taranmaz.
+    freshness: özetin son güncellenme ve son mutabakat zamanı.
+    """
+    summary = read_summary(db)
+    model_stats = read_model_stats(db)
+
     # 1) Temel sayılar
-    total_users = db.query(models.User).count()
-    total_devices = db.query(models.Device).count()
-    total_runs = db.query(models.Run).count()
-    total_metrics = db.query(models.Metric).count()
+    total_users = int(summary["users"])
+    total_devices = int(summary["devices"])
+    total_runs = int(summary["runs"])
+    total_metrics = int(summary["metrics"])
 
     # 2) Toplam emisyon
-    total_emission = (
-        db.query(func.coalesce(func.sum(models.Emission.emission_kg), 0.0))
-        .scalar()
-        or 0.0
-    )
+    total_emission = sum(m.emission_kg_sum for m in model_stats)
 
     # 3) En popüler model
-    popular = (
-        db.query(models.Run.model_name, func.count(models.Run.id).label("cnt"))
-        .group_by(models.Run.model_name)
-        .order_by(func.count(models.Run.id).desc())
-        .first()
-    )
+    popular = max((m for m in model_stats if m.run_count > 0), key=lambda m: m.run_count, default=None)
     popular_model = {
-        "name": popular.model_name if popular else None,
-        "count": int(popular.cnt) if popular else 0,
+        "name": (popular.model_name or None) if popular else None,
+        "count": int(popular.run_count) if popular else 0,
     }
 
     # 4) Model bazında enerji / emisyon istatistikleri
-    model_stats = (
-        db.query(
-            models.Run.model_name.label("model_name"),
-            func.avg(models.Emission.energy_kwh).label("avg_energy"),
-            func.sum(models.Emission.energy_kwh).label("sum_energy"),
-            func.sum(models.Emission.emission_kg).label("sum_emission"),
-        )
-        .join(models.Emission, models.Emission.run_id == models.Run.id)
-        .group_by(models.Run.model_name)
-        .all()
-    )
+    with_emissions = [m for m in model_stats if m.emission_count > 0]
 
-    if model_stats:
+    if with_emissions:
         avg_energy_per_model_kwh = float(
-            sum(row.avg_energy for row in model_stats) / len(model_stats)
+            sum(m.energy_kwh_sum / m.emission_count for m in with_emissions) / len(with_emissions)
         )
-        top_model_row = max(model_stats, key=lambda row: row.sum_emission)
+        top_model_row = max(with_emissions, key=lambda m: m.emission_kg_sum)
         top_emitter_model = {
-            "name": top_model_row.model_name,
-            "total_emission_kg": float(top_model_row.sum_emission),
+            "name": top_model_row.model_name or None,
+            "total_emission_kg": float(top_model_row.emission_kg_sum),
         }
     else:
         avg_energy_per_model_kwh = 0.0
         top_emitter_model = {"name": None, "total_emission_kg": 0.0}
 
     # 5) Global CPU / GPU ortalamaları
-    avg_cpu = (
-        db.query(func.coalesce(func.avg(models.Metric.cpu_util), 0.0)).scalar() or 0.0
-    )
-    avg_gpu = (
-        db.query(func.coalesce(func.avg(models.Metric.gpu_util), 0.0)).scalar() or 0.0
-    )
+    avg_cpu = summary["cpu_util_sum"] / summary["cpu_util_n"] if summary["cpu_util_n"] else 0.0
+    avg_gpu = summary["gpu_util_sum"] / summary["gpu_util_n"] if summary["gpu_util_n"] else 0.0
 
     # 6) Son 5 run
     recent_runs = (
@@ -87,6 +72,12 @@ def dashboard_stats(db: Session = Depends(get_db)):
         for r in recent_runs
     ]
 
+    # Özetin ve model istatistiklerinin en son yazıldığı an
+    updated_at = max(
+        (t for t in [summary["updated_at"], *(m.updated_at for m in model_stats)] if t is not None),
+        default=None,
+    )
+
     # Şimdilik zaman serisi grafikleri boş gönderelim,
     # index.html bunları kullanmıyor
     cpu_time_labels = []
@@ -111,4 +102,8 @@ def dashboard_stats(db: Session = Depends(get_db)):
         "cpu_values": cpu_values,
         "gpu_time_labels": gpu_time_labels,
         "gpu_values": gpu_values,
+        "freshness": {
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "reconciled_at": summary["reconciled_at"].isoformat() if summary["reconciled_at"] else None,
+        },
     }
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_response, paginate, parse_fields
 
 router = APIRouter(prefix="/devices", tags=["Devices"])
 
+DEVICE_SORTS = {
+    "id": (models.Device.id,),
+}
+
 
 @router.post("/", response_model=schemas.DeviceResponse)
 def create_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
@@ -16,5 +21,15 @@ def create_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[schemas.DeviceResponse])
-def get_devices(db: Session = Depends(get_db)):
-    return db.query(models.Device).all()
+def get_devices(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "id",
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """Keyset sayfalı liste (sonraki sayfa: X-Next-Cursor)."""
+    names = parse_fields(fields, schemas.DeviceResponse.model_fields)
+    page = paginate(db, models.Device, DEVICE_SORTS, sort, limit, cursor, names)
+    return page_response(page, names is not None, response)
@@ -1,11 +1,15 @@
 # app/routes/emissions.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app import models
-from app.utils.emission_calc import compute_run_energy_and_emission
+from app.utils.bulk_recalc import RECALC_CHUNK_SIZE, recalc_jobs
+from app.utils.run_detail_cache import run_detail_cache
+from app.utils.run_energy import rebuild_run_energy, upsert_emission
 
 router = APIRouter(
     prefix="/emissions",
@@ -13,12 +17,36 @@ router = APIRouter(
 )
 
 
+@router.post("/recalc", status_code=status.HTTP_202_ACCEPTED)
+def recalc_emissions_bulk(
+    run_ids: Optional[List[int]] = Query(None),
+    include_running: bool = False,
+    chunk_size: int = Query(RECALC_CHUNK_SIZE, ge=1, le=10000),
+):
+    """
+    Toplu yeniden hesap: enerji veritabanında tek SQL geçişiyle (LAG penceresi)
+    hesaplanır, emisyonlar parça parça upsert edilir. İş arka planda çalışır;
+    ilerleme /emissions/recalc/jobs/{job_id} ile izlenir.
+    run_ids verilmezse tüm bitmiş run'lar işlenir.
+    """
+    job = recalc_jobs.start(run_ids=run_ids, include_running=include_running, chunk_size=chunk_size)
+    return job.to_dict()
+
+
+@router.get("/recalc/jobs/{job_id}")
+def recalc_job_status(job_id: str):
+    job = recalc_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 @router.post("/recalc/{run_id}")
 def recalc_emission_for_run(run_id: int, db: Session = Depends(get_db)):
     """
-    İstersen Swagger'dan manuel olarak da bir run için
-    enerji + emisyonu yeniden hesaplayıp kaydedebil.
-    (Asıl hesap zaten stop_run içinde otomatik yapılıyor.)
+    Bakım işlemi: run'ın enerji toplamını ham seriden (bitmiş run'larda
+    arşivden) baştan hesaplar ve emisyon kaydını günceller.
+    (Normalde stop_run ingest sırasında tutulan toplamları kullanır.)
     """
 
     # Run var mı?
@@ -26,45 +54,24 @@ def recalc_emission_for_run(run_id: int, db: Session = Depends(get_db)):
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
 
-    # Metrikleri al
-    metrics = (
-        db.query(models.Metric)
-        .filter(models.Metric.run_id == run_id)
-        .order_by(models.Metric.ts.asc())
-        .all()
-    )
+    # Toplamı metriklerden yeniden hesapla
+    state = rebuild_run_energy(db, run)
 
-    if len(metrics) < 2:
+    if state.sample_count < 2:
+        db.rollback()
         raise HTTPException(
             status_code=400,
             detail="Not enough metrics to compute emission"
         )
 
-    # Enerji + karbon hesabı
-    energy_kwh, emission_kg = compute_run_energy_and_emission(metrics, region="TR")
-
-    # Emission kaydı var mı, varsa güncelle; yoksa oluştur
-    emission = (
-        db.query(models.Emission)
-        .filter(models.Emission.run_id == run_id)
-        .first()
-    )
-
-    if emission is None:
-        emission = models.Emission(
-            run_id=run_id,
-            energy_kwh=energy_kwh,
-            emission_kg=emission_kg,
-            region_code="TR",
-        )
-        db.add(emission)
-    else:
-        emission.energy_kwh = energy_kwh
-        emission.emission_kg = emission_kg
-        emission.region_code = "TR"
+    # Enerji + karbon hesabı (aralık başındaki yoğunlukla), Emission kaydını güncelle / oluştur
+    energy_kwh = state.energy_wh / 1000.0
+    emission_kg = state.emission_kg
+    emission = upsert_emission(db, run_id, energy_kwh, emission_kg, region="TR")
 
     db.commit()
     db.refresh(emission)
+    run_detail_cache.invalidate([run_id])
 
     return {
         "run_id": run_id,
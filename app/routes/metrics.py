@@ -1,9 +1,47 @@
 # app/routes/metrics.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from datetime import datetime
+from typing import Literal
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app import models, schemas
+from app.utils.ingest import (
+    MAX_BATCH_SIZE,
+    MAX_PACKED_BATCH_SIZE,
+    check_sample,
+    sample_ts_bounds,
+    store_metric_columns,
+    store_metrics,
+    to_naive_utc,
+)
+from app.utils import wire_format
+from app.utils.ingest_token import IngestClaims, check_scope, ingest_claims
+from app.utils.pubsub import hub
+from app.utils.run_cache import MISS, run_cache
+from app.utils.archive import load_series, load_series_since
+from app.utils.downsample import CHART_FIELDS, downsample_rows
+from app.utils.fast_json import FastJSONResponse, to_columns
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    page_response,
+    parse_fields,
+)
+from app.utils.series import SERIES_COLUMNS
+from app.utils.ingest_queue import (
+    INGEST_DURABILITY,
+    INGEST_QUEUE_ENABLED,
+    ingest_queue,
+)
 
 router = APIRouter(
     prefix="/metrics",
@@ -15,32 +53,293 @@ router = APIRouter(
 # 1) MANUEL metric oluşturma
 # =============================
 @router.post("/", response_model=schemas.MetricResponse, status_code=status.HTTP_201_CREATED)
-def create_metric(metric_in: schemas.MetricCreate, db: Session = Depends(get_db)):
+async def create_metric(
+    metric_in: schemas.MetricCreate,
+    db: Session = Depends(get_db),
+    claims: IngestClaims | None = Depends(ingest_claims),
+):
+    """
+    Async: kuyruk "flush" modunda yazılmayı beklerken threadpool'da thread
+    tutulmaz. DB işi (cache ıskası, doğrudan INSERT) threadpool'da yapılır.
+    """
+    check_scope(claims, [metric_in.run_id])
 
-    run = db.query(models.Run).filter(models.Run.id == metric_in.run_id).first()
-    if not run:
+    # Run kontrolü cache'ten; çoğu istekte DB'ye gidilmez
+    state = run_cache.get(metric_in.run_id)
+    if state is MISS:
+        states = await run_in_threadpool(run_cache.resolve, db, [metric_in.run_id])
+        state = states.get(metric_in.run_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Run bulunamadı")
+    if not state.is_open:
+        raise HTTPException(status_code=409, detail="Run sonlandırılmış")
+
+    if INGEST_QUEUE_ENABLED:
+        # Flush beklenirken bağlantıyı/transaction'ı açık tutma
+        db.close()
+        return await _enqueue_metric(metric_in)
 
-    metric = models.Metric(**metric_in.model_dump())
-    db.add(metric)
+    return await run_in_threadpool(_insert_metric, db, metric_in)
+
+
+def _insert_metric(db: Session, metric_in: schemas.MetricCreate) -> schemas.MetricResponse:
+    row = metric_in.model_dump()
+    row["ts"] = datetime.utcnow()
+    inserted = store_metrics(db, [row])
     db.commit()
-    db.refresh(metric)
-    return metric
+
+    return schemas.MetricResponse(id=inserted[0].id, ts=inserted[0].ts, **metric_in.model_dump())
+
+
+async def _enqueue_metric(metric_in: schemas.MetricCreate):
+    """
+    Örneği write-behind kuyruğuna koyar.
+    "enqueue" modunda hemen 202, "flush" modunda DB'ye yazılınca 201 döner.
+    Süre dolduğunda örnek hâlâ kuyruktaysa iptal edilir ve 504 döner
+    (yazılmaz, tekrar denenebilir); flush'a alınmışsa 202 döner (yazılacak,
+    tekrar denenmemeli).
+    """
+    row = metric_in.model_dump()
+    row["ts"] = datetime.utcnow()
+
+    # "enqueue" modunda sonucu bekleyen yok; loop verilmez
+    loop = asyncio.get_running_loop() if INGEST_DURABILITY != "enqueue" else None
+    pending = ingest_queue.submit(row, loop)
+    if pending is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Metrik kuyruğu dolu, daha sonra tekrar deneyin",
+        )
+
+    if INGEST_DURABILITY == "enqueue":
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "queued", "run_id": row["run_id"], "ts": row["ts"].isoformat()},
+        )
+
+    if not await pending.wait_async():
+        if pending.cancel():
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Metrik zamanında yazılamadı (yazılmadı, tekrar deneyin)",
+            )
+        if not await pending.wait_async():
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"status": "flushing", "run_id": row["run_id"], "ts": row["ts"].isoformat()},
+            )
+    if pending.error:
+        raise HTTPException(status_code=500, detail="Metrik yazılamadı")
+
+    return schemas.MetricResponse(id=pending.id, ts=pending.ts, **metric_in.model_dump())
+
+
+# =============================
+# 1b) TOPLU metric gönderimi
+# =============================
+@router.post("/batch", response_model=schemas.MetricBatchResponse)
+def create_metrics_batch(
+    batch: schemas.MetricBatchCreate,
+    db: Session = Depends(get_db),
+    claims: IngestClaims | None = Depends(ingest_claims),
+):
+    """
+    Birden fazla örneği (farklı run'lara ait olabilir) tek transaction'da yazar.
+    Run kontrolü tek sorguyla yapılır, satırlar tek bir çok satırlı INSERT ile eklenir.
+    Bilinmeyen veya sonlandırılmış run'a ait örnekler tek tek reddedilir.
+    X-Ingest-Token verilmişse tüm örnekler token'ın run'ına ait olmalı.
+    """
+    if len(batch.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bir istekte en fazla {MAX_BATCH_SIZE} örnek gönderilebilir",
+        )
+    check_scope(claims, (item.run_id for item in batch.items))
+
+    run_states = run_cache.resolve(db, (item.run_id for item in batch.items))
+
+    results: list[schemas.MetricBatchItemResult] = []
+    rows: list[dict] = []
+    row_indexes: list[int] = []
+
+    for index, item in enumerate(batch.items):
+        ts = to_naive_utc(item.ts)
+        error = check_sample(run_states.get(item.run_id), ts)
+        if error:
+            results.append(schemas.MetricBatchItemResult(index=index, accepted=False, error=error))
+            continue
+
+        row = item.model_dump()
+        row["ts"] = ts
+        rows.append(row)
+        row_indexes.append(index)
+
+    inserted = store_metrics(db, rows)
+    db.commit()
+
+    for index, row in zip(row_indexes, inserted):
+        results.append(schemas.MetricBatchItemResult(index=index, accepted=True, id=row.id))
+
+    results.sort(key=lambda r: r.index)
+    return schemas.MetricBatchResponse(
+        accepted=len(inserted),
+        rejected=len(batch.items) - len(inserted),
+        results=results,
+    )
+
+
+# =============================
+# 1c) TOPLU metric gönderimi – ikili (packed) format
+# =============================
+@router.post(
+    "/batch/packed",
+    response_model=schemas.MetricPackedBatchResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {wire_format.CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def create_metrics_batch_packed(
+    request: Request,
+    db: Session = Depends(get_db),
+    claims: IngestClaims | None = Depends(ingest_claims),
+):
+    """
+    Kolon bazlı ikili paket (bkz. app/utils/wire_format.py) kabul eder.
+    Content-Encoding: gzip / zstd desteklenir. Paket NumPy ile çözülür,
+    run kontrolü ve INSERT /metrics/batch ile aynıdır.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type != wire_format.CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type {wire_format.CONTENT_TYPE} olmalı",
+        )
+
+    body = await request.body()
+    try:
+        columns = wire_format.decode_metric_batch(body, request.headers.get("content-encoding"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(columns["ts"]) > MAX_PACKED_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bir pakette en fazla {MAX_PACKED_BATCH_SIZE} örnek gönderilebilir",
+        )
+    if claims is not None:
+        check_scope(claims, np.unique(columns["run_id"]).tolist())
+
+    # DB işi event loop'u bloklamasın
+    return await run_in_threadpool(_insert_packed, db, columns)
+
+
+def _insert_packed(db: Session, columns: dict) -> schemas.MetricPackedBatchResponse:
+    unique_ids, inverse = np.unique(columns["run_id"], return_inverse=True)
+    run_states = run_cache.resolve(db, unique_ids.tolist())
+
+    # Run başına açık mı / en erken kabul edilen ts; satırlara inverse ile yayılır
+    is_open = np.zeros(len(unique_ids), dtype=bool)
+    lower_us = np.full(len(unique_ids), np.iinfo(np.int64).min, dtype=np.int64)
+    upper_us = None
+    for i, run_id in enumerate(unique_ids.tolist()):
+        state = run_states.get(run_id)
+        if state is None or not state.is_open:
+            continue
+        is_open[i] = True
+        lower, upper = sample_ts_bounds(state)
+        upper_us = np.datetime64(upper, "us").astype(np.int64)
+        if lower is not None:
+            lower_us[i] = np.datetime64(lower, "us").astype(np.int64)
+
+    ts = columns["ts"]
+    mask = is_open[inverse] & (ts >= lower_us[inverse])
+    if upper_us is not None:
+        mask &= ts <= upper_us
+
+    inserted = store_metric_columns(db, wire_format.select_columns(columns, mask))
+    db.commit()
+
+    rejected_indexes = np.flatnonzero(~mask).tolist()
+    return schemas.MetricPackedBatchResponse(
+        accepted=len(inserted),
+        rejected=len(rejected_indexes),
+        rejected_indexes=rejected_indexes,
+    )
+
+
+# =============================
+# 1d) Kuyruk istatistikleri
+# =============================
+@router.get("/ingest/stats")
+def ingest_stats():
+    """
+    Write-behind kuyruğunun derinliği, flush süreleri ve düşen örnek sayısı;
+    run cache'inin isabet / ıska sayaçları.
+    """
+    return {**ingest_queue.stats(), "run_cache": run_cache.stats(), "pubsub": hub.stats()}
 
 
 # =============================
 # 2) Bir çalışma (run) için tüm metrikleri getir
 # =============================
+# Metrik sayfaları liste uçlarından büyük olabilir (grafik verisi)
+MAX_METRICS_PAGE_SIZE = 10 * MAX_PAGE_SIZE
+
+
 @router.get("/by_run/{run_id}", response_model=list[schemas.MetricResponse])
-def get_metrics_for_run(run_id: int, db: Session = Depends(get_db)):
+def get_metrics_for_run(
+    run_id: int,
+    response: Response,
+    max_points: int | None = Query(None, ge=3, le=100000),
+    limit: int | None = Query(None, ge=1, le=MAX_METRICS_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    shape: Literal["rows", "columnar"] = "rows",
+    db: Session = Depends(get_db),
+):
+    """
+    Run'ın metrikleri; max_points verilirse tepeler korunarak seyreltilir.
+    limit / cursor verilirse id sırasıyla keyset sayfalanır, (run_id, id)
+    index'i ile okunur (sonraki sayfa: X-Next-Cursor). fields ile sadece
+    istenen kolonlar okunur. shape=columnar ile satır listesi yerine
+    {"id": [...], "ts": [...], ...} döner (bkz. app/utils/fast_json.py).
+    Ham satırları okur; grafikler için özetlerden okuyan /runs/{id}/series
+    kullanılmalı.
+    """
+    run = db.query(models.Run).filter(models.Run.id == run_id).first()
+    if not run:
+        return FastJSONResponse({}) if shape == "columnar" else []
 
-    metrics = (
-        db.query(models.Metric)
-        .filter(models.Metric.run_id == run_id)
-        .order_by(models.Metric.ts.asc())
-        .all()
-    )
-    return metrics
+    names = parse_fields(fields, schemas.MetricResponse.model_fields)
+    columns = SERIES_COLUMNS
+    if names is not None:
+        # id (imleç) ve ts (sıra / seyreltme) her zaman okunur
+        columns = [c for c in SERIES_COLUMNS if c.key in {"id", "ts", *names}]
+
+    if limit is None and cursor is None:
+        rows = load_series(db, run, columns)
+        next_cursor = None
+    else:
+        since = decode_cursor(cursor, "id", [models.Metric.id])[0] if cursor else 0
+        rows, has_more = load_series_since(db, run, columns, since, limit or MAX_PAGE_SIZE)
+        next_cursor = encode_cursor("id", [rows[-1].id]) if has_more else None
+
+    picked = [c.key for c in columns if c.key in CHART_FIELDS]
+    rows = downsample_rows(rows, max_points, picked)
+
+    if shape == "columnar":
+        data = to_columns(rows, [c.key for c in columns])
+        if names is not None:
+            data = {f: data[f] for f in names}
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return FastJSONResponse(data, headers=headers)
+
+    if names is not None:
+        rows = [{f: getattr(r, f) for f in names} for r in rows]
+    return page_response(Page(rows, next_cursor), names is not None, response)
 
 
 # =============================
@@ -68,7 +367,7 @@ def collect_metrics(run_id: int):
                 break
 
             # Sahte metrik üretimi (gerçek zamanlı)
-            metric = models.Metric(
+            metric = dict(
                 run_id=run_id,
                 ts=datetime.utcnow(),
                 cpu_util=random.randint(10, 95),
@@ -77,7 +376,7 @@ def collect_metrics(run_id: int):
                 mem_used_mb=random.uniform(3000, 8000)
             )
 
-            db.add(metric)
+            store_metrics(db, [metric])
             db.commit()
 
             time.sleep(3)
@@ -1,29 +1,44 @@
 # app/routes/monitor.py
 from __future__ import annotations
 
+import asyncio
+import os
 import threading
 import time
 import subprocess
 from typing import Optional, Dict, Any
 
 import psutil
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from fastapi.templating import Jinja2Templates
 
+from app.utils.carbon_intensity import current_intensity
+from app.utils.emission_calc import BASE_W, CPU_TDP_W, RAM_W_PER_GB
+from app.utils.pubsub import OVERFLOW, hub
+
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 # -----------------------------
 # Ayarlar (istersen sonra config'e alırız)
 # -----------------------------
-GRID_KG_PER_KWH = 0.42          # TR için kaba değer (seninkiyle aynı)
-BASE_W = 8.0                    # laptop boşta taban güç (yaklaşık)
-CPU_TDP_W = 45.0                # laptop CPU için yaklaşık (istersen modele göre düzeltiriz)
-RAM_W_PER_GB = 0.35             # yaklaşık
+GRID_REGION = "TR"              # karbon yoğunluğu: app/utils/carbon_intensity.py
+# BASE_W / CPU_TDP_W / RAM_W_PER_GB: emission_calc ile ortak güç bileşenleri
 
 SAMPLE_PERIOD_S = 1.0           # GERÇEK 1 saniyelik ölçüm döngüsü
 
+# -----------------------------
+# WebSocket yayını (/monitor/ws)
+# -----------------------------
+MONITOR_TOPIC = "monitor"
+# Bağlanan istemciye gönderilen son örnek sayısı (grafiği doldurmak için)
+MONITOR_WS_BACKFILL = int(os.getenv("MONITOR_WS_BACKFILL", "60"))
+# Bu süre içinde gönderilemeyen (yavaş / kopmuş) soket kapatılır
+MONITOR_WS_SEND_TIMEOUT_S = float(os.getenv("MONITOR_WS_SEND_TIMEOUT_S", "5"))
+# Sampler durursa bu süre sonunda bağlantı canlı mı diye ping gönderilir
+MONITOR_WS_IDLE_S = float(os.getenv("MONITOR_WS_IDLE_S", "15"))
+
 # -----------------------------
 # NVML (öncelikli kaynak)
 # -----------------------------
@@ -170,16 +185,17 @@ _state: Dict[str, Any] = {
     "energy_kwh_gpu": 0.0,
     "co2_total_kg": 0.0,
     "co2_gpu_kg": 0.0,
-    "grid_kg_per_kwh": GRID_KG_PER_KWH,
+    "grid_kg_per_kwh": current_intensity(GRID_REGION),
 
     "nvml_status": {"ok": _NVML_OK, "err": _NVML_ERR},
 }
 
 _last_mono = time.monotonic()
+_seq = 0                        # yayınlanan örnek sırası (WebSocket olay id'si)
 
 
 def _sampler_loop():
-    global _last_mono
+    global _last_mono, _seq
 
     # cpu_percent'i “ısındır”
     psutil.cpu_percent(interval=None)
@@ -232,6 +248,9 @@ def _sampler_loop():
         energy_kwh_total_add = (power_total * dt) / 3600.0 / 1000.0
         energy_kwh_gpu_add   = (gpu_power_w * dt)   / 3600.0 / 1000.0
 
+        # O an geçerli şebeke yoğunluğu (saatlik seri varsa saate göre değişir)
+        grid_kg_per_kwh = current_intensity(GRID_REGION)
+
         with _lock:
             _state["ts"]      = time.time()
             _state["dt_s"]    = round(dt, 3)
@@ -254,12 +273,20 @@ def _sampler_loop():
             _state["energy_kwh_total"] += energy_kwh_total_add
             _state["energy_kwh_gpu"]   += energy_kwh_gpu_add
 
-            _state["co2_total_kg"] = _state["energy_kwh_total"] * GRID_KG_PER_KWH
-            _state["co2_gpu_kg"]   = _state["energy_kwh_gpu"]   * GRID_KG_PER_KWH
+            _state["co2_total_kg"] += energy_kwh_total_add * grid_kg_per_kwh
+            _state["co2_gpu_kg"]   += energy_kwh_gpu_add   * grid_kg_per_kwh
 
-            _state["grid_kg_per_kwh"] = GRID_KG_PER_KWH
+            _state["grid_kg_per_kwh"] = grid_kg_per_kwh
             _state["nvml_status"]     = nvml_status
 
+            _seq += 1
+            _state["seq"] = _seq
+            sample = dict(_state)
+
+        # Örnek bir kez yayınlanır; publish bloklamaz (yavaş soketler
+        # kendi kuyruklarında taşar, sampler beklemez)
+        hub.publish(MONITOR_TOPIC, "sample", sample, event_id=_seq)
+
         # Tam 1 saniyeye yakınla
         elapsed = time.monotonic() - t0
         sleep_s = max(0.0, SAMPLE_PERIOD_S - elapsed)
@@ -278,10 +305,52 @@ def monitor_page(request: Request):
 
 @router.get("/monitor/live")
 def monitor_live():
+    """Polling istemcileri için (WebSocket desteklemeyenler)."""
     with _lock:
         return JSONResponse(dict(_state))
 
 
+async def _send(websocket: WebSocket, text: str):
+    await asyncio.wait_for(websocket.send_text(text), MONITOR_WS_SEND_TIMEOUT_S)
+
+
+@router.websocket("/monitor/ws")
+async def monitor_ws(websocket: WebSocket):
+    """
+    Sampler'ın her örneğini JSON metni olarak iter. Bağlanınca son
+    MONITOR_WS_BACKFILL örnek gönderilir. Kuyruğu taşan ya da gönderimi
+    MONITOR_WS_SEND_TIMEOUT_S içinde bitmeyen soket kapatılır; istemci
+    yeniden bağlanır.
+    """
+    await websocket.accept()
+
+    # Önce abone ol, sonra geçmişi al: arada yayınlanan örnek kaçmaz
+    sub, _, _ = hub.subscribe(MONITOR_TOPIC)
+    last_seq = 0
+    try:
+        for event in hub.recent(MONITOR_TOPIC, MONITOR_WS_BACKFILL):
+            await _send(websocket, event.data)
+            last_seq = event.id
+
+        while True:
+            event = await sub.get(timeout=MONITOR_WS_IDLE_S)
+            if event is None:
+                await _send(websocket, '{"type": "ping"}')
+                continue
+            if event is OVERFLOW:
+                await websocket.close(code=1013)    # try again later
+                return
+            if event.id <= last_seq:
+                continue
+
+            await _send(websocket, event.data)
+            last_seq = event.id
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    finally:
+        hub.unsubscribe(sub)
+
+
 @router.post("/monitor/reset")
 def monitor_reset():
     """
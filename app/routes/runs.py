@@ -1,14 +1,31 @@
+import json
 import threading
 from datetime import datetime
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app import models, schemas
 from app.routes.metrics import collect_metrics
-from app.utils.emission_calc import compute_run_energy_and_emission
+from app.utils.archive import archive_stats, load_series_since
+from app.utils.downsample import CHART_FIELDS, downsample_rows
+from app.utils.export import MEDIA_TYPES, check_format, export_filename, export_stream, select_run_ids
+from app.utils.fast_json import FastJSONResponse, to_columns
+from app.utils.ingest import run_topic
+from app.utils.ingest_queue import ingest_queue
+from app.utils.auth import get_current_user
+from app.utils.ingest_token import INGEST_TOKEN_HEADER, can_renew, check_scope, ingest_claims, mint_ingest_token
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_response, paginate, parse_fields
+from app.utils.pubsub import OVERFLOW, Event, hub
+from app.utils.rollups import load_rollup_series, pick_resolution, rollup_point
+from app.utils.run_cache import run_cache
+from app.utils.run_energy import finalize_run_energy
+from app.utils.series import LIVE_COLUMNS
 
 
 def build_auto_notes(model_name: str, user_id: int | None, device_id: int | None, region_code: str | None):
@@ -23,6 +40,22 @@ def build_auto_notes(model_name: str, user_id: int | None, device_id: int | None
     return " | ".join(parts)
 
 
+# Liste sıralamaları: her biri bir index ile karşılanır (son kolon benzersiz)
+RUN_SORTS = {
+    "id": (models.Run.id,),
+    "started_at": (models.Run.started_at, models.Run.id),
+}
+
+# /live cevabındaki en fazla nokta sayısı (seri uzunluğundan bağımsız)
+LIVE_MAX_POINTS = 1000
+
+# /live cevabındaki alan adları (LIVE_COLUMNS sırasıyla)
+LIVE_KEYS = {"ts": "time", "cpu_util": "cpu", "gpu_util": "gpu", "mem_used_mb": "ram", "gpu_power_w": "power"}
+
+# SSE bağlantısında olay yoksa bu aralıkla yorum satırı (heartbeat) gönderilir
+SSE_HEARTBEAT_S = 15.0
+
+
 router = APIRouter(
     prefix="/runs",
     tags=["Runs"]
@@ -33,9 +66,72 @@ router = APIRouter(
 # 1) Çalışma Listesi
 # ============================
 @router.get("/", response_model=List[schemas.RunResponse])
-def list_runs(db: Session = Depends(get_db)):
-    runs = db.query(models.Run).order_by(models.Run.id.asc()).all()
-    return runs
+def list_runs(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "id",
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Keyset sayfalı liste. Sonraki sayfa için X-Next-Cursor başlığındaki
+    değer cursor olarak gönderilir. sort: id | started_at (azalan için -),
+    fields: virgülle ayrılmış alan listesi.
+    """
+    names = parse_fields(fields, schemas.RunResponse.model_fields)
+    page = paginate(db, models.Run, RUN_SORTS, sort, limit, cursor, names)
+    return page_response(page, names is not None, response)
+
+
+# ============================
+# 1b) Dışa aktarım (CSV / NDJSON / Parquet)
+# ============================
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+
+
+def _export_response(run_ids: list[int], fmt: str, since, until, gzip: bool, name: str):
+    """
+    Satırları akış halinde gönderir (bkz. app/utils/export.py). Akış istek
+    bittikten sonra da sürdüğü için kendi oturumunu açar.
+    """
+    try:
+        check_format(fmt, gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def body():
+        db = SessionLocal()
+        try:
+            yield from export_stream(db, run_ids, fmt, since, until, gzip)
+        finally:
+            db.close()
+
+    filename = export_filename(name, fmt, gzip)
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export")
+def export_runs(
+    run_id: List[int] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    model_name: str | None = None,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    gzip: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Birden fazla run'ın metrikleri tek dosyada: run_id (tekrarlanabilir),
+    model_name ve since / until (metrik ts aralığı, until hariç) ile
+    süzülür; run id sırasıyla, her run içinde ts sırasıyla akar.
+    """
+    ids = select_run_ids(db, run_id, since, until, model_name)
+    return _export_response(ids, fmt, since, until, gzip, "metrics")
 
 
 # ============================
@@ -76,13 +172,65 @@ def create_run(data: dict, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(run)
 
-    return {"id": run.id, "model_name": run.model_name, "notes": run.notes}
+    # Ingest cache'i: yeni run'a gelen ilk örnek DB'ye gitmeden kabul edilsin
+    run_cache.mark_open(run.id, run.started_at)
+
+    # Metrik gönderimi için run'a özel token (bkz. app/utils/ingest_token.py)
+    token, expires_at = mint_ingest_token(run.id, run.device_id)
+
+    return {
+        "id": run.id,
+        "model_name": run.model_name,
+        "notes": run.notes,
+        "ingest_token": token,
+        "ingest_token_expires_at": expires_at,
+    }
+
+
+# ============================
+# 2b) Ingest token yenile
+# ============================
+@router.post("/{run_id}/ingest-token")
+def renew_ingest_token(run_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Aynı kapsamda yeni ingest token'ı verir. Süresi dolmamış X-Ingest-Token
+    ile (uzun run'larda istemci süre bitmeden çağırır; zincir
+    INGEST_TOKEN_MAX_LIFETIME_S ile sınırlı) ya da token yoksa / süresi
+    dolmuşsa / zincir sınırı aşıldıysa kullanıcı oturumuyla (Authorization:
+    Bearer; ör. token süresinden uzun bir kesintiden sonra). Run açık olmalı.
+    """
+    claims = None
+    if request.headers.get(INGEST_TOKEN_HEADER):
+        try:
+            claims = ingest_claims(request)
+        except HTTPException:
+            claims = None   # geçersiz / süresi dolmuş: kullanıcı kimliğine düşülür
+        if claims is not None and not can_renew(claims):
+            claims = None   # zincir ömrü doldu: yenileme kullanıcı kimliği ister
+
+    if claims is not None:
+        check_scope(claims, [run_id])
+    else:
+        get_current_user(request.headers.get("authorization"))
+
+    state = run_cache.resolve(db, [run_id]).get(run_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Run bulunamadı")
+    if not state.is_open:
+        raise HTTPException(status_code=409, detail="Run sonlandırılmış")
+
+    if claims is not None:
+        token, expires_at = mint_ingest_token(run_id, claims.device_id, issued_at=claims.issued_at)
+    else:
+        token, expires_at = mint_ingest_token(run_id, db.get(models.Run, run_id).device_id)
+    return {"ingest_token": token, "ingest_token_expires_at": expires_at}
 
 
 # ============================
 # 3) Belirli Çalışmayı Getir
 # ============================
-@router.get("/{run_id}", response_model=schemas.RunResponse)
+# :int → /runs/list (HTML sayfası, main.py) bu route'a takılmaz
+@router.get("/{run_id:int}", response_model=schemas.RunResponse)
 def get_run(run_id: int, db: Session = Depends(get_db)):
     run = db.query(models.Run).filter(models.Run.id == run_id).first()
     if not run:
@@ -108,25 +256,23 @@ def stop_run(run_id: int, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(run)
 
-    # === ENERJİ & EMİSYON HESAPLAMA ===
-    metrics = (
-        db.query(models.Metric)
-        .filter(models.Metric.run_id == run_id)
-        .order_by(models.Metric.ts.asc())
-        .all()
-    )
+    # Bundan sonra gelen örnekler DB'ye gitmeden reddedilsin
+    run_cache.mark_ended(run_id, run.started_at)
+    # Canlı akıştaki izleyicilere haber ver
+    hub.publish(run_topic(run_id), "status", {"status": "finished"})
 
-    energy_kwh, emission_kg = compute_run_energy_and_emission(metrics, region="TR")
+    # Stop'tan önce kuyruğa kabul edilmiş örnekler toplama girsin
+    if not ingest_queue.barrier():
+        print(f"[RUNS] run {run_id}: ingest kuyruğu zamanında boşalmadı; emisyon sonradan düzeltilecek")
 
-    emission_record = models.Emission(
-        run_id=run_id,
-        energy_kwh=energy_kwh,
-        emission_kg=emission_kg,
-        region_code="TR",
-    )
-    db.add(emission_record)
+    # === ENERJİ & EMİSYON HESAPLAMA ===
+    # Ingest sırasında tutulan toplamlardan; metrikler taranmaz. Başka
+    # worker'lardan geç gelen örnekler için bkz. run_energy.refinalize_late_runs
+    finalize_run_energy(db, run, region="TR")
     db.commit()
 
+    # Kolon bazlı arşiv burada yapılmaz; arka plan thread'i geç gelen
+    # örnekler için bekleme süresinden sonra paketler (app/utils/archive.py)
     return run
 
 
@@ -134,24 +280,46 @@ def stop_run(run_id: int, db: Session = Depends(get_db)):
 # 5) CANLI METRİK ENDPOINTİ
 # ============================
 @router.get("/{run_id}/live")
-def get_live_metrics(run_id: int, db: Session = Depends(get_db)):
-
-    metrics = (
-        db.query(models.Metric)
-        .filter(models.Metric.run_id == run_id)
-        .order_by(models.Metric.ts.asc())
-        .all()
-    )
-
+def get_live_metrics(
+    run_id: int,
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(LIVE_MAX_POINTS, ge=1, le=5000),
+    max_points: int | None = Query(None, ge=3, le=5000),
+    shape: Literal["rows", "columnar"] = "rows",
+    db: Session = Depends(get_db),
+):
+    """
+    since (son alınan metrik id'si) verilirse sadece ondan sonra yazılan
+    noktalar, verilmezse son limit nokta döner. Bir sonraki istekte
+    cursor değeri since olarak gönderilir; has_more ise hemen tekrar istenir.
+    max_points verilirse sayfa tepeleri koruyarak seyreltilir (son nokta,
+    dolayısıyla cursor değişmez).
+    shape=columnar ile metrics satır listesi yerine kolon başına bir liste
+    olur ({"id": [...], "time": [...], "cpu": [...], ...}).
+    """
     run = db.query(models.Run).filter(models.Run.id == run_id).first()
 
     if not run:
         raise HTTPException(status_code=404, detail="Run bulunamadı")
 
+    metrics, has_more = load_series_since(db, run, LIVE_COLUMNS, since, limit)
+    metrics = downsample_rows(metrics, max_points, CHART_FIELDS)
+
+    if shape == "columnar":
+        return FastJSONResponse({
+            "status": "running" if run.ended_at is None else "finished",
+            "cursor": metrics[-1].id if metrics else since,
+            "has_more": has_more,
+            "metrics": to_columns(metrics, [c.key for c in LIVE_COLUMNS], LIVE_KEYS),
+        })
+
     return {
         "status": "running" if run.ended_at is None else "finished",
+        "cursor": metrics[-1].id if metrics else since,
+        "has_more": has_more,
         "metrics": [
             {
+                "id": m.id,
                 "time": m.ts.isoformat(),
                 "cpu": m.cpu_util,
                 "gpu": m.gpu_util,
@@ -161,3 +329,200 @@ def get_live_metrics(run_id: int, db: Session = Depends(get_db)):
             for m in metrics
         ]
     }
+
+
+# ============================
+# 5a) Run metriklerini dışa aktar
+# ============================
+@router.get("/{run_id}/export")
+def export_run(
+    run_id: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    gzip: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Run'ın tüm metrikleri ts sırasıyla; bellek kullanımı run boyutundan bağımsız."""
+    if db.get(models.Run, run_id) is None:
+        raise HTTPException(status_code=404, detail="Run bulunamadı")
+    return _export_response([run_id], fmt, since, until, gzip, f"run_{run_id}_metrics")
+
+
+# ============================
+# 5b) CANLI METRİK AKIŞI (Server-Sent Events)
+# ============================
+def _load_run_detached(run_id: int):
+    db = SessionLocal()
+    try:
+        run = db.query(models.Run).filter(models.Run.id == run_id).first()
+        if run is not None:
+            db.expunge(run)
+        return run
+    finally:
+        db.close()
+
+
+def _load_points_since(run, since: int | None):
+    db = SessionLocal()
+    try:
+        rows, has_more = load_series_since(db, run, LIVE_COLUMNS, since, LIVE_MAX_POINTS)
+    finally:
+        db.close()
+    points = [
+        {
+            "id": m.id,
+            "time": m.ts.isoformat(),
+            "cpu": m.cpu_util,
+            "gpu": m.gpu_util,
+            "ram": m.mem_used_mb,
+            "power": m.gpu_power_w,
+        }
+        for m in rows
+    ]
+    return points, has_more
+
+
+def _parse_event_id(value: str | None) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@router.get("/{run_id}/stream")
+async def stream_run_metrics(
+    run_id: int,
+    request: Request,
+    since: int | None = Query(None, ge=0),
+):
+    """
+    Run'a yeni yazılan metrikleri SSE ile iter ("metrics" olayları; olay id'si
+    = son metrik id'si). Yeniden bağlanan tarayıcının Last-Event-ID başlığı
+    (ya da since) kullanılarak kaçırılan noktalar önce gönderilir.
+    Run sonlandırılınca "status" olayı gelir.
+
+    Noktalar yayın merkezinden (app/utils/pubsub.py) gelir; izleyici sayısı
+    DB yükünü artırmaz. Sadece halka tamponda bulunmayan eski bir imleçle
+    bağlanan istemci için bir kez DB'den tamamlama yapılır.
+    """
+    run = await run_in_threadpool(_load_run_detached, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run bulunamadı")
+
+    last_id = _parse_event_id(request.headers.get("last-event-id"))
+    if last_id is None:
+        last_id = since
+
+    async def events():
+        sub, backlog, complete = hub.subscribe(run_topic(run_id), last_id)
+        cursor = last_id
+        try:
+            yield "retry: 3000\n\n"
+
+            # Halka tamponda olmayan eksikler DB'den (sayfa sayfa)
+            if not complete:
+                has_more = True
+                while has_more:
+                    points, has_more = await run_in_threadpool(_load_points_since, run, cursor)
+                    if not points:
+                        break
+                    cursor = points[-1]["id"]
+                    yield Event(cursor, "metrics", json.dumps({"points": points})).to_sse()
+
+            for event in backlog:
+                if cursor is None or event.id > cursor:
+                    yield event.to_sse()
+
+            state = "running" if run.ended_at is None else "finished"
+            yield Event(None, "status", json.dumps({"status": state})).to_sse()
+            if run.ended_at is not None:
+                return
+
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                event = await sub.get(SSE_HEARTBEAT_S)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                if event is OVERFLOW:
+                    # Yavaş istemci: bağlantı kapanır, tarayıcı Last-Event-ID ile döner
+                    yield event.to_sse()
+                    break
+                if event.id is not None and cursor is not None and event.id <= cursor:
+                    continue
+
+                yield event.to_sse()
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================
+# 6) ÖZET SERİ (rollup) ENDPOINTİ
+# ============================
+@router.get("/{run_id}/series")
+def get_run_series(
+    run_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_points: int = Query(500, ge=10, le=10000),
+    db: Session = Depends(get_db),
+):
+    """
+    Zaman aralığını max_points içinde karşılayan en ince çözünürlükteki
+    (1s / 10s / 60s) özetleri döner; ham metrics tablosu okunmaz.
+    Her nokta için cpu / gpu / power / ram ortalama, min ve max içerir.
+    En kaba çözünürlük bile max_points'i aşarsa özetler max değerlerinin
+    tepeleri korunarak seyreltilir. cursor, run'ın son metrik id'sidir:
+    canlı grafik geçmişi buradan yükleyip /live ya da /stream'e
+    since=cursor ile devam eder.
+    """
+    run = db.query(models.Run).filter(models.Run.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run bulunamadı")
+
+    start = start or run.started_at
+    end = end or run.ended_at or datetime.utcnow()
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end, start'tan sonra olmalı")
+
+    resolution_s = pick_resolution(start, end, max_points)
+    rows = load_rollup_series(db, run_id, resolution_s, start, end)
+
+    cursor = (
+        db.query(func.max(models.Metric.id))
+        .filter(models.Metric.run_id == run_id)
+        .scalar()
+    )
+
+    return {
+        "status": "running" if run.ended_at is None else "finished",
+        "resolution_s": resolution_s,
+        "cursor": cursor,
+        "points": downsample_rows(
+            [rollup_point(r) for r in rows],
+            max_points,
+            ("cpu_max", "gpu_max", "power_max", "ram_max"),
+            x_field="time",
+        ),
+    }
+
+
+# ============================
+# 7) ARŞİV BİLGİSİ
+# ============================
+@router.get("/{run_id}/archive")
+def get_run_archive(run_id: int, db: Session = Depends(get_db)):
+    """Bitmiş run'ın arşiv boyutu ve sıkıştırma oranı."""
+    archive = db.get(models.RunArchive, run_id)
+    if archive is None:
+        raise HTTPException(status_code=404, detail="Run arşivi bulunamadı")
+    return archive_stats(archive)
@@ -1,15 +1,21 @@
 # app/routes/user_routes.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app import models
 from app.schemas import UserCreate, UserResponse
 from app.utils.auth import hash_api_key
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_response, paginate, parse_fields
 from app.routes.auth_routes import get_current_user
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+USER_SORTS = {
+    "id": (models.User.id,),
+    "name": (models.User.name, models.User.id),
+}
+
 
 @router.post("/", response_model=UserResponse)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -34,12 +40,19 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=list[UserResponse])
 def get_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "id",
+    fields: str | None = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """
-    Tüm kullanıcıları döner.
+    Kullanıcıları keyset sayfalı döner (sonraki sayfa: X-Next-Cursor).
     API tarafında Bearer token ile korunuyor.
     (Swagger'da Authorize butonuna token verip çağırabilirsin.)
     """
-    return db.query(models.User).all()
+    names = parse_fields(fields, UserResponse.model_fields)
+    page = paginate(db, models.User, USER_SORTS, sort, limit, cursor, names)
+    return page_response(page, names is not None, response)
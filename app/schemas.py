@@ -90,6 +90,35 @@ class MetricResponse(MetricBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MetricBatchItem(MetricBase):
+    """Toplu gönderimde tek örnek; ts istemci tarafında ölçüldüğü an."""
+    ts: datetime | None = None
+
+
+class MetricBatchCreate(BaseModel):
+    items: list[MetricBatchItem]
+
+
+class MetricBatchItemResult(BaseModel):
+    index: int
+    accepted: bool
+    id: int | None = None
+    error: str | None = None
+
+
+class MetricBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: list[MetricBatchItemResult]
+
+
+class MetricPackedBatchResponse(BaseModel):
+    """İkili paket cevabı; binlerce satır için satır satır sonuç dönmez."""
+    accepted: int
+    rejected: int
+    rejected_indexes: list[int]
+
+
 # =========================
 # EMISSION SCHEMAS
 # =========================
@@ -42,20 +42,19 @@ function startCharts(runId) {
     });
 
     async function fetchMetrics() {
-        const url = `/metrics/by_run/${runId}`;
-console.log("FETCH URL:", url);
-const res = await fetch(url);
-
+        // Sadece son nokta gerekiyor: tüm seriyi (by_run) okumak yerine live?limit=1
+        const url = `/runs/${runId}/live?limit=1`;
+        const res = await fetch(url);
 
         const json = await res.json();
 
-        if (!json || !json.length) return;
+        if (!json || !json.metrics || !json.metrics.length) return;
 
-        const latest = json[json.length - 1];
+        const latest = json.metrics[json.metrics.length - 1];
 
-        cpuData.push(latest.cpu_util);
-        gpuData.push(latest.gpu_util);
-        labels.push(new Date(latest.ts).toLocaleTimeString());
+        cpuData.push(latest.cpu);
+        gpuData.push(latest.gpu);
+        labels.push(new Date(latest.time).toLocaleTimeString());
 
         if (labels.length > 20) { 
             cpuData.shift();
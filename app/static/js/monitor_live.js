@@ -1,6 +1,7 @@
 (() => {
   let cpuChart=null, gpuChart=null, ramChart=null, powerChart=null;
   let inFlight=false;
+  let polling=false;
 
   function createChart(canvasId, label, color, yMax=null) {
     const el=document.getElementById(canvasId);
@@ -35,41 +36,40 @@
     el.textContent = value;
   }
 
+  function render(data, t) {
+    pushPoint(cpuChart, t, Number(data.cpu ?? 0));
+    pushPoint(gpuChart, t, Number(data.gpu ?? 0));
+    pushPoint(ramChart, t, Number(data.ram ?? 0));
+    pushPoint(powerChart, t, Number(data.power_gpu_w ?? 0)); // güç grafiğinde GPU gücü
+
+    cpuChart?.update(); gpuChart?.update(); ramChart?.update(); powerChart?.update();
+
+    // CO2 yazıları (kg)
+    setText("co2TotalValue", (Number(data.co2_total_kg ?? 0)).toFixed(6));
+    setText("co2GpuValue",   (Number(data.co2_gpu_kg ?? 0)).toFixed(6));
+
+    // debug istersen:
+    // setText("dtValue", String(data.dt_s ?? ""));
+  }
+
   async function tick() {
     if (inFlight) return;
     inFlight = true;
     try {
       const res = await fetch("/monitor/live", { cache:"no-store" });
       const data = await res.json();
-      const t = new Date().toLocaleTimeString();
-
-      pushPoint(cpuChart, t, Number(data.cpu ?? 0));
-      pushPoint(gpuChart, t, Number(data.gpu ?? 0));
-      pushPoint(ramChart, t, Number(data.ram ?? 0));
-      pushPoint(powerChart, t, Number(data.power_gpu_w ?? 0)); // güç grafiğinde GPU gücü
-
-      cpuChart?.update(); gpuChart?.update(); ramChart?.update(); powerChart?.update();
-
-      // CO2 yazıları (kg)
-      setText("co2TotalValue", (Number(data.co2_total_kg ?? 0)).toFixed(6));
-      setText("co2GpuValue",   (Number(data.co2_gpu_kg ?? 0)).toFixed(6));
-
-      // debug istersen:
-      // setText("dtValue", String(data.dt_s ?? ""));
+      render(data, new Date().toLocaleTimeString());
     } finally {
       inFlight = false;
     }
   }
 
-  function startMonitor() {
-    cpuChart?.destroy(); gpuChart?.destroy(); ramChart?.destroy(); powerChart?.destroy();
-
-    cpuChart   = createChart("cpuChart",   "CPU (%)", "#ff6384", 100);
-    gpuChart   = createChart("gpuChart",   "GPU (%)", "#36a2eb", 100);
-    ramChart   = createChart("ramChart",   "RAM (MB)", "#ffcd56");
-    powerChart = createChart("powerChart", "GPU Güç (W)", "#4bc0c0", 120);
-
+  // WebSocket açılınca (polling=false) döngü kendiliğinden durur
+  function startPolling() {
+    if (polling) return;
+    polling = true;
     const loop = async () => {
+      if (!polling) return;
       const t0 = performance.now();
       await tick().catch(()=>{});
       const elapsed = performance.now() - t0;
@@ -80,5 +80,65 @@
     loop();
   }
 
+  // Sunucu her örneği WebSocket ile iter; bağlanınca son örnekler de gelir
+  function startSocket() {
+    const proto = location.protocol === "https:" ? "wss:" : "ws:";
+    let lastSeq = 0;
+    let lastTs = 0;
+    let failures = 0;
+
+    const connect = () => {
+      const ws = new WebSocket(`${proto}//${location.host}/monitor/ws`);
+      let opened = false;
+
+      ws.onopen = () => {
+        opened = true;
+        failures = 0;
+        polling = false;
+        // seq bağlantıya / sunucu sürecine özel: yeniden başlayan ya da başka
+        // bir worker'a bağlanınca 1'den başlar
+        lastSeq = 0;
+      };
+
+      ws.onmessage = (e) => {
+        const data = JSON.parse(e.data);
+        // ping ve yeniden bağlanmada tekrar gelen (zaten çizilmiş) örnekler atlanır
+        if (data.seq === undefined || data.seq <= lastSeq) return;
+        lastSeq = data.seq;
+        if (data.ts <= lastTs) return;
+        lastTs = data.ts;
+        render(data, new Date(data.ts * 1000).toLocaleTimeString());
+      };
+
+      ws.onclose = () => {
+        if (!opened) failures += 1;
+        // Hiç açılamıyorsa (proxy vb.) polling'e geç, WebSocket'i seyrek dene
+        if (failures >= 3) {
+          startPolling();
+          setTimeout(connect, 30000);
+          return;
+        }
+        setTimeout(connect, 1000);
+      };
+    };
+
+    connect();
+  }
+
+  function startMonitor() {
+    cpuChart?.destroy(); gpuChart?.destroy(); ramChart?.destroy(); powerChart?.destroy();
+
+    cpuChart   = createChart("cpuChart",   "CPU (%)", "#ff6384", 100);
+    gpuChart   = createChart("gpuChart",   "GPU (%)", "#36a2eb", 100);
+    ramChart   = createChart("ramChart",   "RAM (MB)", "#ffcd56");
+    powerChart = createChart("powerChart", "GPU Güç (W)", "#4bc0c0", 120);
+
+    if (window.WebSocket) {
+      startSocket();
+    } else {
+      startPolling();
+    }
+  }
+
   document.addEventListener("DOMContentLoaded", startMonitor);
 })();
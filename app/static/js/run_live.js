@@ -2,6 +2,30 @@
 
 let cpuChart, gpuChart, ramChart, powerChart;
 
+// Grafiklerde tutulan en fazla nokta (eskiler baştan atılır)
+const MAX_POINTS = 600;
+
+function pushBounded(chart, labels, values) {
+    chart.data.labels.push(...labels);
+    chart.data.datasets[0].data.push(...values);
+
+    const extra = chart.data.labels.length - MAX_POINTS;
+    if (extra > 0) {
+        chart.data.labels.splice(0, extra);
+        chart.data.datasets[0].data.splice(0, extra);
+    }
+    chart.update();
+}
+
+function appendPoints(metrics) {
+    const labels = metrics.map(m => m.time);
+
+    pushBounded(cpuChart,   labels, metrics.map(m => m.cpu));
+    pushBounded(gpuChart,   labels, metrics.map(m => m.gpu));
+    pushBounded(ramChart,   labels, metrics.map(m => m.ram));
+    pushBounded(powerChart, labels, metrics.map(m => m.power));
+}
+
 function createChart(ctx, label, color) {
     return new Chart(ctx, {
         type: "line",
@@ -53,38 +77,118 @@ function startLiveCharts(runId) {
     ramChart   = createChart(ramCanvas,   "RAM (MB)", "#ffcd56");
     powerChart = createChart(powerCanvas, "Güç (W)",  "#4bc0c0");
 
-    // Her saniye backend'den metrikleri çek
-    setInterval(async () => {
-        try {
-            const res = await fetch(`/runs/${runId}/live`);
+    let cursor = null;
+
+    function appendNew(points) {
+        // Yeniden bağlanmada aynı nokta iki kez gelebilir: imleçten eskiler atlanır
+        const fresh = cursor === null ? points : points.filter(p => p.id > cursor);
+        if (fresh.length) {
+            appendPoints(fresh);
+            cursor = fresh[fresh.length - 1].id;
+        }
+    }
+
+    // Önce run'ın tamamı özetlerden (en fazla MAX_POINTS kova ortalaması),
+    // ardından cursor'dan itibaren SSE akışı (yoksa polling)
+    fetch(`/runs/${runId}/series?max_points=${MAX_POINTS}`)
+        .then(res => {
             if (!res.ok) {
-                console.error("Live metrics isteği hata:", res.status);
+                throw new Error(`HTTP ${res.status}`);
+            }
+            return res.json();
+        })
+        .then(data => {
+            if (data.points && data.points.length) {
+                appendPoints(data.points.map(p => ({
+                    time: p.time,
+                    cpu: p.cpu_avg,
+                    gpu: p.gpu_avg,
+                    ram: p.ram_avg,
+                    power: p.power_avg
+                })));
+            }
+            if (data.cursor !== null && data.cursor !== undefined) {
+                cursor = data.cursor;
+            }
+            if (data.status === "finished") {
                 return;
             }
+            if (window.EventSource) {
+                startStream();
+            } else {
+                startPolling();
+            }
+        })
+        .catch(err => console.error("Live metrics okunamadı:", err));
+
+    function startStream() {
+        const since = cursor === null ? "" : `?since=${cursor}`;
+        const source = new EventSource(`/runs/${runId}/stream${since}`);
+
+        source.addEventListener("metrics", e => {
+            appendNew(JSON.parse(e.data).points || []);
+        });
+
+        source.addEventListener("status", e => {
+            if (JSON.parse(e.data).status === "finished") {
+                source.close();
+            }
+        });
+
+        // Tarayıcı bağlantı koptuğunda Last-Event-ID ile kendisi yeniden bağlanır
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                console.error("Live stream kapandı, polling'e geçiliyor.");
+                startPolling();
+            }
+        };
+    }
 
-            const data = await res.json();
-            if (!data.metrics || !data.metrics.length) {
+    // Her saniye sadece yeni noktaları çek (since imleci)
+    function startPolling() {
+        let busy = false;
+
+        const timer = setInterval(async () => {
+            if (busy) {
                 return;
             }
+            busy = true;
 
-            const labels = data.metrics.map(m => m.time);
+            try {
+                let hasMore = true;
+                let finished = false;
 
-            cpuChart.data.labels   = labels;
-            gpuChart.data.labels   = labels;
-            ramChart.data.labels   = labels;
-            powerChart.data.labels = labels;
+                while (hasMore) {
+                    const url = cursor === null
+                        ? `/runs/${runId}/live?limit=${MAX_POINTS}`
+                        : `/runs/${runId}/live?since=${cursor}`;
 
-            cpuChart.data.datasets[0].data   = data.metrics.map(m => m.cpu);
-            gpuChart.data.datasets[0].data   = data.metrics.map(m => m.gpu);
-            ramChart.data.datasets[0].data   = data.metrics.map(m => m.ram);
-            powerChart.data.datasets[0].data = data.metrics.map(m => m.power);
+                    const res = await fetch(url);
+                    if (!res.ok) {
+                        console.error("Live metrics isteği hata:", res.status);
+                        return;
+                    }
 
-            cpuChart.update();
-            gpuChart.update();
-            ramChart.update();
-            powerChart.update();
-        } catch (err) {
-            console.error("Live metrics okunamadı:", err);
-        }
-    }, 1000);
+                    const data = await res.json();
+                    if (data.metrics && data.metrics.length) {
+                        appendNew(data.metrics);
+                    }
+                    if (data.cursor !== null && data.cursor !== undefined) {
+                        cursor = data.cursor;
+                    }
+                    hasMore = Boolean(data.has_more);
+                    finished = data.status === "finished";
+                }
+
+                // Bitmiş run'da yeni nokta gelmez
+                if (finished) {
+                    clearInterval(timer);
+                }
+            } catch (err) {
+                console.error("Live metrics okunamadı:", err);
+            } finally {
+                busy = false;
+            }
+        }, 1000);
+    }
 }
@@ -0,0 +1,471 @@
+# app/utils/archive.py
+"""
+Bitmiş run'ların metrik serisi için sıkıştırılmış kolon bazlı arşiv.
+
+archive_run() bitmiş bir run'ın serisini tek bir blob'a paketleyip
+run_archives tablosuna yazar; bitmiş run'lar için grafik / canlı / tablo
+uçları load_series() ile ham metrics satırları yerine bu blob'u okur.
+ARCHIVE_PURGE_RAW=1 ise ham satırlar arşivlendikten sonra silinir (rollup
+özetleri kalır).
+
+Arşivleme stop isteğinde yapılmaz. Arka plan thread'i (start_archiver) her
+ARCHIVE_INTERVAL_S'de, ARCHIVE_GRACE_S'den önce bitmiş run'ları arşivler.
+Bu süre, run cache TTL'i (diğer worker'lar run'ı hâlâ açık görebilir) ve
+ingest kuyruğunun son flush'ından uzundur. Yine de arşivden sonra satır
+gelirse (run_energy.updated_at arşivden yeni olur) okuyucular o ana kadar
+ham tabloya düşer (ham satırlar silinmişse arşivle birleştirir) ve run
+sonraki turda yeniden arşivlenir. Arşivleme run'ın
+run_energy satırını kilitler, bu yüzden aynı anda yazılan bir örnek ya
+arşive girer ya da sonraki turda fark edilir.
+
+Blob yerleşimi (little-endian):
+    başlık : magic b"GRA1" | version u8 | codec u8 | reserved u16 | n u32
+    gövde (codec ile sıkıştırılmış), her kolon n eleman:
+        id           int64    delta (ilk eleman mutlak)
+        ts           int64    UTC epoch mikro saniye, delta
+        cpu_util     float64  (NaN = boş)
+        gpu_util     float64
+        gpu_power_w  float64
+        mem_used_mb  float64
+
+Değerler kayıpsızdır (dışa aktarım ve tekil recalc ham tabloyla aynı
+sonucu verir). Sürüm 1 arşivleri (float32, okurken 3 ondalığa yuvarlanır)
+okunmaya devam eder.
+
+Her süreç çözülmüş arşivleri LRU cache'te tutar; anahtar arşivin
+created_at'idir, başka bir süreç yeniden arşivlediğinde eski girdi
+kullanılmaz.
+
+Var olan bitmiş run'ları (ör. run_energy satırı olmayan eski run'lar)
+elle arşivlemek için:
+    python -m app.utils.archive [run_id ...]
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.series import SERIES_COLUMNS, load_run_series, run_series_since_query, run_time_window
+
+try:  # zstd isteğe bağlı
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+RUN_ARCHIVE_ENABLED = os.getenv("RUN_ARCHIVE_ENABLED", "1") == "1"
+ARCHIVE_PURGE_RAW = os.getenv("ARCHIVE_PURGE_RAW", "0") == "1"
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zlib")   # "zlib" | "zstd"
+ARCHIVE_CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "32"))
+# Run bittikten en az bu kadar sonra arşivlenir (RUN_CACHE_TTL_S + kuyruk flush'ından uzun olmalı)
+ARCHIVE_GRACE_S = float(os.getenv("ARCHIVE_GRACE_S", "300"))
+ARCHIVE_INTERVAL_S = float(os.getenv("ARCHIVE_INTERVAL_S", "60"))   # 0 = arka plan arşivleme kapalı
+ARCHIVE_BATCH_RUNS = int(os.getenv("ARCHIVE_BATCH_RUNS", "20"))
+
+MAGIC = b"GRA1"
+VERSION = 2
+HEADER = struct.Struct("<4sBBHI")
+
+CODECS = {"zlib": 0, "zstd": 1}
+CODEC_NAMES = {v: k for k, v in CODECS.items()}
+
+VALUE_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+DELTA_COLUMNS = (("id", np.dtype("<i8")), ("ts", np.dtype("<i8")))
+# Sürüm → değer kolonlarının tipi (1: float32, eski arşivler)
+VALUE_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f8")}
+
+ARCHIVE_FIELDS = ("id", "run_id", "ts") + VALUE_FIELDS
+
+
+# ============================
+# Kodlama
+# ============================
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd desteği için 'zstandard' paketi kurulu değil")
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd desteği için 'zstandard' paketi kurulu değil")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def series_columns(rows: list) -> dict[str, np.ndarray]:
+    """SERIES_COLUMNS satırları → decode_series ile aynı biçimde kolonlar."""
+    n = len(rows)
+    columns = {
+        "id": np.fromiter((r.id for r in rows), dtype=np.int64, count=n),
+        "ts": np.array([r.ts for r in rows], dtype="datetime64[us]"),
+    }
+    for field in VALUE_FIELDS:
+        # None → NaN (float dtype'a çevirirken)
+        columns[field] = np.array([getattr(r, field) for r in rows], dtype=np.float64)
+    return columns
+
+
+def encode_series(columns: dict[str, np.ndarray], codec: str = ARCHIVE_CODEC) -> tuple[bytes, int]:
+    """Kolonları (bkz. series_columns) (blob, sıkıştırılmamış gövde boyutu) olarak paketler."""
+    if codec == "zstd" and zstandard is None:
+        codec = "zlib"
+
+    n = len(columns["id"])
+    ts = columns["ts"].astype("datetime64[us]").astype(np.int64)
+    parts = [
+        np.diff(columns["id"], prepend=0).astype("<i8").tobytes(),
+        np.diff(ts, prepend=0).astype("<i8").tobytes(),
+    ]
+    for field in VALUE_FIELDS:
+        parts.append(columns[field].astype(VALUE_DTYPES[VERSION]).tobytes())
+
+    body = b"".join(parts)
+    header = HEADER.pack(MAGIC, VERSION, CODECS[codec], 0, n)
+    return header + _compress(body, codec), len(body)
+
+
+def decode_series(blob: bytes) -> dict[str, np.ndarray]:
+    """Blob'u {kolon_adı: np.ndarray} sözlüğüne çevirir (ts: datetime64[us], değerler float64)."""
+    magic, version, codec_id, _reserved, n = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("Geçersiz arşiv (magic)")
+    if version not in VALUE_DTYPES:
+        raise ValueError(f"Desteklenmeyen arşiv sürümü: {version}")
+
+    body = _decompress(blob[HEADER.size:], CODEC_NAMES[codec_id])
+
+    columns = {}
+    offset = 0
+    for name, dtype in DELTA_COLUMNS:
+        deltas = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+        columns[name] = np.cumsum(deltas)
+        offset += n * dtype.itemsize
+    columns["ts"] = columns["ts"].astype("datetime64[us]")
+
+    value_dtype = VALUE_DTYPES[version]
+    for field in VALUE_FIELDS:
+        values = np.frombuffer(body, dtype=value_dtype, count=n, offset=offset).astype(np.float64)
+        if version == 1:
+            values = values.round(3)
+        columns[field] = values
+        offset += n * value_dtype.itemsize
+
+    return columns
+
+
+def _merge(old: dict[str, np.ndarray], new: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Eski arşivi ham tablodaki satırlarla birleştirir, ts sırasıyla. Sadece
+    ham satırlar silindiyse çağrılır; tablodakilerin hepsi arşivden sonra gelmiştir.
+    """
+    merged = {name: np.concatenate([old[name], new[name]]) for name in old}
+    order = np.argsort(merged["ts"], kind="stable")
+    return {name: col[order] for name, col in merged.items()}
+
+
+# ============================
+# Arşivleme
+# ============================
+# run_id → ((arşivin created_at'i, birleştirilen geç satırlar için run_energy.updated_at), kolonlar)
+_cache: "OrderedDict[int, tuple[tuple, dict[str, np.ndarray]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_put(run_id: int, version: tuple, columns: dict[str, np.ndarray]):
+    with _cache_lock:
+        _cache[run_id] = (version, columns)
+        _cache.move_to_end(run_id)
+        while len(_cache) > ARCHIVE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cache_get(run_id: int, version: tuple):
+    with _cache_lock:
+        entry = _cache.get(run_id)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            del _cache[run_id]
+            return None
+        _cache.move_to_end(run_id)
+        return entry[1]
+
+
+def archive_run(db: Session, run, purge_raw: bool = ARCHIVE_PURGE_RAW) -> models.RunArchive | None:
+    """
+    Bitmiş run'ın serisini arşivler (varsa yenisiyle değiştirir; ham satırlar
+    silinmişse eski arşivle birleştirir); commit çağırmaz. Run bitmemişse
+    None döner.
+    """
+    if run.ended_at is None:
+        return None
+
+    # Eşzamanlı ingest (update_run_energy) bu satırı kilitler: arada yazılan
+    # örnek ya aşağıdaki okumada görünür ya da run_energy.updated_at'i
+    # arşivden yeni olur ve run sonraki turda yeniden arşivlenir
+    db.get(models.RunEnergy, run.id, with_for_update=True)
+
+    window = run_time_window(run)
+    columns = series_columns(load_run_series(db, run.id, SERIES_COLUMNS, window))
+
+    archive = db.get(models.RunArchive, run.id)
+    if archive is None:
+        archive = models.RunArchive(run_id=run.id)
+        db.add(archive)
+    elif archive.raw_purged:
+        columns = _merge(decode_series(archive.blob), columns)
+
+    blob, raw_bytes = encode_series(columns)
+
+    archive.created_at = datetime.utcnow()
+    archive.n_rows = len(columns["id"])
+    archive.codec = CODEC_NAMES[HEADER.unpack_from(blob, 0)[2]]
+    archive.raw_bytes = raw_bytes
+    archive.blob = blob
+    archive.raw_purged = purge_raw or bool(archive.raw_purged)
+
+    if purge_raw:
+        start, end = window
+        db.execute(
+            delete(models.Metric).where(
+                models.Metric.run_id == run.id,
+                models.Metric.ts >= start,
+                models.Metric.ts < end,
+            )
+        )
+
+    with _cache_lock:
+        _cache.pop(run.id, None)
+
+    return archive
+
+
+def archive_stats(archive: models.RunArchive) -> dict:
+    stored = len(archive.blob)
+    return {
+        "run_id": archive.run_id,
+        "created_at": archive.created_at.isoformat() if archive.created_at else None,
+        "n_rows": archive.n_rows,
+        "codec": archive.codec,
+        "raw_bytes": archive.raw_bytes,
+        "stored_bytes": stored,
+        "ratio": round(archive.raw_bytes / stored, 2) if stored else None,
+        "bytes_per_row": round(stored / archive.n_rows, 2) if archive.n_rows else None,
+        "raw_purged": archive.raw_purged,
+    }
+
+
+# ============================
+# Okuma
+# ============================
+_row_types: dict = {}
+
+
+def _row_type(names: tuple[str, ...]):
+    row_type = _row_types.get(names)
+    if row_type is None:
+        row_type = _row_types[names] = namedtuple("ArchivedMetric", names)
+    return row_type
+
+
+def load_archived_columns(db: Session, run_id: int) -> dict[str, np.ndarray] | None:
+    """
+    Arşivin kolonları; arşiv yoksa None. Arşivden sonra satır gelmişse
+    (run_energy.updated_at daha yeni) ve ham satırlar duruyorsa None döner,
+    okuyucu ham tabloya düşer; ham satırlar silinmişse arşiv geç gelen
+    satırlarla birleştirilir. Run sonraki arşivleme turunda yeniden paketlenir.
+    """
+    state = db.execute(
+        select(models.RunArchive.created_at, models.RunArchive.raw_purged, models.RunEnergy.updated_at)
+        .outerjoin(models.RunEnergy, models.RunEnergy.run_id == models.RunArchive.run_id)
+        .where(models.RunArchive.run_id == run_id)
+    ).first()
+    if state is None:
+        return None
+
+    stale = state.updated_at is not None and state.updated_at > state.created_at
+    if stale and not state.raw_purged:
+        return None
+
+    version = (state.created_at, state.updated_at if stale else None)
+    columns = _cache_get(run_id, version)
+    if columns is not None:
+        return columns
+
+    blob = db.execute(
+        select(models.RunArchive.blob).where(models.RunArchive.run_id == run_id)
+    ).scalar()
+    if blob is None:
+        return None
+
+    columns = decode_series(blob)
+    if stale:
+        columns = _merge(columns, series_columns(load_run_series(db, run_id, SERIES_COLUMNS)))
+    _cache_put(run_id, version, columns)
+    return columns
+
+
+def load_archived_series(db: Session, run_id: int, columns=SERIES_COLUMNS, index=None) -> list | None:
+    """
+    Arşivden load_run_series ile aynı şekilde (kolon adlarıyla erişilen)
+    satır listesi döner; arşiv yoksa None. index verilirse sadece o satırlar
+    (NumPy index / maske) döner.
+    """
+    data = load_archived_columns(db, run_id)
+    if data is None:
+        return None
+
+    if index is None:
+        index = slice(None)
+    names = tuple(c.key for c in columns)
+    n = len(data["id"][index])
+
+    values = []
+    for name in names:
+        if name == "run_id":
+            values.append([run_id] * n)
+        elif name in VALUE_FIELDS:
+            col = data[name][index]
+            values.append(np.where(np.isnan(col), None, col).tolist())
+        else:
+            values.append(data[name][index].tolist())
+
+    row_type = _row_type(names)
+    return [row_type(*row) for row in zip(*values)]
+
+
+def load_series(db: Session, run, columns=SERIES_COLUMNS) -> list:
+    """
+    Run'ın serisi: bitmiş ve arşivlenmiş run'larda arşivden, diğerlerinde
+    ham metrics tablosundan.
+    """
+    if run.ended_at is not None:
+        archived = load_archived_series(db, run.id, columns)
+        if archived is not None:
+            return archived
+    return load_run_series(db, run.id, columns, run_time_window(run))
+
+
+def load_series_since(db: Session, run, columns, since_id: int | None, limit: int) -> tuple[list, bool]:
+    """
+    Canlı grafik için imleçli okuma: (satırlar id sırasıyla, daha_fazla_var).
+    since_id yoksa son limit satır döner.
+    """
+    if run.ended_at is not None:
+        data = load_archived_columns(db, run.id)
+        if data is not None:
+            order = np.argsort(data["id"], kind="stable")
+            if since_id is not None:
+                order = order[data["id"][order] > since_id]
+                index, has_more = order[:limit], len(order) > limit
+            else:
+                index, has_more = order[-limit:], False
+            return load_archived_series(db, run.id, columns, index), has_more
+
+    start, end = run_time_window(run)
+    rows = db.execute(run_series_since_query(run.id, columns, since_id, limit + 1, start, end)).all()
+    if since_id is None:
+        return list(reversed(rows[:limit])), False
+    return rows[:limit], len(rows) > limit
+
+
+# ============================
+# Arka plan arşivleme
+# ============================
+def runs_to_archive(db: Session, grace_s: float = ARCHIVE_GRACE_S, limit: int = ARCHIVE_BATCH_RUNS) -> list:
+    """
+    grace_s'den önce bitmiş ve metriği olan (run_energy satırı var) run'lardan
+    hiç arşivlenmemiş ya da arşivden sonra satır almış olanlar.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_s)
+    return db.execute(
+        select(models.Run)
+        .join(models.RunEnergy, models.RunEnergy.run_id == models.Run.id)
+        .outerjoin(models.RunArchive, models.RunArchive.run_id == models.Run.id)
+        .where(
+            models.Run.ended_at.isnot(None),
+            models.Run.ended_at <= cutoff,
+            or_(
+                models.RunArchive.run_id.is_(None),
+                and_(
+                    models.RunEnergy.updated_at.isnot(None),
+                    models.RunEnergy.updated_at > models.RunArchive.created_at,
+                ),
+            ),
+        )
+        .order_by(models.Run.id)
+        .limit(limit)
+    ).scalars().all()
+
+
+def archive_finished_runs(db: Session, grace_s: float = ARCHIVE_GRACE_S) -> int:
+    """Bekleyen run'ları tek tek arşivleyip commit eder; arşivlenen run sayısı."""
+    done: set[int] = set()
+    while True:
+        # Saat kayması vb. yüzünden hep seçilen run'lar tekrar işlenmez
+        runs = [run for run in runs_to_archive(db, grace_s) if run.id not in done]
+        if not runs:
+            return len(done)
+        for run in runs:
+            archive_run(db, run)
+            db.commit()
+            done.add(run.id)
+
+
+def _archive_loop():
+    from app.database import SessionLocal
+
+    while True:
+        time.sleep(ARCHIVE_INTERVAL_S)
+        db = SessionLocal()
+        try:
+            archive_finished_runs(db)
+        except Exception as e:
+            db.rollback()
+            print("[ARCHIVE] Arşivleme hatası:", e)
+        finally:
+            db.close()
+
+
+def start_archiver():
+    """Uygulama açılışında çağrılır; arşiv kapalıysa ya da ARCHIVE_INTERVAL_S=0 ise thread başlamaz."""
+    if RUN_ARCHIVE_ENABLED and ARCHIVE_INTERVAL_S > 0:
+        threading.Thread(target=_archive_loop, daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        query = db.query(models.Run).filter(models.Run.ended_at.isnot(None))
+        if len(sys.argv) > 1:
+            query = query.filter(models.Run.id.in_([int(a) for a in sys.argv[1:]]))
+
+        for run in query.order_by(models.Run.id.asc()).all():
+            archive = archive_run(db, run)
+            db.commit()
+            if not archive.n_rows:
+                print(f"run {run.id}: metrik yok")
+            else:
+                stats = archive_stats(archive)
+                print(
+                    f"run {run.id}: {stats['n_rows']} satır, "
+                    f"{stats['raw_bytes']} → {stats['stored_bytes']} bayt (x{stats['ratio']})"
+                )
+    finally:
+        db.close()
@@ -4,8 +4,7 @@ from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Header, HTTPException, status
 
-from app.database import SessionLocal
-from app import models
+from app.utils.principal_cache import principal_cache, subject_id
 
 SECRET_KEY = "super_secret_key_12345"  # TODO: .env içine alınacak
 ALGORITHM = "HS256"
@@ -60,27 +59,23 @@ def get_current_user(authorization: str = Header(None)):
             detail="Invalid or expired token",
         )
 
-    user_id = payload.get("sub")
+    user_id = subject_id(payload)
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
         )
 
-    db = SessionLocal()
-    try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
-        return user
-    finally:
-        db.close()
-
-
-def admin_required(user: models.User):
+    user = principal_cache.get(user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return user
+
+
+def admin_required(user):
     if user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
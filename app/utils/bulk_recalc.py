@@ -0,0 +1,306 @@
+# app/utils/bulk_recalc.py
+"""
+Tüm run'lar için toplu enerji / emisyon yeniden hesabı.
+
+Karbon faktörü ya da entegrasyon yöntemi değiştiğinde her run için ayrı
+/emissions/recalc çağırmak yerine enerji, veritabanında tek SQL ile
+hesaplanır: metrics üzerinde run_id başına ts sırasıyla LAG() penceresi,
+aralık enerjisi (emission_calc ile aynı kural ve boşluk sınırı) ve run
+ve saat bazında SUM. Her saatlik enerji, o saatte geçerli bölge karbon
+yoğunluğuyla (bkz. app/utils/carbon_intensity.py) çarpılır; sonuçlar
+emissions tablosuna toplu upsert edilir.
+
+Run'lar RECALC_CHUNK_SIZE'lık parçalar halinde, her parça ayrı transaction
+ile işlenir (kilit süresi sınırlı kalır). Ham satırları silinmiş arşivli
+run'lar (bkz. app/utils/archive.py) arşivden Python motoruyla hesaplanır.
+
+API: POST /emissions/recalc (arka planda iş başlatır) ve
+GET /emissions/recalc/jobs/{job_id}; CLI: python -m app.cli recalc
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy import Integer, case, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.utils.archive import load_series
+from app.utils.carbon_intensity import intensity_at
+from app.utils.dashboard_summary import record_emissions
+from app.utils.emission_calc import ENERGY_MAX_GAP_S, ENERGY_RULE, emission_for_series, series_arrays
+from app.utils.run_detail_cache import run_detail_cache
+from app.utils.series import POWER_COLUMNS
+
+RECALC_CHUNK_SIZE = int(os.getenv("RECALC_CHUNK_SIZE", "500"))
+
+# Bellekte tutulan en fazla iş sayısı (eskiler atılır)
+MAX_JOBS_KEPT = 20
+
+
+# ============================
+# SQL enerji hesabı
+# ============================
+def _seconds_between(dialect: str, start, end):
+    if dialect == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400.0
+
+
+def _hour_epoch(dialect: str, ts):
+    """ts'in içinde bulunduğu saatin başlangıcı (epoch saniye)."""
+    if dialect == "postgresql":
+        return func.floor(func.extract("epoch", ts) / 3600) * 3600
+    return func.cast(func.strftime("%s", ts), Integer) // 3600 * 3600
+
+
+def energy_query(run_ids: list[int], dialect: str, rule: str = ENERGY_RULE, max_gap_s: float = ENERGY_MAX_GAP_S):
+    """
+    Verilen run'lar için (run_id, hour_s, n, energy_wh) satırları döner:
+    aralıklar başladıkları saate göre gruplanır (her run'ın ilk örneği
+    hour_s = NULL grubundadır). Aralık enerjisi emission_calc.interval_energies_wh
+    ile aynıdır.
+    """
+    m = models.Metric
+    power = func.coalesce(m.gpu_power_w, 0.0)
+    window = {"partition_by": m.run_id, "order_by": m.ts}
+
+    samples = (
+        select(
+            m.run_id,
+            m.ts,
+            power.label("p"),
+            func.lag(m.ts).over(**window).label("prev_ts"),
+            func.lag(power).over(**window).label("prev_p"),
+        )
+        .where(m.run_id.in_(run_ids), m.ts.is_not(None))
+        .subquery()
+    )
+
+    dt = _seconds_between(dialect, samples.c.prev_ts, samples.c.ts)
+    whens = [(dt < 0, 0.0)]
+    if max_gap_s > 0:
+        whens.append((dt > max_gap_s, max_gap_s))
+    dt = case(*whens, else_=dt)
+
+    if rule == "left":
+        energy = samples.c.prev_p * dt / 3600.0
+    else:
+        energy = (samples.c.prev_p + samples.c.p) / 2.0 * dt / 3600.0
+
+    hour = _hour_epoch(dialect, samples.c.prev_ts).label("hour_s")
+    return (
+        select(
+            samples.c.run_id,
+            hour,
+            func.count().label("n"),
+            func.coalesce(func.sum(energy), 0.0).label("energy_wh"),
+        )
+        .group_by(samples.c.run_id, hour)
+    )
+
+
+def _upsert_emissions_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(models.Emission.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["run_id"],
+        set_={
+            "energy_kwh": stmt.excluded.energy_kwh,
+            "emission_kg": stmt.excluded.emission_kg,
+            "region_code": stmt.excluded.region_code,
+            "version": models.Emission.__table__.c.version + 1,
+        },
+    )
+
+
+def recalc_chunk(db: Session, run_ids: list[int], region: str = "TR", rule: str = ENERGY_RULE, max_gap_s: float = ENERGY_MAX_GAP_S) -> tuple[int, int]:
+    """
+    Bir parça run'ı yeniden hesaplayıp emissions'a yazar; commit çağırmaz.
+    (güncellenen, atlanan) sayılarını döner (2'den az örneği olan run atlanır).
+    """
+    dialect = db.get_bind().dialect.name
+
+    purged = set(db.execute(
+        select(models.RunArchive.run_id)
+        .where(models.RunArchive.run_id.in_(run_ids), models.RunArchive.raw_purged.is_(True))
+    ).scalars())
+
+    # {run_id: [örnek sayısı, enerji_Wh, CO2_kg]}
+    totals: dict = {}
+    sql_ids = [r for r in run_ids if r not in purged]
+    if sql_ids:
+        buckets = db.execute(energy_query(sql_ids, dialect, rule, max_gap_s)).all()
+        if buckets:
+            hours = np.array([b.hour_s if b.hour_s is not None else np.nan for b in buckets], dtype=np.float64)
+            energies = np.array([b.energy_wh for b in buckets], dtype=np.float64)
+            kg = energies * intensity_at(region, np.nan_to_num(hours)) / 1000.0
+
+            for b, e_kg in zip(buckets, kg.tolist()):
+                acc = totals.setdefault(b.run_id, [0, 0.0, 0.0])
+                acc[0] += b.n
+                acc[1] += float(b.energy_wh)
+                if b.hour_s is not None:
+                    acc[2] += e_kg
+
+    if purged:
+        for run in db.query(models.Run).filter(models.Run.id.in_(purged)).all():
+            ts_s, power_w = series_arrays(load_series(db, run, POWER_COLUMNS))
+            energy_wh, emission_kg = emission_for_series(ts_s, power_w, region, rule, max_gap_s)
+            totals[run.id] = [len(ts_s), energy_wh, emission_kg]
+
+    rows = []
+    for run_id in sorted(totals):
+        n, energy_wh, emission_kg = totals[run_id]
+        if n < 2:
+            continue
+        rows.append({
+            "run_id": run_id,
+            "energy_kwh": energy_wh / 1000.0,
+            "emission_kg": emission_kg,
+            "region_code": region,
+            "version": 1,
+        })
+
+    if rows:
+        record_emissions(db, rows)
+        db.execute(_upsert_emissions_statement(dialect), rows)
+    return len(rows), len(run_ids) - len(rows)
+
+
+# ============================
+# İş takibi
+# ============================
+class RecalcJob:
+    def __init__(self, run_ids: Optional[list[int]], include_running: bool, region: str, chunk_size: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.run_ids = run_ids
+        self.include_running = include_running
+        self.region = region
+        self.chunk_size = chunk_size
+
+        self.status = "pending"       # pending | running | done | failed
+        self.total = 0
+        self.processed = 0
+        self.updated = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._t0 = 0.0
+        self.elapsed_s = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "chunks": self.chunks,
+            "progress": round(self.processed / self.total, 4) if self.total else 0.0,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+def _run_query(job: RecalcJob):
+    query = select(models.Run.id)
+    if job.run_ids:
+        query = query.where(models.Run.id.in_(job.run_ids))
+    if not job.include_running:
+        query = query.where(models.Run.ended_at.is_not(None))
+    return query
+
+
+def run_job(job: RecalcJob, progress: Optional[Callable[[RecalcJob], None]] = None) -> RecalcJob:
+    """İşi çağıran thread'de çalıştırır; her parçadan sonra progress(job) çağrılır."""
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    job._t0 = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        job.total = db.execute(select(func.count()).select_from(_run_query(job).subquery())).scalar()
+
+        last_id = 0
+        while True:
+            # id üzerinden keyset: parçalar arası kayma olmaz
+            ids = db.execute(
+                _run_query(job)
+                .where(models.Run.id > last_id)
+                .order_by(models.Run.id.asc())
+                .limit(job.chunk_size)
+            ).scalars().all()
+            if not ids:
+                break
+
+            updated, skipped = recalc_chunk(db, ids, job.region)
+            db.commit()
+            run_detail_cache.invalidate(ids)
+
+            last_id = ids[-1]
+            job.chunks += 1
+            job.processed += len(ids)
+            job.updated += updated
+            job.skipped += skipped
+            job.elapsed_s = time.perf_counter() - job._t0
+            if progress:
+                progress(job)
+
+        job.status = "done"
+    except Exception as e:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        db.close()
+        job.elapsed_s = time.perf_counter() - job._t0
+        job.finished_at = datetime.utcnow()
+
+    return job
+
+
+class RecalcJobs:
+    """Süreç içi iş kaydı; işler arka plan thread'inde çalışır."""
+
+    def __init__(self):
+        self._jobs: dict[str, RecalcJob] = {}
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        run_ids: Optional[list[int]] = None,
+        include_running: bool = False,
+        region: str = "TR",
+        chunk_size: int = RECALC_CHUNK_SIZE,
+    ) -> RecalcJob:
+        job = RecalcJob(run_ids, include_running, region, chunk_size)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOBS_KEPT:
+                self._jobs.pop(next(iter(self._jobs)))
+
+        threading.Thread(target=run_job, args=(job,), daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[RecalcJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+# Uygulama genelinde tek kayıt
+recalc_jobs = RecalcJobs()
@@ -0,0 +1,138 @@
+# app/utils/carbon_intensity.py
+"""
+Bölge bazında, zamana göre değişen şebeke karbon yoğunluğu (kg CO2e / kWh).
+
+Veriler CARBON_INTENSITY_DIR (varsayılan app/data/carbon_intensity) altındaki
+CSV dosyalarından okunur:
+  - regions.csv        : code,label,default_kg_per_kwh
+  - <CODE>.csv         : ts,kg_per_kwh   (isteğe bağlı; ör. saatlik seri)
+                         ts ISO 8601, UTC; her değer bir sonraki satıra kadar
+                         geçerlidir.
+
+Bölgenin zaman serisi dosyası yoksa (ya da istenen an serinin başından
+önceyse) default_kg_per_kwh kullanılır. Bilinmeyen bölge kodları için
+DEFAULT_REGION'ın değerleri kullanılır.
+
+Seriler bellekte sıralı NumPy dizileri olarak tutulur; bir zaman dizisi için
+yoğunluklar searchsorted ile tek seferde bulunur. Yüklenen bölgeler LRU
+cache'te saklanır.
+"""
+import bisect
+import csv
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+CARBON_INTENSITY_DIR = os.getenv(
+    "CARBON_INTENSITY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "carbon_intensity"),
+)
+CARBON_CACHE_SIZE = int(os.getenv("CARBON_CACHE_SIZE", "32"))
+
+DEFAULT_REGION = "TR"
+DEFAULT_KG_PER_KWH = 0.42   # regions.csv yoksa / TR tanımlı değilse
+
+
+def _parse_ts(value: str) -> float:
+    ts = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class RegionIntensity:
+    """Tek bölgenin yoğunluk serisi: starts[i] anından itibaren values[i]."""
+
+    def __init__(self, code: str, label: str, default: float, starts: np.ndarray, values: np.ndarray):
+        self.code = code
+        self.label = label
+        self.default = default
+        self.starts = starts        # float64 epoch saniye, artan sırada
+        self.values = values        # float64 kg / kWh
+
+    @property
+    def time_varying(self) -> bool:
+        return len(self.starts) > 0
+
+    def at(self, ts_s) -> np.ndarray:
+        """Her zaman damgası (epoch saniye) için o an geçerli yoğunluk."""
+        ts_s = np.asarray(ts_s, dtype=np.float64)
+        if not self.time_varying:
+            return np.full(ts_s.shape, self.default)
+
+        idx = np.searchsorted(self.starts, ts_s, side="right") - 1
+        out = self.values[np.clip(idx, 0, None)]
+        return np.where(idx < 0, self.default, out)
+
+    def at_one(self, ts_s: float | None = None) -> float:
+        """Tek an için (ts_s None ise şu an) yoğunluk."""
+        if not self.time_varying:
+            return self.default
+        if ts_s is None:
+            ts_s = datetime.now(timezone.utc).timestamp()
+        i = bisect.bisect_right(self.starts, ts_s) - 1
+        return float(self.values[i]) if i >= 0 else self.default
+
+
+# ============================
+# Yükleme
+# ============================
+@lru_cache(maxsize=1)
+def region_table() -> dict[str, tuple[str, float]]:
+    """{code: (label, default_kg_per_kwh)}; regions.csv sırası korunur."""
+    path = os.path.join(CARBON_INTENSITY_DIR, "regions.csv")
+    table: dict[str, tuple[str, float]] = {}
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                table[row["code"].strip()] = (row["label"].strip(), float(row["default_kg_per_kwh"]))
+    table.setdefault(DEFAULT_REGION, ("Türkiye", DEFAULT_KG_PER_KWH))
+    return table
+
+
+def _load_series(code: str) -> tuple[np.ndarray, np.ndarray]:
+    path = os.path.join(CARBON_INTENSITY_DIR, f"{code}.csv")
+    if not os.path.exists(path):
+        return np.empty(0), np.empty(0)
+
+    starts, values = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            starts.append(_parse_ts(row["ts"]))
+            values.append(float(row["kg_per_kwh"]))
+
+    starts_arr = np.asarray(starts, dtype=np.float64)
+    order = np.argsort(starts_arr, kind="stable")
+    return starts_arr[order], np.asarray(values, dtype=np.float64)[order]
+
+
+@lru_cache(maxsize=CARBON_CACHE_SIZE)
+def get_region(code: str | None) -> RegionIntensity:
+    table = region_table()
+    code = code if code in table else DEFAULT_REGION
+    label, default = table[code]
+    starts, values = _load_series(code)
+    return RegionIntensity(code, label, default, starts, values)
+
+
+def list_regions() -> list[RegionIntensity]:
+    return [get_region(code) for code in region_table()]
+
+
+def clear_cache():
+    """CSV dosyaları değiştiğinde çağrılır."""
+    region_table.cache_clear()
+    get_region.cache_clear()
+
+
+# ============================
+# Kısa yollar
+# ============================
+def intensity_at(region: str | None, ts_s) -> np.ndarray:
+    return get_region(region).at(ts_s)
+
+
+def current_intensity(region: str | None = DEFAULT_REGION) -> float:
+    return get_region(region).at_one()
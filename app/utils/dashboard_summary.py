@@ -0,0 +1,271 @@
+# app/utils/dashboard_summary.py
+"""
+/dashboard/stats için önceden hesaplanmış özet.
+
+Ana sayfa her açılışta users / devices / runs / metrics üzerinde count(),
+metrics üzerinde avg() ve runs ⋈ emissions üzerinde group by çalıştırmak
+yerine iki küçük tablodan okur:
+
+  - dashboard_summary : sayaçlar ve cpu / gpu toplamları (ortalama = toplam / n).
+                        Ingest'in tek satırda beklememesi için SUMMARY_SHARDS
+                        satıra bölünür; okurken satırlar toplanır.
+  - model_stats       : model adı başına run sayısı, enerji ve emisyon toplamı.
+
+Güncellemeler yazma ile aynı transaction'da, toplamsal upsert ile yapılır
+(x = x + delta), bu yüzden eşzamanlı yazmalar birbirini ezmez:
+  - metrikler  : store_metrics → update_metric_summary
+  - emisyonlar : upsert_emission / bulk recalc → record_emissions (eski
+                 değerle farkı yazar)
+  - kullanıcı / cihaz / run : ORM insert / delete olayları (oluşturan yollar
+                 birden fazla olduğu için)
+
+ORM dışı yollar (toplu SQL, ham veri silme, partition DROP) özeti
+kaydırabilir. reconcile() tabloları tek bir anlık görüntüde (Postgres'te
+REPEATABLE READ) sayar, özetle farkı bulur ve farkı yine toplamsal olarak
+ekler; arada gelen yazmalar kaybolmaz. DASHBOARD_RECONCILE_S aralığında arka
+plan thread'i çalıştırır; elle: python -m app.cli reconcile-dashboard
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+SUMMARY_SHARDS = int(os.getenv("DASHBOARD_SUMMARY_SHARDS", "16"))
+DASHBOARD_RECONCILE_S = float(os.getenv("DASHBOARD_RECONCILE_S", "600"))   # 0 = kapalı
+
+SUMMARY_FIELDS = (
+    "users", "devices", "runs", "metrics",
+    "cpu_util_sum", "cpu_util_n", "gpu_util_sum", "gpu_util_n",
+)
+MODEL_FIELDS = ("run_count", "emission_count", "energy_kwh_sum", "emission_kg_sum")
+
+
+# ============================
+# Toplamsal upsert
+# ============================
+def _additive_upsert(dialect: str, table, key: str, fields: tuple):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(table)
+    set_ = {f: table.c[f] + stmt.excluded[f] for f in fields}
+    set_["updated_at"] = stmt.excluded.updated_at
+    return stmt.on_conflict_do_update(index_elements=[key], set_=set_)
+
+
+def _add_summary(conn, shard: int, **deltas):
+    row = {f: deltas.get(f, 0) for f in SUMMARY_FIELDS}
+    row["shard"] = shard % SUMMARY_SHARDS
+    row["updated_at"] = datetime.utcnow()
+    stmt = _additive_upsert(conn.dialect.name, models.DashboardSummary.__table__, "shard", SUMMARY_FIELDS)
+    conn.execute(stmt, [row])
+
+
+def _add_models(conn, deltas: dict):
+    """deltas: {model_adı: {alan: fark}}"""
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"model_name": name, **{f: d.get(f, 0) for f in MODEL_FIELDS}, "updated_at": now}
+        for name, d in deltas.items()
+    ]
+    stmt = _additive_upsert(conn.dialect.name, models.ModelStat.__table__, "model_name", MODEL_FIELDS)
+    conn.execute(stmt, rows)
+
+
+def _model_key(name) -> str:
+    return name or ""
+
+
+# ============================
+# Yazma yolları
+# ============================
+def update_metric_summary(db: Session, columns: dict):
+    """store_metrics içinden: eklenen örnekleri (kolon biçiminde) sayaçlara ekler."""
+    if not len(columns["run_id"]):
+        return
+    cpu, gpu = columns["cpu_util"], columns["gpu_util"]
+    _add_summary(
+        db.connection(),
+        int(columns["run_id"][0]),
+        metrics=len(columns["run_id"]),
+        cpu_util_sum=float(np.nansum(cpu)),
+        cpu_util_n=int(np.count_nonzero(~np.isnan(cpu))),
+        gpu_util_sum=float(np.nansum(gpu)),
+        gpu_util_n=int(np.count_nonzero(~np.isnan(gpu))),
+    )
+
+
+def record_emissions(db: Session, rows: list[dict]):
+    """
+    Emission kayıtları yazılmadan hemen önce çağrılır: rows
+    ({run_id, energy_kwh, emission_kg}) ile var olan değerlerin farkını
+    model_stats'a ekler.
+    """
+    if not rows:
+        return
+    run_ids = [r["run_id"] for r in rows]
+    current = {
+        r.run_id: r
+        for r in db.execute(
+            select(models.Run.id.label("run_id"), models.Run.model_name, models.Emission.id.label("emission_id"),
+                   models.Emission.energy_kwh, models.Emission.emission_kg)
+            .outerjoin(models.Emission, models.Emission.run_id == models.Run.id)
+            .where(models.Run.id.in_(run_ids))
+        )
+    }
+
+    deltas: dict = {}
+    for r in rows:
+        cur = current.get(r["run_id"])
+        if cur is None:
+            continue
+        d = deltas.setdefault(_model_key(cur.model_name), dict.fromkeys(MODEL_FIELDS, 0))
+        if cur.emission_id is None:
+            d["emission_count"] += 1
+        d["energy_kwh_sum"] += (r["energy_kwh"] or 0.0) - (cur.energy_kwh or 0.0)
+        d["emission_kg_sum"] += (r["emission_kg"] or 0.0) - (cur.emission_kg or 0.0)
+
+    _add_models(db.connection(), deltas)
+
+
+def _count_entity(field: str, sign: int):
+    def listener(mapper, connection, target):
+        _add_summary(connection, target.id or 0, **{field: sign})
+        if field == "runs":
+            _add_models(connection, {_model_key(target.model_name): {"run_count": sign}})
+    return listener
+
+
+for _model, _field in ((models.User, "users"), (models.Device, "devices"), (models.Run, "runs")):
+    event.listen(_model, "after_insert", _count_entity(_field, 1))
+    event.listen(_model, "after_delete", _count_entity(_field, -1))
+
+
+# ============================
+# Okuma
+# ============================
+def read_summary(db: Session) -> dict:
+    s = models.DashboardSummary
+    row = db.execute(
+        select(
+            *[func.coalesce(func.sum(getattr(s, f)), 0).label(f) for f in SUMMARY_FIELDS],
+            func.max(s.updated_at).label("updated_at"),
+            func.max(s.reconciled_at).label("reconciled_at"),
+        )
+    ).one()
+    return dict(row._mapping)
+
+
+def read_model_stats(db: Session) -> list:
+    return db.query(models.ModelStat).all()
+
+
+# ============================
+# Mutabakat
+# ============================
+def _exact(db: Session) -> tuple[dict, dict]:
+    m = models.Metric
+    totals = {
+        "users": db.query(func.count(models.User.id)).scalar(),
+        "devices": db.query(func.count(models.Device.id)).scalar(),
+        "runs": db.query(func.count(models.Run.id)).scalar(),
+    }
+    agg = db.execute(select(
+        func.count(),
+        func.coalesce(func.sum(m.cpu_util), 0.0),
+        func.count(m.cpu_util),
+        func.coalesce(func.sum(m.gpu_util), 0.0),
+        func.count(m.gpu_util),
+    ).select_from(m)).one()
+    totals.update(zip(("metrics", "cpu_util_sum", "cpu_util_n", "gpu_util_sum", "gpu_util_n"), agg))
+
+    per_model = {}
+    runs = (
+        db.query(
+            models.Run.model_name,
+            func.count(models.Run.id),
+            func.count(models.Emission.id),
+            func.coalesce(func.sum(models.Emission.energy_kwh), 0.0),
+            func.coalesce(func.sum(models.Emission.emission_kg), 0.0),
+        )
+        .outerjoin(models.Emission, models.Emission.run_id == models.Run.id)
+        .group_by(models.Run.model_name)
+        .all()
+    )
+    for name, *values in runs:
+        acc = per_model.setdefault(_model_key(name), dict.fromkeys(MODEL_FIELDS, 0))
+        for f, v in zip(MODEL_FIELDS, values):
+            acc[f] += v
+    return totals, per_model
+
+
+def _differs(want, have) -> bool:
+    # Float toplamlarda yuvarlama farkı drift sayılmaz
+    return abs(want - have) > 1e-6 * max(1.0, abs(want))
+
+
+def reconcile(db: Session, snapshot: bool = True) -> dict:
+    """
+    Özeti gerçek tablolarla karşılaştırıp farkı düzeltir; commit eder.
+    Düzeltilen farkları döner.
+    """
+    if snapshot and db.get_bind().dialect.name == "postgresql":
+        # Sayımlar ve özet aynı anlık görüntüden okunur
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    exact, exact_models = _exact(db)
+    stored = read_summary(db)
+    stored_models = {m.model_name: m for m in read_model_stats(db)}
+    db.commit()
+
+    drift = {f: exact[f] - stored[f] for f in SUMMARY_FIELDS if _differs(exact[f], stored[f])}
+
+    model_drift = {}
+    for name in set(exact_models) | set(stored_models):
+        want = exact_models.get(name, dict.fromkeys(MODEL_FIELDS, 0))
+        have = stored_models.get(name)
+        d = {f: want[f] - (getattr(have, f) if have else 0) for f in MODEL_FIELDS}
+        if any(_differs(want[f], want[f] - d[f]) for f in MODEL_FIELDS):
+            model_drift[name] = d
+
+    conn = db.connection()
+    _add_summary(conn, 0, **drift)
+    _add_models(conn, model_drift)
+    db.query(models.DashboardSummary).filter(models.DashboardSummary.shard == 0).update(
+        {"reconciled_at": datetime.utcnow()}
+    )
+    db.commit()
+    return {"summary": drift, "models": model_drift}
+
+
+def _reconcile_loop():
+    from app.database import SessionLocal
+
+    while True:
+        time.sleep(DASHBOARD_RECONCILE_S)
+        db = SessionLocal()
+        try:
+            drift = reconcile(db)
+            if drift["summary"] or drift["models"]:
+                print("[DASHBOARD] Özet düzeltildi:", drift)
+        except Exception as e:
+            db.rollback()
+            print("[DASHBOARD] Mutabakat hatası:", e)
+        finally:
+            db.close()
+
+
+def start_reconciler():
+    """Uygulama açılışında çağrılır; DASHBOARD_RECONCILE_S=0 ise thread başlamaz."""
+    if DASHBOARD_RECONCILE_S > 0:
+        threading.Thread(target=_reconcile_loop, daemon=True).start()
@@ -0,0 +1,177 @@
+# app/utils/downsample.py
+"""
+Grafik serileri için sunucu tarafı seyreltme (downsampling).
+
+Uzun run'larda yüz binlerce nokta Chart.js'e gönderilmek yerine max_points
+noktaya indirilir. İki yöntem var (DOWNSAMPLE_METHOD):
+
+  - "lttb"   : Largest-Triangle-Three-Buckets. Seri max_points-2 kovaya
+               bölünür; her kovadan, önceki seçilen nokta ile sonraki
+               kovanın ortalamasıyla en büyük üçgeni kuran nokta seçilir.
+               Görsel şekli ve tepe noktalarını korur.
+  - "minmax" : Her kovanın en küçük ve en büyük noktası (tamamen
+               vektörel, LTTB'den hızlı; tepe/dip kesin korunur).
+
+İlk ve son nokta her zaman korunur (canlı uçlarda imleç = son id bozulmaz).
+Birden fazla kolon verilirse nokta bütçesi kolonlara bölünür ve seçilen
+indekslerin birleşimi döner: her grafiğin tepeleri korunur, etiketler
+(zaman ekseni) ortak kalır. Her kolonun genel max / min noktası da yönteme
+bakılmaksızın eklenir; birleşim hiçbir zaman max_points'i aşmaz (bütçe
+küçükse önce ilk / son nokta, sonra max'lar, sonra min'ler korunur).
+"""
+import os
+
+import numpy as np
+
+DOWNSAMPLE_METHOD = os.getenv("DOWNSAMPLE_METHOD", "lttb")   # "lttb" | "minmax"
+
+METHODS = ("lttb", "minmax")
+
+# Grafiklerde çizilen metrik kolonları (tepeleri korunacak olanlar)
+CHART_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+
+def _buckets(n: int, n_buckets: int) -> np.ndarray:
+    """[1, n-1) aralığını n_buckets kovaya bölen sınırlar (n_buckets + 1 eleman)."""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def _padded(values: np.ndarray, edges: np.ndarray, fill: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Kovaları (kova sayısı x en uzun kova) matrisine yerleştirir; boş hücreler
+    fill ile doldurulur. (matris, her hücrenin orijinal indeksi) döner.
+    """
+    starts, lengths = edges[:-1], np.diff(edges)
+    width = int(lengths.max())
+    offsets = np.arange(width)
+    index = starts[:, None] + offsets[None, :]
+    valid = offsets[None, :] < lengths[:, None]
+    index = np.where(valid, index, starts[:, None])
+    matrix = np.where(valid, values[index], fill)
+    return matrix, index
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """LTTB ile seçilen n_out noktanın artan sıralı indeksleri."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64), nan=0.0)
+
+    n_buckets = n_out - 2
+    edges = _buckets(n, n_buckets)
+
+    # Her kovanın ortalaması (sonraki kovanın "C" noktası) tek seferde
+    lengths = np.diff(edges)
+    cx = np.append((np.add.reduceat(x[:-1], edges[:-1]) / lengths)[1:], x[-1])
+    cy = np.append((np.add.reduceat(y[:-1], edges[:-1]) / lengths)[1:], y[-1])
+
+    # Her kova önceki seçilen noktaya bağlıdır; döngü kova sayısı kadar,
+    # kova içi alan hesabı vektörel (dilimler kopya değil görünüm)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    bounds = edges.tolist()
+    j = 0
+    for i in range(n_buckets):
+        s, e = bounds[i], bounds[i + 1]
+        ax, ay = x[j], y[j]
+        area = np.abs((ax - cx[i]) * (y[s:e] - ay) - (ax - x[s:e]) * (cy[i] - ay))
+        j = s + int(area.argmax())
+        out[i + 1] = j
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Her kovanın min ve max noktası (ilk / son dahil), artan sıralı indeksler."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64), nan=0.0)
+    n_buckets = max((n_out - 2) // 2, 1)
+    edges = _buckets(n, n_buckets)
+
+    lo, index = _padded(y, edges, np.inf)
+    hi = np.where(np.isinf(lo), -np.inf, lo)
+    rows = np.arange(n_buckets)
+    picks = np.concatenate((
+        [0, n - 1],
+        index[rows, lo.argmin(axis=1)],
+        index[rows, hi.argmax(axis=1)],
+    ))
+    return np.unique(picks)
+
+
+def _varies(y: np.ndarray) -> bool:
+    finite = y[np.isfinite(y)]
+    return len(finite) > 0 and finite.max() > finite.min()
+
+
+def _clamp(required: list, picks: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    required (öncelik sırasıyla) ile picks birleşimini en fazla max_points
+    indekse indirir; yer kalmazsa picks'ten eşit aralıklı seçilir.
+    """
+    keep = np.array(list(dict.fromkeys(required))[:max_points], dtype=np.int64)
+    rest = np.setdiff1d(picks, keep)
+    room = max_points - len(keep)
+    if len(rest) > room:
+        rest = rest[np.linspace(0, len(rest) - 1, room).astype(np.int64)] if room > 0 else rest[:0]
+    return np.unique(np.concatenate((keep, rest)))
+
+
+def downsample_indices(x, columns: list, max_points: int, method: str = DOWNSAMPLE_METHOD) -> np.ndarray:
+    """
+    Ortak x ekseni üzerindeki kolonlar için korunacak satır indeksleri
+    (artan sıralı, en fazla max_points).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Bilinmeyen seyreltme yöntemi: {method}")
+
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    # Sabit ya da tamamen boş kolonların seçecek tepesi yok; bütçe diğerlerine
+    columns = [y for y in columns if _varies(y)]
+    if not columns:
+        return np.unique(np.linspace(0, n - 1, max_points).astype(np.int64))
+
+    budget = max(max_points // len(columns), 3)
+    picks = []
+    for y in columns:
+        if method == "minmax":
+            picks.append(minmax_indices(y, budget))
+        else:
+            picks.append(lttb_indices(x, y, budget))
+
+    required = [0, n - 1]
+    required += [int(np.nanargmax(y)) for y in columns]
+    required += [int(np.nanargmin(y)) for y in columns]
+    return _clamp(required, np.unique(np.concatenate(picks)), max_points)
+
+
+def downsample_rows(rows: list, max_points: int | None, fields, x_field: str = "ts", method: str = DOWNSAMPLE_METHOD) -> list:
+    """
+    Satır listesini (ORM nesnesi, namedtuple ya da dict) seyreltir; satırlar
+    x_field sırasında olmalı. max_points None ise liste aynen döner.
+    """
+    if max_points is None or len(rows) <= max_points:
+        return rows
+
+    get = (lambda r, f: r[f]) if isinstance(rows[0], dict) else getattr
+
+    x = [get(r, x_field) for r in rows]
+    if x and not isinstance(x[0], (int, float)):
+        # datetime → epoch saniye (yalnız sıra / aralık için)
+        x = np.asarray(x, dtype="datetime64[us]").astype(np.int64) / 1e6
+    columns = [
+        np.array([get(r, f) for r in rows], dtype=np.float64)   # None → NaN
+        for f in fields
+    ]
+
+    return [rows[i] for i in downsample_indices(np.asarray(x, dtype=np.float64), columns, max_points, method)]
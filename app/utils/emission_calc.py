@@ -1,8 +1,34 @@
-import math
+import os
 
+import numpy as np
 
-# Türkiye için ortalama elektrik karışımı (kg CO2 / kWh)
-CO2_FACTOR_TR = 0.42
+from app.utils.carbon_intensity import get_region, intensity_at
+
+# Karbon yoğunlukları (kg CO2 / kWh) bölge ve zamana göre
+# app/utils/carbon_intensity.py kaydından okunur.
+
+# -----------------------------
+# Enerji entegrasyonu ayarları
+# -----------------------------
+# "trapezoid": (P0 + P1) / 2 * Δt     "left": P0 * Δt (sol Riemann toplamı)
+ENERGY_RULE = os.getenv("ENERGY_RULE", "trapezoid")
+# İki örnek arası bundan uzunsa (istemci kopması vb.) boşluk bu süre sayılır.
+# 0 = sınırsız (varsayılan): örnekleme aralığı istemciye göre değişir, sabit
+# bir sınır yavaş örnekleyen istemcilerin enerjisini sessizce kırpar.
+ENERGY_MAX_GAP_S = float(os.getenv("ENERGY_MAX_GAP_S", "0"))
+
+RULES = ("trapezoid", "left")
+
+# -----------------------------
+# Güç bileşenleri (monitor ile aynı yaklaşık değerler)
+# -----------------------------
+BASE_W = 8.0                    # laptop boşta taban güç (yaklaşık)
+CPU_TDP_W = 45.0                # laptop CPU için yaklaşık
+RAM_W_PER_GB = 0.35             # yaklaşık
+
+# Emisyon kayıtları sadece GPU gücünden hesaplanır
+DEFAULT_COMPONENTS = ("gpu",)
+ALL_COMPONENTS = ("gpu", "cpu", "ram", "base")
 
 
 def power_to_kwh(power_watts: float, duration_seconds: float) -> float:
@@ -17,43 +43,189 @@ def power_to_kwh(power_watts: float, duration_seconds: float) -> float:
     return kwh
 
 
-def calculate_emission(kwh: float, region: str = "TR") -> float:
+# ============================
+# NumPy entegrasyon motoru
+# ============================
+def to_epoch_seconds(ts) -> np.ndarray:
+    """datetime listesi ya da datetime64 dizisi → float64 epoch saniye."""
+    arr = np.asarray(ts, dtype="datetime64[us]")
+    return arr.astype(np.int64) / 1e6
+
+
+def _as_float(values, n: int) -> np.ndarray:
+    """None / NaN → 0 olan float64 dizi; values None ise sıfırlar."""
+    if values is None:
+        return np.zeros(n)
+    arr = np.asarray(values, dtype=np.float64)
+    return np.nan_to_num(arr, nan=0.0)
+
+
+def component_power_w(
+    gpu_power_w,
+    cpu_util=None,
+    mem_used_mb=None,
+    components=DEFAULT_COMPONENTS,
+) -> np.ndarray:
     """
-    kWh → CO2 (kg)
-    Şimdilik sadece Türkiye için hesaplama yapıyoruz.
+    Seçilen bileşenlerin toplam gücü (W):
+        gpu  : ölçülen GPU gücü
+        cpu  : CPU_TDP_W * kullanım%
+        ram  : RAM_W_PER_GB * kullanılan GB
+        base : sabit BASE_W
+    """
+    gpu = np.nan_to_num(np.asarray(gpu_power_w, dtype=np.float64), nan=0.0)
+    n = len(gpu)
+    total = np.zeros(n)
+
+    if "gpu" in components:
+        total += gpu
+    if "cpu" in components:
+        total += CPU_TDP_W * _as_float(cpu_util, n) / 100.0
+    if "ram" in components:
+        total += RAM_W_PER_GB * _as_float(mem_used_mb, n) / 1024.0
+    if "base" in components:
+        total += BASE_W
+
+    return total
+
+
+def _check_rule(rule: str):
+    if rule not in RULES:
+        raise ValueError(f"Bilinmeyen entegrasyon kuralı: {rule}")
+
+
+def _intervals(ts_s: np.ndarray, max_gap_s: float) -> np.ndarray:
+    """Ardışık örnekler arası süreler; negatifler 0, uzun boşluklar max_gap_s."""
+    dt = np.diff(ts_s)
+    upper = max_gap_s if max_gap_s > 0 else np.inf
+    return np.clip(dt, 0.0, upper)
+
+
+def interval_energies_wh(
+    ts_s: np.ndarray,
+    power_w: np.ndarray,
+    rule: str = ENERGY_RULE,
+    max_gap_s: float = ENERGY_MAX_GAP_S,
+) -> np.ndarray:
+    """n örnek için n-1 aralığın enerjisi (Wh). Örnekler ts sırasında olmalı."""
+    _check_rule(rule)
+    dt = _intervals(ts_s, max_gap_s)
+    if rule == "left":
+        return power_w[:-1] * dt / 3600.0
+    return (power_w[:-1] + power_w[1:]) / 2.0 * dt / 3600.0
+
+
+def integrate_energy_wh(ts_s, power_w, rule: str = ENERGY_RULE, max_gap_s: float = ENERGY_MAX_GAP_S) -> float:
+    if len(ts_s) < 2:
+        return 0.0
+    return float(interval_energies_wh(ts_s, power_w, rule, max_gap_s).sum())
+
+
+def cumulative_energy_wh(ts_s, power_w, rule: str = ENERGY_RULE, max_gap_s: float = ENERGY_MAX_GAP_S) -> np.ndarray:
+    """Her örnek anındaki kümülatif enerji (Wh); ilk eleman 0."""
+    out = np.zeros(len(ts_s))
+    if len(ts_s) >= 2:
+        np.cumsum(interval_energies_wh(ts_s, power_w, rule, max_gap_s), out=out[1:])
+    return out
+
+
+def count_gaps(ts_s, max_gap_s: float = ENERGY_MAX_GAP_S) -> int:
+    """max_gap_s'ten uzun boşluk sayısı (bu aralıklar kırpılarak sayılır)."""
+    if max_gap_s <= 0 or len(ts_s) < 2:
+        return 0
+    return int((np.diff(ts_s) > max_gap_s).sum())
+
+
+def integrate_runs(
+    run_ids,
+    ts_s,
+    power_w,
+    rule: str = ENERGY_RULE,
+    max_gap_s: float = ENERGY_MAX_GAP_S,
+) -> dict[int, float]:
+    """
+    Birden fazla run'ın örneklerini tek seferde entegre eder:
+    {run_id: enerji_Wh}. Girdi sıralı olmak zorunda değildir; (run_id, ts)
+    ile sıralanır, run sınırlarını aşan aralıklar sayılmaz.
+    """
+    run_ids = np.asarray(run_ids)
+    if len(run_ids) == 0:
+        return {}
+
+    order = np.lexsort((ts_s, run_ids))
+    runs = run_ids[order]
+    energies = interval_energies_wh(np.asarray(ts_s)[order], np.asarray(power_w)[order], rule, max_gap_s)
+    energies[runs[1:] != runs[:-1]] = 0.0
+
+    unique, inverse = np.unique(runs, return_inverse=True)
+    totals = np.bincount(inverse[1:], weights=energies, minlength=len(unique))
+    return {int(r): float(e) for r, e in zip(unique, totals)}
+
+
+def series_arrays(metrics: list, components=DEFAULT_COMPONENTS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Metrik satırlarından (ts sıralı) (epoch saniye, güç W) dizileri.
+    cpu / ram bileşenleri istenirse satırlarda cpu_util / mem_used_mb olmalı.
+    """
+    rows = [m for m in metrics if m.ts is not None]
+    ts_s = to_epoch_seconds([m.ts for m in rows])
+    power = component_power_w(
+        [m.gpu_power_w for m in rows],
+        [m.cpu_util for m in rows] if "cpu" in components else None,
+        [m.mem_used_mb for m in rows] if "ram" in components else None,
+        components,
+    )
+    return ts_s, power
+
+
+def calculate_emission(kwh: float, region: str = "TR", ts_s: float | None = None) -> float:
+    """
+    kWh → CO2 (kg), bölgenin ts_s anındaki (verilmezse şu anki) yoğunluğuyla.
+    Zaman serisi olan hesaplarda emission_for_series kullanılmalı.
     """
     if kwh <= 0:
         return 0.0
 
-    if region == "TR":
-        return kwh * CO2_FACTOR_TR
+    return kwh * get_region(region).at_one(ts_s)
+
 
-    # İleride farklı bölgeler eklenebilir
-    return kwh * CO2_FACTOR_TR
+def emission_for_series(
+    ts_s,
+    power_w,
+    region: str = "TR",
+    rule: str = ENERGY_RULE,
+    max_gap_s: float = ENERGY_MAX_GAP_S,
+) -> tuple[float, float]:
+    """
+    (enerji_Wh, CO2_kg): her aralığın enerjisi, aralığın başladığı anda
+    geçerli karbon yoğunluğuyla çarpılır.
+    """
+    if len(ts_s) < 2:
+        return 0.0, 0.0
+    energies = interval_energies_wh(ts_s, power_w, rule, max_gap_s)
+    factors = intensity_at(region, ts_s[:-1])
+    return float(energies.sum()), float((energies * factors).sum() / 1000.0)
 
 
-def compute_run_energy_and_emission(metrics: list, region: str = "TR"):
+def compute_run_energy_and_emission(
+    metrics: list,
+    region: str = "TR",
+    rule: str = ENERGY_RULE,
+    max_gap_s: float = ENERGY_MAX_GAP_S,
+):
     """
     Bir run'a ait tüm metriklerden enerji & karbon hesabı yapar.
 
     Formül:
-        Her ölçümün GPU gücü (gpu_power_w) 3 saniyelik tüketim olarak kabul edilir.
-        Total_energy_kWh = Σ(power * 3s)
-        CO2 = Total_energy_kWh * CO2_FACTOR
+        Örnekler arası gerçek zaman farklarıyla GPU gücü entegre edilir
+        (varsayılan yamuk kuralı, uzun boşluklar max_gap_s ile sınırlanır).
+        CO2 = Σ aralık_enerjisi_kWh * o andaki bölge yoğunluğu
     """
 
     if not metrics or len(metrics) == 0:
         return 0.0, 0.0
 
-    total_energy_kwh = 0.0
-
-    # Her metric 3 saniyelik aralıkla geliyor
-    INTERVAL_SECONDS = 3
-
-    for m in metrics:
-        power = m.gpu_power_w or 0
-        total_energy_kwh += power_to_kwh(power, INTERVAL_SECONDS)
-
-    emission_kg = calculate_emission(total_energy_kwh, region)
+    ts_s, power = series_arrays(metrics)
+    energy_wh, emission_kg = emission_for_series(ts_s, power, region, rule, max_gap_s)
 
-    return total_energy_kwh, emission_kg
+    return energy_wh / 1000.0, emission_kg
@@ -0,0 +1,258 @@
+# app/utils/export.py
+"""
+Run metriklerinin akış halinde dışa aktarımı (CSV / NDJSON / Parquet).
+
+/metrics/by_run tüm seriyi belleğe alır; burada satırlar
+EXPORT_CHUNK_ROWS'luk parçalar halinde okunur, kodlanır ve hemen
+gönderilir, bu yüzden bellek kullanımı run boyutundan bağımsızdır:
+
+  - Ham metrikler yield_per ile okunur (Postgres'te server-side cursor,
+    stream_results); sorgu (run_id, ts) index'i üzerinden ts sırasıyla gider.
+  - Arşivlenmiş run'lar (bkz. app/utils/archive.py) arşivden parça parça
+    okunur; ham satırları silinmiş olsa da dışa aktarılabilir.
+  - gzip=True ile çıktı akış halinde gzip'lenir (.gz dosyası).
+  - Parquet her parçayı bir row group olarak yazar (pyarrow,
+    app/requirements.txt).
+
+Kullanım: GET /runs/{id}/export, GET /runs/export (çok run / tarih aralığı)
+ve python -m app.cli export.
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.archive import load_archived_columns, load_archived_series
+from app.utils.fast_json import dumps
+from app.utils.series import SERIES_COLUMNS, run_series_query, run_time_window
+
+try:  # requirements'ta var; kurulu değilse parquet 400 ile reddedilir
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+EXPORT_COLUMNS = SERIES_COLUMNS
+EXPORT_NAMES = tuple(c.key for c in EXPORT_COLUMNS)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def check_format(fmt: str, gzip: bool = False):
+    """Desteklenmeyen biçimde ValueError (akış başlamadan çağrılır)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Bilinmeyen format: {fmt} (seçenekler: {', '.join(EXPORT_FORMATS)})")
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise ValueError("parquet için 'pyarrow' paketi kurulu değil")
+        if gzip:
+            raise ValueError("parquet kendi içinde sıkıştırılır; gzip ile birlikte kullanılamaz")
+
+
+def export_filename(name: str, fmt: str, gzip: bool = False) -> str:
+    return f"{name}.{fmt}" + (".gz" if gzip else "")
+
+
+# ============================
+# Okuma
+# ============================
+def select_run_ids(
+    db: Session,
+    run_ids: Optional[list[int]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    model_name: Optional[str] = None,
+) -> list[int]:
+    """Dışa aktarılacak run'lar (id sırasıyla); zaman aralığıyla kesişenler."""
+    query = select(models.Run.id)
+    if run_ids:
+        query = query.where(models.Run.id.in_(run_ids))
+    if model_name:
+        query = query.where(models.Run.model_name == model_name)
+    if until is not None:
+        query = query.where(models.Run.started_at < until)
+    if since is not None:
+        query = query.where(or_(models.Run.ended_at.is_(None), models.Run.ended_at >= since))
+    return list(db.execute(query.order_by(models.Run.id)).scalars())
+
+
+def _window(run, since, until):
+    start, end = run_time_window(run)
+    if since is not None and (start is None or since > start):
+        start = since
+    if until is not None and (end is None or until < end):
+        end = until
+    return start, end
+
+
+def _archived_chunks(db: Session, run, start, end, chunk_rows: int) -> Optional[Iterator[list]]:
+    data = load_archived_columns(db, run.id)
+    if data is None:
+        return None
+
+    mask = np.ones(len(data["id"]), dtype=bool)
+    if start is not None:
+        mask &= data["ts"] >= np.datetime64(start, "us")
+    if end is not None:
+        mask &= data["ts"] < np.datetime64(end, "us")
+    index = np.flatnonzero(mask)
+    index = index[np.argsort(data["ts"][index], kind="stable")]
+
+    def chunks():
+        for i in range(0, len(index), chunk_rows):
+            yield load_archived_series(db, run.id, EXPORT_COLUMNS, index[i:i + chunk_rows])
+    return chunks()
+
+
+def iter_row_chunks(
+    db: Session,
+    run_ids: Iterable[int],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[list]:
+    """Run'ların satırlarını (EXPORT_COLUMNS sırasında) parça parça döner."""
+    for run_id in run_ids:
+        run = db.get(models.Run, run_id)
+        if run is None:
+            continue
+        start, end = _window(run, since, until)
+
+        archived = _archived_chunks(db, run, start, end, chunk_rows) if run.ended_at is not None else None
+        if archived is not None:
+            yield from archived
+            continue
+
+        result = db.execute(
+            run_series_query(run.id, EXPORT_COLUMNS, start, end),
+            execution_options={"yield_per": chunk_rows},
+        )
+        for partition in result.partitions():
+            yield partition
+        # Run'lar arasında kimlik haritası büyümesin
+        db.expunge_all()
+
+
+# ============================
+# Kodlama
+# ============================
+_TS = EXPORT_NAMES.index("ts")
+
+
+def encode_csv(chunks: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_NAMES)
+    yield buffer.getvalue().encode()
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (*row[:_TS], row[_TS].isoformat(), *row[_TS + 1:]) for row in rows
+        )
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(chunks: Iterable[list]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(dumps(dict(zip(EXPORT_NAMES, row))) + b"\n" for row in rows)
+
+
+class _DrainSink:
+    """pyarrow'un yazdığı baytları biriktirir; her row group sonrası boşaltılır."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def encode_parquet(chunks: Iterable[list]) -> Iterator[bytes]:
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("run_id", pyarrow.int64()),
+        ("ts", pyarrow.timestamp("us")),
+        ("cpu_util", pyarrow.float64()),
+        ("gpu_util", pyarrow.float64()),
+        ("gpu_power_w", pyarrow.float64()),
+        ("mem_used_mb", pyarrow.float64()),
+    ])
+    sink = _DrainSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in chunks:
+            columns = zip(*rows)
+            table = pyarrow.Table.from_arrays(
+                [pyarrow.array(col, type=field.type) for col, field in zip(columns, schema)],
+                schema=schema,
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+def gzip_stream(parts: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # 31: gzip başlığı
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(
+    db: Session,
+    run_ids: Iterable[int],
+    fmt: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Seçilen biçimde bayt parçaları; boş parçalar atlanır."""
+    parts = ENCODERS[fmt](iter_row_chunks(db, run_ids, since, until, chunk_rows))
+    if gzip:
+        parts = gzip_stream(parts)
+    for part in parts:
+        if part:
+            yield part
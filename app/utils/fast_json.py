@@ -0,0 +1,64 @@
+# app/utils/fast_json.py
+"""
+Seri uçları için kolon bazlı (columnar) JSON cevabı.
+
+Varsayılan cevap satır başına bir sözlük (ya da MetricResponse) üretir ve
+standart JSON kodlayıcıdan geçirir; 100k noktalı run'larda sürenin çoğu
+burada geçer. shape=columnar ile aynı veri kolon başına bir liste olarak
+döner:
+
+    {"id": [...], "ts": [...], "cpu_util": [...], ...}
+
+Kolonlar sorgu sonucundaki tuple'lardan tek bir zip(*rows) ile çıkarılır;
+satır başına sözlük / model oluşturulmaz. Kodlama orjson ile yapılır
+(app/requirements.txt; datetime ve NumPy dizileri doğrudan desteklenir).
+orjson kurulu değilse standart json'a düşülür; hangisinin kullanıldığı
+ENCODER'da görünür.
+"""
+import json
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:  # requirements'ta var; kurulu değilse standart json
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+SHAPES = ("rows", "columnar")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """jsonable_encoder / response_model doğrulamasından geçmeyen JSON cevabı."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def to_columns(rows: list, names, keys: dict | None = None) -> dict:
+    """
+    Tuple benzeri satırları (kolonlar names sırasında) {ad: kolon} sözlüğüne
+    çevirir. keys ile kolonlar cevapta başka adla döner (ör. cpu_util → cpu).
+    """
+    keys = keys or {}
+    columns = zip(*rows) if rows else [()] * len(names)
+    return {keys.get(name, name): column for name, column in zip(names, columns)}
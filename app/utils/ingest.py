@@ -0,0 +1,264 @@
+# app/utils/ingest.py
+"""
+Metrik yazma yolu (ingestion) için ortak yardımcılar.
+
+Tekil /metrics/ ve toplu /metrics/batch endpoint'leri aynı fonksiyonları
+kullanır; böylece run kontrolü ve INSERT tek bir yerde yapılır.
+
+JSON yolları satır sözlükleriyle (store_metrics), ikili paketler kolon
+dizileriyle (store_metric_columns) yazar; türetilmiş özetler her iki yolda
+da kolonlar üzerinden güncellenir.
+
+Yazılan örnekler transaction commit edildikten sonra canlı akış merkezine
+(app/utils/pubsub.py, konu "run:<id>") yayınlanır.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.dashboard_summary import update_metric_summary
+from app.utils.pubsub import hub
+from app.utils.rollups import update_rollups
+from app.utils.run_energy import update_run_energy
+from app.utils.series import TS_WINDOW_SLACK
+
+# Bir toplu istekte kabul edilen en fazla örnek sayısı
+MAX_BATCH_SIZE = 5000
+# İkili (packed) pakette satır başına nesne olmadığı için sınır daha yüksek
+MAX_PACKED_BATCH_SIZE = 100_000
+
+METRIC_FIELDS = ("run_id", "ts", "cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+VALUE_FIELDS = METRIC_FIELDS[2:]
+
+
+def to_naive_utc(ts: datetime | None) -> datetime:
+    """
+    İstemciden gelen zaman damgasını DB'deki gibi (naive, UTC) hale getirir.
+    ts yoksa sunucu saati kullanılır.
+    """
+    if ts is None:
+        return datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class RunState(NamedTuple):
+    is_open: bool
+    started_at: datetime | None
+
+
+def load_run_states(db: Session, run_ids) -> dict[int, RunState]:
+    """
+    Verilen run id'leri için tek sorguda {run_id: RunState} sözlüğü döner.
+    Sözlükte olmayan id'ler veritabanında yoktur.
+    """
+    ids = set(run_ids)
+    if not ids:
+        return {}
+
+    rows = db.execute(
+        select(models.Run.id, models.Run.started_at, models.Run.ended_at)
+        .where(models.Run.id.in_(ids))
+    ).all()
+    return {row.id: RunState(row.ended_at is None, row.started_at) for row in rows}
+
+
+def sample_ts_bounds(state: RunState) -> tuple[datetime | None, datetime]:
+    """
+    Bir run için kabul edilen örnek zaman aralığı. Okuma sorguları da aynı
+    pencereyi kullandığından (bkz. series.run_time_window) bu aralığın
+    dışındaki örnekler kabul edilmez.
+    """
+    lower = state.started_at - TS_WINDOW_SLACK if state.started_at else None
+    return lower, datetime.utcnow() + TS_WINDOW_SLACK
+
+
+def check_sample(state: RunState | None, ts: datetime) -> str | None:
+    """Örnek kabul edilebilirse None, değilse ret sebebini döner."""
+    if state is None:
+        return "Run bulunamadı"
+    if not state.is_open:
+        return "Run sonlandırılmış"
+
+    lower, upper = sample_ts_bounds(state)
+    if (lower is not None and ts < lower) or ts > upper:
+        return "Zaman damgası run aralığının dışında"
+    return None
+
+
+def rows_to_columns(rows: list[dict]) -> dict:
+    """
+    Satır sözlüklerini türetilmiş özetlerin kullandığı kolonlara çevirir:
+    run_id int64, ts datetime64[us], değerler float64 (None → NaN).
+    """
+    return {
+        "run_id": np.fromiter((r["run_id"] for r in rows), dtype=np.int64, count=len(rows)),
+        "ts": np.array([r["ts"] for r in rows], dtype="datetime64[us]"),
+        **{
+            name: np.array([r.get(name) for r in rows], dtype=np.float64)
+            for name in VALUE_FIELDS
+        },
+    }
+
+
+def _nullable(values: np.ndarray) -> list:
+    """float64 kolon → Python listesi (NaN → None)."""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def bulk_insert_metrics(db: Session, rows: list[dict]) -> list:
+    """
+    Satırları tek bir çok satırlı INSERT ile yazar ve (id, ts) listesini
+    girdi sırasıyla döner. commit çağırmaz; transaction çağırana aittir.
+    """
+    if not rows:
+        return []
+
+    stmt = insert(models.Metric).returning(
+        models.Metric.id,
+        models.Metric.ts,
+        sort_by_parameter_order=True,
+    )
+    return db.execute(stmt, rows).all()
+
+
+# Postgres: id'ler önce sequence'ten ayrılır ve satırlara girdi sırasıyla
+# verilir; INSERT'e açıkça yazıldığından RETURNING / sequence sırasına
+# güvenilmez. Her kolon tek bir dizi parametresi, satır sayısından bağımsız
+# tek ifade. (Bölümlü tablo da aynı sequence'i kullanır, bkz. partitions.py.)
+_ALLOCATE_IDS = text("SELECT nextval('metrics_id_seq') FROM generate_series(1, :n)")
+
+_UNNEST_INSERT = text(
+    f"INSERT INTO {models.Metric.__tablename__} (id, {', '.join(METRIC_FIELDS)}) "
+    "SELECT * FROM unnest("
+    "CAST(:id AS integer[]), CAST(:run_id AS integer[]), CAST(:ts AS timestamp[]), "
+    "CAST(:cpu_util AS double precision[]), CAST(:gpu_util AS double precision[]), "
+    "CAST(:gpu_power_w AS double precision[]), CAST(:mem_used_mb AS double precision[])"
+    ")"
+)
+
+# SQLite: sürücünün executemany'si tuple'larla (ifade bir kez hazırlanır).
+# Her satırın id'si açıkça o anki en büyük id + 1'dir; transaction yazma
+# kilidini tuttuğundan araya başka satır giremez, id'ler ardışıktır.
+_EXECUTEMANY_INSERT = (
+    f"INSERT INTO {models.Metric.__tablename__} (id, {', '.join(METRIC_FIELDS)}) "
+    f"VALUES ((SELECT IFNULL(MAX(id), 0) + 1 FROM {models.Metric.__tablename__}), "
+    f"{', '.join('?' * len(METRIC_FIELDS))})"
+)
+
+
+def bulk_insert_metric_columns(db: Session, columns: dict) -> list[int]:
+    """
+    Kolon dizilerini (bkz. rows_to_columns) satır sözlüğü oluşturmadan yazar;
+    eklenen id'leri girdi sırasıyla döner. commit çağırmaz.
+    """
+    n = len(columns["run_id"])
+    if not n:
+        return []
+
+    params = {
+        "run_id": columns["run_id"].tolist(),
+        "ts": columns["ts"].astype("datetime64[us]").tolist(),
+        **{name: _nullable(columns[name]) for name in VALUE_FIELDS},
+    }
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        ids = sorted(db.execute(_ALLOCATE_IDS, {"n": n}).scalars())
+        db.execute(_UNNEST_INSERT, {"id": ids, **params})
+        return ids
+
+    if dialect == "sqlite":
+        # ts, SQLAlchemy'nin SQLite DateTime biçimiyle aynı metin (mikro saniye her zaman var)
+        params["ts"] = np.char.replace(np.datetime_as_string(columns["ts"], unit="us"), "T", " ").tolist()
+        conn = db.connection()
+        conn.exec_driver_sql(_EXECUTEMANY_INSERT, list(zip(*(params[name] for name in METRIC_FIELDS))))
+        last_id = conn.execute(select(func.max(models.Metric.id))).scalar_one()
+        return list(range(last_id - n + 1, last_id + 1))
+
+    rows = [dict(zip(METRIC_FIELDS, values)) for values in zip(*(params[name] for name in METRIC_FIELDS))]
+    return [row.id for row in bulk_insert_metrics(db, rows)]
+
+
+def _update_derived(db: Session, columns: dict, ids: list[int]):
+    """Türetilmiş özetler (rollup, run enerji toplamı, panel sayaçları) ve canlı yayın."""
+    update_rollups(db, columns)
+    update_run_energy(db, columns)
+    update_metric_summary(db, columns)
+    db.info.setdefault("live_events", []).append((columns, ids))
+
+
+def store_metrics(db: Session, rows: list[dict]) -> list:
+    """
+    Satır sözlükleriyle gelen ingest yollarının (tekil, JSON toplu, kuyruk)
+    yazma fonksiyonu: ham satırları ekler ve türetilmiş özetleri aynı
+    transaction'da günceller.
+    (id, ts) listesi döner; commit çağırmaz.
+    """
+    inserted = bulk_insert_metrics(db, rows)
+    if inserted:
+        _update_derived(db, rows_to_columns(rows), [row.id for row in inserted])
+    return inserted
+
+
+def store_metric_columns(db: Session, columns: dict) -> list[int]:
+    """
+    store_metrics'in kolon karşılığı (ikili paketler): diziler doğrudan
+    INSERT'e verilir, satır başına sözlük oluşturulmaz.
+    Eklenen id listesini döner; commit çağırmaz.
+    """
+    ids = bulk_insert_metric_columns(db, columns)
+    if ids:
+        _update_derived(db, columns, ids)
+    return ids
+
+
+# ============================
+# Canlı akış yayını (commit sonrası)
+# ============================
+def run_topic(run_id: int) -> str:
+    return f"run:{run_id}"
+
+
+def live_points(columns: dict, ids: list[int]) -> dict[int, list[dict]]:
+    """Kolonlardan run başına /runs/{id}/live ile aynı biçimde noktalar."""
+    by_run: dict = defaultdict(list)
+    ts = columns["ts"].astype("datetime64[us]").tolist()
+    values = [_nullable(columns[name]) for name in ("cpu_util", "gpu_util", "mem_used_mb", "gpu_power_w")]
+    for run_id, metric_id, t, cpu, gpu, ram, power in zip(columns["run_id"].tolist(), ids, ts, *values):
+        by_run[run_id].append({
+            "id": metric_id,
+            "time": t.isoformat(),
+            "cpu": cpu,
+            "gpu": gpu,
+            "ram": ram,
+            "power": power,
+        })
+    return by_run
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_live_events(session: Session):
+    staged = session.info.pop("live_events", None)
+    if not staged:
+        return
+
+    by_run: dict = defaultdict(list)
+    for columns, ids in staged:
+        for run_id, points in live_points(columns, ids).items():
+            by_run[run_id].extend(points)
+
+    # Olay id'si = paketteki en büyük metrik id'si (Last-Event-ID / since imleci)
+    for run_id, points in by_run.items():
+        hub.publish(run_topic(run_id), "metrics", {"points": points}, event_id=max(p["id"] for p in points))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_live_events(session: Session):
+    session.info.pop("live_events", None)
@@ -0,0 +1,323 @@
+# app/utils/ingest_queue.py
+"""
+Metrikler için write-behind kuyruğu (group commit).
+
+create_metric, kuyruk açıksa örneği doğrudan DB'ye yazmak yerine bu sınırlı
+kuyruğa koyar. Arka plandaki flusher thread kuyruğu her FLUSH_INTERVAL_MS'de
+bir (ya da FLUSH_MAX_ROWS satır birikince) boşaltır ve hepsini tek bir toplu
+INSERT + tek commit ile yazar.
+
+Dayanıklılık modu (INGEST_DURABILITY):
+  - "enqueue": örnek kuyruğa girince cevap dönülür (en hızlısı, süreç çökerse
+    kuyruktaki örnekler kaybolur)
+  - "flush":   örnek DB'ye yazılana kadar beklenir (varsayılan). İstek
+    thread tutmaz: endpoint async'tir ve flusher sonucu asyncio future'ına
+    call_soon_threadsafe ile bildirir.
+
+Bekleme süresi dolarsa ve örnek henüz flush'a alınmadıysa iptal edilir
+(hiç yazılmaz, istemci güvenle tekrar dener); flush'a alınmışsa yazılacağı
+kesindir, istemciye 202 döner. Toplu INSERT hata verirse grup satır satır
+tekrar yazılır; sadece hatalı satırlar hata alır.
+
+barrier(), o ana kadar kuyruğa giren örneklerin hepsi yazılana (ya da
+iptal edilene) kadar bekler; stop_run emisyonu bundan sonra hesaplar.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from app.database import SessionLocal
+from app.utils.ingest import store_metrics
+
+# -----------------------------
+# Ayarlar (env ile değiştirilebilir)
+# -----------------------------
+INGEST_QUEUE_ENABLED = os.getenv("INGEST_QUEUE_ENABLED", "0") == "1"
+INGEST_DURABILITY = os.getenv("INGEST_DURABILITY", "flush")   # "enqueue" | "flush"
+
+QUEUE_MAX_SIZE = int(os.getenv("INGEST_QUEUE_MAX_SIZE", "10000"))
+FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "200"))
+FLUSH_MAX_ROWS = int(os.getenv("INGEST_FLUSH_MAX_ROWS", "1000"))
+
+# "flush" modunda bir isteğin en fazla bekleyeceği süre
+FLUSH_WAIT_TIMEOUT_S = 10.0
+
+
+# PendingMetric durumları
+QUEUED, FLUSHING, CANCELLED = "queued", "flushing", "cancelled"
+
+_state_lock = threading.Lock()
+
+
+class PendingMetric:
+    """Kuyruktaki tek örnek; flush sonrası id/ts ya da hata burada doldurulur."""
+
+    __slots__ = ("row", "done", "id", "ts", "error", "state", "seq", "_loop", "_future")
+
+    def __init__(self, row: Dict[str, Any], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.row = row
+        self.done = threading.Event()
+        self.id: Optional[int] = None
+        self.ts = None
+        self.error: Optional[str] = None
+        self.state = QUEUED
+        self.seq = 0
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+
+    def wait(self, timeout: float = FLUSH_WAIT_TIMEOUT_S) -> bool:
+        return self.done.wait(timeout)
+
+    async def wait_async(self, timeout: float = FLUSH_WAIT_TIMEOUT_S) -> bool:
+        """Event loop'u bloklamadan bekler (submit'e loop verilmiş olmalı)."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def claim(self) -> bool:
+        """Flusher için: iptal edilmediyse örneği flush'a alır."""
+        with _state_lock:
+            if self.state != QUEUED:
+                return False
+            self.state = FLUSHING
+            return True
+
+    def cancel(self) -> bool:
+        """Bekleyen için: henüz flush'a alınmadıysa iptal eder (hiç yazılmaz)."""
+        with _state_lock:
+            if self.state != QUEUED:
+                return False
+            self.state = CANCELLED
+            return True
+
+    def _complete(self):
+        self.done.set()
+        if self._future is not None:
+            try:
+                self._loop.call_soon_threadsafe(_resolve, self._future)
+            except RuntimeError:
+                pass   # loop kapanmış: bekleyen istek kalmadı
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        maxsize: int = QUEUE_MAX_SIZE,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        flush_max_rows: int = FLUSH_MAX_ROWS,
+    ):
+        self._queue: "queue.Queue[PendingMetric]" = queue.Queue(maxsize=maxsize)
+        self._flush_interval_s = flush_interval_ms / 1000.0
+        self._flush_max_rows = flush_max_rows
+
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # Sayaçlar
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._flushed_rows = 0
+        self._flushes = 0
+        self._dropped = 0
+        self._failed_rows = 0
+        self._cancelled = 0
+        self._row_retries = 0
+        self._last_flush_ms = 0.0
+        self._flush_ms_window: deque = deque(maxlen=1000)
+
+        # barrier() için: kuyruğa giren son örneğin ve işi biten son örneğin
+        # sıra numarası (tek flusher FIFO sırasıyla yazar)
+        self._progress = threading.Condition()
+        self._last_seq = 0
+        self._done_seq = 0
+
+    # -----------------------------
+    # Yazma tarafı
+    # -----------------------------
+    def submit(
+        self,
+        row: Dict[str, Any],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Optional[PendingMetric]:
+        """
+        Örneği kuyruğa koyar. Kuyruk doluysa örnek düşürülür ve None döner
+        (çağıran 503 ile cevap vermeli). loop verilirse sonuç wait_async ile
+        beklenebilir.
+        """
+        self._ensure_started()
+
+        pending = PendingMetric(row, loop)
+        with self._progress:
+            try:
+                self._queue.put_nowait(pending)
+            except queue.Full:
+                with self._stats_lock:
+                    self._dropped += 1
+                return None
+            self._last_seq += 1
+            pending.seq = self._last_seq
+
+        with self._stats_lock:
+            self._enqueued += 1
+        return pending
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flusher_loop, daemon=True)
+                self._thread.start()
+
+    # -----------------------------
+    # Flusher thread
+    # -----------------------------
+    def _flusher_loop(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+
+        # Kapanışta kuyrukta kalanları da yaz
+        while True:
+            batch = self._drain_nowait()
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _collect_batch(self) -> list[PendingMetric]:
+        try:
+            first = self._queue.get(timeout=self._flush_interval_s)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self._flush_interval_s
+
+        while len(batch) < self._flush_max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _drain_nowait(self) -> list[PendingMetric]:
+        batch: list[PendingMetric] = []
+        while len(batch) < self._flush_max_rows:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list[PendingMetric]):
+        t0 = time.perf_counter()
+        last_seq = batch[-1].seq
+
+        claimed = [p for p in batch if p.claim()]
+        with self._stats_lock:
+            self._cancelled += len(batch) - len(claimed)
+        batch = claimed
+
+        db = SessionLocal()
+        try:
+            inserted = store_metrics(db, [p.row for p in batch])
+            db.commit()
+
+            for pending, row in zip(batch, inserted):
+                pending.id = row.id
+                pending.ts = row.ts
+        except Exception:
+            db.rollback()
+            # Tek bir bozuk satır bütün grubu düşürmesin
+            self._flush_row_by_row(db, batch)
+        finally:
+            db.close()
+            for pending in batch:
+                pending._complete()
+            with self._progress:
+                self._done_seq = max(self._done_seq, last_seq)
+                self._progress.notify_all()
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with self._stats_lock:
+            self._flushes += 1
+            self._flushed_rows += sum(1 for p in batch if p.error is None)
+            self._last_flush_ms = elapsed_ms
+            self._flush_ms_window.append(elapsed_ms)
+
+    def _flush_row_by_row(self, db, batch: list[PendingMetric]):
+        failed = 0
+        for pending in batch:
+            try:
+                row = store_metrics(db, [pending.row])[0]
+                db.commit()
+                pending.id = row.id
+                pending.ts = row.ts
+            except Exception as e:
+                db.rollback()
+                pending.error = str(e)
+                failed += 1
+        with self._stats_lock:
+            self._row_retries += 1
+            self._failed_rows += failed
+
+    def barrier(self, timeout: float = FLUSH_WAIT_TIMEOUT_S) -> bool:
+        """
+        Çağrı anına kadar kuyruğa giren örneklerin hepsi yazılana (ya da
+        iptal edilene) kadar bekler. Kuyruk boşsa hemen döner; süre dolarsa False.
+        """
+        with self._progress:
+            target = self._last_seq
+            return self._progress.wait_for(lambda: self._done_seq >= target, timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Uygulama kapanırken kuyruğu boşaltıp thread'i durdurur."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -----------------------------
+    # İzleme
+    # -----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            window = sorted(self._flush_ms_window)
+            p99 = window[min(len(window) - 1, int(len(window) * 0.99))] if window else 0.0
+            return {
+                "enabled": INGEST_QUEUE_ENABLED,
+                "durability": INGEST_DURABILITY,
+                "queue_depth": self._queue.qsize(),
+                "queue_max_size": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "flushed_rows": self._flushed_rows,
+                "flushes": self._flushes,
+                "dropped": self._dropped,
+                "failed_rows": self._failed_rows,
+                "cancelled": self._cancelled,
+                "row_by_row_retries": self._row_retries,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "p99_flush_ms": round(p99, 3),
+            }
+
+
+# Uygulama genelinde tek kuyruk
+ingest_queue = IngestQueue()
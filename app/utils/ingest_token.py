@@ -0,0 +1,154 @@
+# app/utils/ingest_token.py
+"""
+Eğitim istemcileri için run'a özel, durumsuz (stateless) ingest token'ı.
+
+POST /runs/ yeni run için kısa ömürlü bir token üretir; istemci metrikleri
+X-Ingest-Token başlığıyla gönderir. Doğrulama sadece HMAC-SHA256 ve süre
+kontrolüdür: veritabanına gidilmez, Argon2 çalışmaz (yüzlerce işin aynı anda
+başladığı sweep'lerde /auth/login darboğaz olmaz).
+
+Biçim:  base64url(payload JSON) "." base64url(HMAC-SHA256(payload))
+payload: {"r": run_id, "d": device_id, "e": bitiş, "i": zincirin başlangıcı}
+(epoch sn)
+
+  - Token sadece kendi run'ına metrik yazabilir (kapsam dışı run → 403).
+  - Süresi dolmuş / imzası bozuk token → 401.
+  - Uzun run'larda istemci süresi dolmadan POST /runs/{id}/ingest-token ile
+    aynı kapsamda yeni token alır; token'ın süresi dolmuşsa (uzun kesinti)
+    aynı uç kullanıcı oturumuyla (Bearer) yeni token verir.
+  - Token ile yenileme zinciri sonsuza kadar sürmez: yenilenen token ilk
+    token'ın "i" değerini taşır ve bitişi i + INGEST_TOKEN_MAX_LIFETIME_S'i
+    geçemez. Bu sınırdan sonra yenileme kullanıcı oturumu ister (sızan bir
+    token kendini sürekli tazeleyemez; kullanıcının yetkisi geri alındıysa
+    zincir biter).
+  - REQUIRE_INGEST_TOKEN=1 ise başlıksız ingest istekleri 401 alır; varsayılan
+    kapalıdır (eski istemciler çalışmaya devam eder).
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.utils.auth import SECRET_KEY
+
+INGEST_TOKEN_HEADER = "X-Ingest-Token"
+INGEST_TOKEN_TTL_S = int(os.getenv("INGEST_TOKEN_TTL_S", str(6 * 3600)))
+# Token ile yenilemenin toplam ömrü (ilk token'dan itibaren); 0 = sınırsız
+INGEST_TOKEN_MAX_LIFETIME_S = int(os.getenv("INGEST_TOKEN_MAX_LIFETIME_S", str(7 * 24 * 3600)))
+REQUIRE_INGEST_TOKEN = os.getenv("REQUIRE_INGEST_TOKEN", "0") == "1"
+
+# Ayrı bir anahtar verilmezse oturum anahtarından türetilir (aynı anahtarla
+# imzalanan JWT'ler ingest token'ı yerine geçemesin)
+_SECRET = (
+    os.getenv("INGEST_TOKEN_SECRET")
+    or hmac.new(SECRET_KEY.encode(), b"ingest-token", hashlib.sha256).hexdigest()
+).encode()
+
+
+class IngestClaims:
+    def __init__(self, run_id: int, device_id: Optional[int], expires_at: int, issued_at: int):
+        self.run_id = run_id
+        self.device_id = device_id
+        self.expires_at = expires_at
+        # Yenileme zincirinin başladığı an (kullanıcı kimliğiyle alınan ilk token)
+        self.issued_at = issued_at
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode((data + "=" * (-len(data) % 4)).encode())
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+# ============================
+# Üretme / doğrulama
+# ============================
+def mint_ingest_token(
+    run_id: int,
+    device_id: Optional[int],
+    ttl_s: int = INGEST_TOKEN_TTL_S,
+    issued_at: Optional[int] = None,
+    max_lifetime_s: int = INGEST_TOKEN_MAX_LIFETIME_S,
+) -> tuple[str, int]:
+    """
+    (token, bitiş epoch saniyesi) döner. issued_at verilirse (token ile
+    yenileme) zincir ondan devam eder ve bitiş issued_at + max_lifetime_s'i
+    geçmez; verilmezse yeni zincir başlar.
+    """
+    now = int(time.time())
+    issued_at = now if issued_at is None else issued_at
+    expires_at = now + ttl_s
+    if max_lifetime_s > 0:
+        expires_at = min(expires_at, issued_at + max_lifetime_s)
+    body = json.dumps({"r": run_id, "d": device_id, "e": expires_at, "i": issued_at}, separators=(",", ":"))
+    payload = _b64encode(body.encode())
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def verify_ingest_token(token: str, now: Optional[float] = None) -> IngestClaims:
+    """İmza ve süreyi kontrol eder; geçersizse 401."""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError
+        data = json.loads(_b64decode(payload))
+        expires_at = int(data["e"])
+        # "i" olmayan eski token'lar: zincir bu token'la başlamış sayılır
+        issued_at = int(data.get("i", expires_at - INGEST_TOKEN_TTL_S))
+        claims = IngestClaims(int(data["r"]), data.get("d"), expires_at, issued_at)
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Geçersiz ingest token")
+
+    if claims.expires_at <= (time.time() if now is None else now):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Ingest token süresi dolmuş")
+    return claims
+
+
+def can_renew(claims: IngestClaims, now: Optional[float] = None, max_lifetime_s: int = INGEST_TOKEN_MAX_LIFETIME_S) -> bool:
+    """Token ile yenileme: zincir max_lifetime_s'i doldurmadıysa True."""
+    if max_lifetime_s <= 0:
+        return True
+    return (time.time() if now is None else now) < claims.issued_at + max_lifetime_s
+
+
+# ============================
+# Ingest uçları için
+# ============================
+def ingest_claims(request: Request) -> Optional[IngestClaims]:
+    """
+    Dependency: başlıktaki token'ın kapsamı; başlık yoksa None
+    (REQUIRE_INGEST_TOKEN açıksa 401).
+    """
+    token = request.headers.get(INGEST_TOKEN_HEADER)
+    if not token:
+        if REQUIRE_INGEST_TOKEN:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"{INGEST_TOKEN_HEADER} başlığı gerekli",
+            )
+        return None
+    return verify_ingest_token(token)
+
+
+def check_scope(claims: Optional[IngestClaims], run_ids: Iterable[int]):
+    """Token varsa tüm örnekler onun run'ına ait olmalı; değilse 403."""
+    if claims is None:
+        return
+    outside = sorted({int(r) for r in run_ids} - {claims.run_id})
+    if outside:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Ingest token bu run(lar) için geçerli değil: {', '.join(map(str, outside[:10]))}",
+        )
@@ -6,6 +6,7 @@ from datetime import datetime
 
 from app.database import SessionLocal
 from app import models
+from app.utils.ingest import store_metrics
 
 
 def get_gpu_stats():
@@ -67,7 +68,7 @@ def collect_metrics(run_id: int):
         mem_used_mb = mem.used / 1024 / 1024
 
         # DB kaydı
-        metric = models.Metric(
+        metric = dict(
             run_id=run_id,
             cpu_util=cpu_util,
             gpu_util=gpu_util,
@@ -75,7 +76,7 @@ def collect_metrics(run_id: int):
             mem_used_mb=mem_used_mb,
             ts=datetime.utcnow()
         )
-        db.add(metric)
+        store_metrics(db, [metric])
         db.commit()
 
         # Her 3 saniyede bir ölçüm al
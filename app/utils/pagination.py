@@ -0,0 +1,151 @@
+# app/utils/pagination.py
+"""
+Liste uçları için keyset (seek) sayfalama ve alan seçimi (projection).
+
+OFFSET yerine son satırın sıralama anahtarından devam edilir:
+    WHERE (sort_col, id) > (:son_deger, :son_id) ORDER BY sort_col, id LIMIT n
+Her sıralama seçeneği bir index ile karşılanır (bkz. models / migrations),
+bu yüzden sayfa ne kadar derinde olursa olsun sorgu maliyeti aynıdır ve
+araya yeni satır eklenmesi sayfaları kaydırmaz.
+
+İmleç, son satırın anahtarını ve sıralama adını taşıyan base64url JSON'dur;
+istemci için opaktır. Sonraki sayfanın imleci JSON uçlarında X-Next-Cursor
+başlığında, HTML sayfalarında şablona verilen next_cursor'da döner (son
+sayfada yoktur).
+
+fields=id,model_name verilirse sadece bu kolonlar SELECT edilir ve satırlar
+sözlük olarak döner; izin verilen alanlar uç şemasının alanlarıdır.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import DateTime, select, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page:
+    def __init__(self, items: list, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+# ============================
+# İmleç
+# ============================
+def encode_cursor(sort: str, values: list) -> str:
+    payload = json.dumps({"s": sort, "k": values}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns: list) -> list:
+    """İmleçteki anahtar değerleri; bozuk ya da başka sıralamaya aitse 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        if payload["s"] != sort or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) and v is not None else v
+            for col, v in zip(columns, values)
+        ]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+
+
+# ============================
+# Parametreler
+# ============================
+def parse_sort(sort: str, options: dict) -> tuple[list, bool]:
+    """
+    "-started_at" → ([started_at, id] kolonları, azalan_mı).
+    options: {ad: (kolon, ...)}; son kolon benzersiz olmalı (id).
+    """
+    name = sort.lstrip("-")
+    if name not in options:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Geçersiz sort: {sort} (seçenekler: {', '.join(options)})",
+        )
+    return list(options[name]), sort.startswith("-")
+
+
+def parse_fields(fields: Optional[str], allowed) -> Optional[list[str]]:
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen alan(lar): {', '.join(unknown)}")
+    return names
+
+
+# ============================
+# Sorgu
+# ============================
+def paginate(
+    db,
+    model,
+    sort_options: dict,
+    sort: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    where: tuple = (),
+) -> Page:
+    """
+    Bir sayfa satır döner: fields yoksa model nesneleri, varsa sözlükler.
+    limit + 1 satır okunarak sonraki sayfanın varlığı anlaşılır.
+    """
+    columns, desc = parse_sort(sort, sort_options)
+    keys = [c.key for c in columns]
+
+    if fields is None:
+        query = select(model)
+    else:
+        extra = [c for c in columns if c.key not in fields]
+        query = select(*[getattr(model, f) for f in fields], *extra)
+
+    query = query.where(*where)
+    if cursor:
+        values = decode_cursor(cursor, sort, columns)
+        row_key, last = tuple_(*columns), tuple_(*values)
+        query = query.where(row_key < last if desc else row_key > last)
+
+    order = [c.desc() if desc else c.asc() for c in columns]
+    result = db.execute(query.order_by(*order).limit(limit + 1))
+    rows = result.scalars().all() if fields is None else result.mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_row = rows[-1]
+        get = getattr if fields is None else (lambda r, k: r[k])
+        next_cursor = encode_cursor(sort, [get(last_row, k) for k in keys])
+
+    if fields is not None:
+        rows = [{f: r[f] for f in fields} for r in rows]
+    return Page(rows, next_cursor)
+
+
+def page_response(page: Page, projected: bool, response=None):
+    """
+    JSON uçları için: imleç başlığını ekler. Projection varsa şema
+    doğrulaması atlanıp sözlükler doğrudan döner.
+    """
+    headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else {}
+    if projected:
+        return JSONResponse(jsonable_encoder(page.items), headers=headers)
+    if response is not None:
+        response.headers.update(headers)
+    return page.items
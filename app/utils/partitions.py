@@ -0,0 +1,221 @@
+# app/utils/partitions.py
+"""
+metrics tablosu için isteğe bağlı zaman bazlı bölümleme (Postgres).
+
+METRICS_PARTITIONING=1 iken metrics, ts üzerinde RANGE ile bölümlenmiş
+(declarative partitioning) bir tablo olur:
+  - her ay (ya da hafta) için metrics_pYYYY_MM / metrics_pYYYYwWW alt tablosu
+  - aralık dışındaki satırlar için metrics_default
+  - bakım thread'i ileriki dönemlerin bölümlerini önceden oluşturur
+  - saklama süresi (METRICS_RETENTION_DAYS) dolan bölümler DELETE yerine
+    DROP edilir
+
+Var olan kurulumu dönüştürmek için:
+    python -m app.utils.partitions convert
+Büyük tablolarda bu işlem tabloyu kopyalar ve kilitler; bakım penceresinde
+çalıştırın. Uygulama açılışında tablo henüz bölümlü değilse de dönüştürme
+yapılır (yeni kurulumda tablo boş olduğu için anlıktır).
+"""
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+METRICS_PARTITIONING = os.getenv("METRICS_PARTITIONING", "0") == "1"
+PARTITION_INTERVAL = os.getenv("METRICS_PARTITION_INTERVAL", "month")   # "month" | "week"
+PARTITIONS_AHEAD = int(os.getenv("METRICS_PARTITIONS_AHEAD", "3"))
+METRICS_RETENTION_DAYS = int(os.getenv("METRICS_RETENTION_DAYS", "0"))  # 0 = sınırsız
+
+MAINTENANCE_PERIOD_S = 6 * 3600
+
+_NAME_RE = re.compile(r"^metrics_p(\d{4})(?:_(\d{2})|w(\d{2}))$")
+
+
+# ============================
+# Dönem hesapları
+# ============================
+def period_start(day: date, interval: str = PARTITION_INTERVAL) -> date:
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_period(start: date, interval: str = PARTITION_INTERVAL) -> date:
+    if interval == "week":
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: date, interval: str = PARTITION_INTERVAL) -> str:
+    if interval == "week":
+        year, week, _ = start.isocalendar()
+        return f"metrics_p{year}w{week:02d}"
+    return f"metrics_p{start.year}_{start.month:02d}"
+
+
+def partition_upper_bound(name: str) -> date | None:
+    """Bölüm adından üst sınırı (hariç) çıkarır; tanınmayan isimde None."""
+    m = _NAME_RE.match(name)
+    if not m:
+        return None
+    year = int(m.group(1))
+    if m.group(2):
+        return next_period(date(year, int(m.group(2)), 1), "month")
+    start = date.fromisocalendar(year, int(m.group(3)), 1)
+    return next_period(start, "week")
+
+
+# ============================
+# Şema işlemleri
+# ============================
+def is_partitioned(conn: Connection) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'metrics'"
+    )).first())
+
+
+def create_partition(conn: Connection, start: date, interval: str = PARTITION_INTERVAL):
+    end = next_period(start, interval)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start, interval)} PARTITION OF metrics "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn: Connection, ahead: int = PARTITIONS_AHEAD, since: date | None = None):
+    """since (varsayılan: bugün) döneminden itibaren ahead dönem ilerisine kadar bölüm açar."""
+    start = period_start(since or datetime.utcnow().date())
+    last = period_start(datetime.utcnow().date())
+    for _ in range(ahead):
+        last = next_period(last)
+
+    while start <= last:
+        create_partition(conn, start)
+        start = next_period(start)
+
+
+def drop_expired_partitions(conn: Connection, retention_days: int = METRICS_RETENTION_DAYS) -> list[str]:
+    """Üst sınırı saklama süresinin gerisinde kalan bölümleri DROP eder."""
+    if retention_days <= 0:
+        return []
+
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    children = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'metrics'"
+    )).scalars().all()
+
+    dropped = []
+    for name in sorted(children):
+        upper = partition_upper_bound(name)
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f"ALTER TABLE metrics DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def convert_to_partitioned(engine: Engine):
+    """
+    Normal metrics tablosunu bölümlü tabloya dönüştürür (tek transaction).
+    Birincil anahtar (id, ts) olur; id sequence'i korunur.
+    """
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return
+
+        min_ts = conn.execute(text("SELECT min(ts) FROM metrics")).scalar()
+
+        conn.execute(text("ALTER TABLE metrics RENAME TO metrics_legacy"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_metrics_run_id_ts RENAME TO ix_metrics_legacy_run_id_ts"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_metrics_run_id_id RENAME TO ix_metrics_legacy_run_id_id"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_metrics_id RENAME TO ix_metrics_legacy_id"))
+        conn.execute(text("ALTER TABLE metrics_legacy RENAME CONSTRAINT metrics_pkey TO metrics_legacy_pkey"))
+        # Sequence eski tabloyla birlikte silinmesin
+        conn.execute(text("ALTER TABLE metrics_legacy ALTER COLUMN id DROP DEFAULT"))
+        conn.execute(text("ALTER SEQUENCE metrics_id_seq OWNED BY NONE"))
+
+        conn.execute(text(
+            "CREATE TABLE metrics ("
+            " id INTEGER NOT NULL DEFAULT nextval('metrics_id_seq'),"
+            " run_id INTEGER REFERENCES runs (id),"
+            " ts TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),"
+            " cpu_util DOUBLE PRECISION,"
+            " gpu_util DOUBLE PRECISION,"
+            " gpu_power_w DOUBLE PRECISION,"
+            " mem_used_mb DOUBLE PRECISION,"
+            " PRIMARY KEY (id, ts)"
+            ") PARTITION BY RANGE (ts)"
+        ))
+        conn.execute(text("ALTER SEQUENCE metrics_id_seq OWNED BY metrics.id"))
+        conn.execute(text(
+            "CREATE INDEX ix_metrics_run_id_ts ON metrics (run_id, ts) INCLUDE (gpu_power_w)"
+        ))
+        conn.execute(text("CREATE INDEX ix_metrics_run_id_id ON metrics (run_id, id)"))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS metrics_default PARTITION OF metrics DEFAULT"))
+
+        ensure_partitions(conn, since=min_ts.date() if min_ts else None)
+
+        conn.execute(text(
+            "INSERT INTO metrics (id, run_id, ts, cpu_util, gpu_util, gpu_power_w, mem_used_mb) "
+            "SELECT id, run_id, COALESCE(ts, now() AT TIME ZONE 'utc'), "
+            "cpu_util, gpu_util, gpu_power_w, mem_used_mb FROM metrics_legacy"
+        ))
+        conn.execute(text("DROP TABLE metrics_legacy"))
+
+
+def run_maintenance(engine: Engine) -> list[str]:
+    """İleriki bölümleri oluşturur, süresi dolanları düşürür."""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        ensure_partitions(conn)
+        return drop_expired_partitions(conn)
+
+
+# ============================
+# Açılış / bakım thread'i
+# ============================
+def _maintenance_loop(engine: Engine):
+    while True:
+        time.sleep(MAINTENANCE_PERIOD_S)
+        try:
+            dropped = run_maintenance(engine)
+            if dropped:
+                print("[PARTITION] Saklama süresi dolan bölümler silindi:", ", ".join(dropped))
+        except Exception as e:
+            print("[PARTITION] Bakım hatası:", e)
+
+
+def setup_partitioning(engine: Engine):
+    """Uygulama açılışında çağrılır; özellik kapalıysa ya da DB Postgres değilse bir şey yapmaz."""
+    if not METRICS_PARTITIONING or engine.dialect.name != "postgresql":
+        return
+
+    convert_to_partitioned(engine)
+    run_maintenance(engine)
+    threading.Thread(target=_maintenance_loop, args=(engine,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "maintain"
+    if command == "convert":
+        convert_to_partitioned(engine)
+        print("metrics tablosu bölümlü yapıya dönüştürüldü.")
+    elif command == "maintain":
+        print("Silinen bölümler:", run_maintenance(engine) or "yok")
+    else:
+        print("Kullanım: python -m app.utils.partitions [convert|maintain]")
+        sys.exit(2)
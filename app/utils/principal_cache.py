@@ -0,0 +1,199 @@
+# app/utils/principal_cache.py
+"""
+Oturum sahibinin (principal) kısa ömürlü cache'i.
+
+Cookie ya da Bearer token'daki "sub" ile kullanıcı her istekte yeniden
+SELECT edilmek yerine PRINCIPAL_CACHE_TTL_S saniye bellekte tutulur.
+/monitor/live ve /runs/{id}/live gibi sık yoklanan uçlarda istek başına
+bir oturum + sorgu maliyeti kalkar.
+
+  - Cache'lenen şey ORM nesnesi değil, Principal anlık görüntüsüdür (id,
+    name, email, role); thread'ler arasında paylaşılması güvenlidir,
+    api_key_hash bellekte tutulmaz.
+  - User güncellenince / silinince bu süreçteki girdi silinir: değişen
+    id'ler after_flush'ta toplanır, commit'ten sonra (after_commit) silinir;
+    flush anında silinseydi eşzamanlı bir istek commit'ten önce eski satırı
+    okuyup TTL boyunca yeniden cache'leyebilirdi. Yükleme sürerken gelen
+    silme de sayılır (generation): o yükleme sonucu cache'e yazılmaz.
+    Başka worker süreçleri ya da ORM dışı SQL değişikliği en geç TTL
+    sonunda görür.
+  - Boyut PRINCIPAL_CACHE_SIZE ile sınırlı LRU'dur (en az kullanılan atılır).
+  - LazyUser, middleware'in request.state.current_user'a koyduğu vekildir;
+    kullanıcı sadece bir handler / şablon ona baktığında yüklenir.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+PRINCIPAL_CACHE_TTL_S = float(os.getenv("PRINCIPAL_CACHE_TTL_S", "30"))   # 0 = kapalı
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+class Principal:
+    """Kimliği doğrulanmış kullanıcının salt okunur anlık görüntüsü."""
+
+    __slots__ = ("id", "name", "email", "role")
+
+    def __init__(self, id: int, name: str, email: Optional[str], role: Optional[str]):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(user.id, user.name, user.email, user.role)
+
+    def __repr__(self):
+        return f"Principal(id={self.id}, name={self.name!r}, role={self.role!r})"
+
+
+class PrincipalCache:
+    def __init__(self, ttl_s: float = PRINCIPAL_CACHE_TTL_S, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self._ttl_s = ttl_s
+        self._max_size = max_size
+        self._entries: "OrderedDict[int, tuple[float, Optional[Principal]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Her invalidate'te artar; yükleme sırasında değiştiyse sonuç cache'lenmez
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        """
+        Cache'ten ya da veritabanından principal; kullanıcı yoksa None.
+        Olmayan kullanıcı da (None) TTL boyunca cache'lenir.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        principal = _load(user_id)
+
+        if self._ttl_s > 0 and self._max_size > 0:
+            with self._lock:
+                if generation != self._generation:
+                    return principal
+                self._entries[user_id] = (now + self._ttl_s, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return principal
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "max_size": self._max_size,
+            "ttl_s": self._ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _load(user_id: int) -> Optional[Principal]:
+    db = SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        return Principal.from_user(user) if user else None
+    finally:
+        db.close()
+
+
+# Uygulama genelinde tek cache
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    # after_flush'ta dirty / deleted hâlâ flush öncesi durumu gösterir
+    ids = {
+        obj.id
+        for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, models.User) and obj.id is not None
+    }
+    if ids:
+        session.info.setdefault("principal_invalidate", set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session: Session):
+    for user_id in session.info.pop("principal_invalidate", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changed_users(session: Session):
+    session.info.pop("principal_invalidate", None)
+
+
+def subject_id(payload: Optional[dict]) -> Optional[int]:
+    """Token payload'ındaki "sub" → kullanıcı id'si (geçersizse None)."""
+    if not payload:
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LazyUser:
+    """
+    request.state.current_user için tembel vekil. Doğruluk değeri ya da
+    ilk alan erişimi kullanıcıyı (cache üzerinden) yükler; kullanıcı
+    silinmişse vekil False döner.
+    """
+
+    __slots__ = ("_user_id", "_principal", "_loaded")
+
+    def __init__(self, user_id: int):
+        self._user_id = user_id
+        self._principal = None
+        self._loaded = False
+
+    def _resolve(self) -> Optional[Principal]:
+        if not self._loaded:
+            self._principal = principal_cache.get(self._user_id)
+            self._loaded = True
+        return self._principal
+
+    def __bool__(self):
+        return self._resolve() is not None
+
+    def __getattr__(self, name):
+        principal = self._resolve()
+        if principal is None:
+            raise AttributeError(name)
+        return getattr(principal, name)
+
+    def __repr__(self):
+        return f"LazyUser({self._user_id})"
@@ -0,0 +1,194 @@
+# app/utils/pubsub.py
+"""
+Süreç içi yayın / abonelik merkezi (SSE ve WebSocket uçları için).
+
+Yayıncılar (ingest, stop_run, monitor örnekleyicisi) herhangi bir thread'den
+publish() çağırır; olay bir kez JSON'a çevrilir ve konunun tüm abonelerine
+kendi event loop'ları üzerinden (call_soon_threadsafe) dağıtılır. Abone
+başına DB sorgusu ya da ayrı serileştirme yapılmaz.
+
+  - Her konu son RING_SIZE olayı halka tamponda tutar; yeniden bağlanan
+    abone Last-Event-ID'den sonrasını buradan alır.
+  - Her abonenin sınırlı bir kuyruğu vardır; yavaş istemcinin kuyruğu
+    dolarsa abone "overflow" ile kapatılır (istemci yeniden bağlanıp
+    kaldığı yerden devam eder), diğer aboneler etkilenmez.
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+PUBSUB_RING_SIZE = int(os.getenv("PUBSUB_RING_SIZE", "256"))
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "256"))
+PUBSUB_MAX_TOPICS = int(os.getenv("PUBSUB_MAX_TOPICS", "1000"))
+
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id: Optional[int], event_type: str, data: str):
+        self.id = event_id
+        self.type = event_type
+        self.data = data        # JSON metni (bir kez serileştirilir)
+
+    def to_sse(self) -> str:
+        lines = []
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        lines.append(f"event: {self.type}")
+        lines.append(f"data: {self.data}")
+        return "\n".join(lines) + "\n\n"
+
+
+# Abone kuyruğu taştığında kuyruğa konan işaret
+OVERFLOW = Event(None, "overflow", "{}")
+
+
+class Subscription:
+    def __init__(self, topic: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.topic = topic
+        self.loop = loop
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _offer(self, event: Event):
+        """Abonenin event loop'unda çalışır."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Yer açmak için en eski olay atılır, taşma işareti eklenir:
+            # okuyucu bağlantıyı kapatır
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Sıradaki olay; timeout içinde olay yoksa None."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class _Topic:
+    __slots__ = ("ring", "subscribers")
+
+    def __init__(self, ring_size: int):
+        self.ring: deque = deque(maxlen=ring_size)
+        self.subscribers: set = set()
+
+
+class Hub:
+    def __init__(
+        self,
+        ring_size: int = PUBSUB_RING_SIZE,
+        queue_size: int = PUBSUB_QUEUE_SIZE,
+        max_topics: int = PUBSUB_MAX_TOPICS,
+    ):
+        self._ring_size = ring_size
+        self._queue_size = queue_size
+        self._max_topics = max_topics
+
+        self._topics: "OrderedDict[str, _Topic]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def _topic(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic(self._ring_size)
+            self._evict()
+        self._topics.move_to_end(name)
+        return topic
+
+    def _evict(self):
+        """Konu sayısı sınırı aşılırsa abonesi olmayan en eski konular atılır."""
+        if len(self._topics) <= self._max_topics:
+            return
+        for name in list(self._topics):
+            if len(self._topics) <= self._max_topics:
+                break
+            if not self._topics[name].subscribers:
+                del self._topics[name]
+
+    # -----------------------------
+    # Yayın (her thread'den)
+    # -----------------------------
+    def publish(self, topic: str, event_type: str, payload: Any, event_id: Optional[int] = None) -> Event:
+        event = Event(event_id, event_type, json.dumps(payload, default=str))
+
+        with self._lock:
+            t = self._topic(topic)
+            t.ring.append(event)
+            subscribers = list(t.subscribers)
+            self.published += 1
+
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:  # loop kapanmış
+                continue
+            self.delivered += 1
+
+        return event
+
+    # -----------------------------
+    # Abonelik (event loop içinden)
+    # -----------------------------
+    def subscribe(self, topic: str, last_event_id: Optional[int] = None) -> tuple[Subscription, list[Event], bool]:
+        """
+        (abonelik, kaçırılan olaylar, tam_mı) döner. last_event_id halka
+        tamponda bulunamazsa tam_mı False olur; çağıran eksikleri kalıcı
+        kaynaktan (DB) tamamlamalıdır.
+        """
+        sub = Subscription(topic, asyncio.get_running_loop(), self._queue_size)
+
+        with self._lock:
+            t = self._topic(topic)
+            t.subscribers.add(sub)
+            ring = list(t.ring)
+
+        if last_event_id is None:
+            return sub, [], True
+
+        for i, event in enumerate(ring):
+            if event.id == last_event_id:
+                return sub, [e for e in ring[i + 1:] if e.id is not None], True
+        return sub, [], False
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            t = self._topics.get(sub.topic)
+            if t is not None:
+                t.subscribers.discard(sub)
+        if sub.overflowed:
+            self.overflows += 1
+
+    def recent(self, topic: str, limit: Optional[int] = None) -> list[Event]:
+        with self._lock:
+            t = self._topics.get(topic)
+            ring = list(t.ring) if t is not None else []
+        return ring[-limit:] if limit else ring
+
+    def stats(self) -> dict:
+        with self._lock:
+            topics = len(self._topics)
+            subscribers = sum(len(t.subscribers) for t in self._topics.values())
+        return {
+            "topics": topics,
+            "subscribers": subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+# Uygulama genelinde tek merkez
+hub = Hub()
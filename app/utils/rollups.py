@@ -0,0 +1,273 @@
+# app/utils/rollups.py
+"""
+Run başına çok çözünürlüklü metrik özetleri (1s → 10s → 1dk).
+
+Her yeni örnek, yazıldığı transaction içinde metric_rollups tablosundaki
+ilgili kovaları (run_id, resolution_s, bucket_ts) günceller: sayı ve her
+kolon için min / max / toplam / dolu değer sayısı. Grafik uçları ham metrics
+tablosu yerine, istenen zaman aralığını nokta bütçesi içinde karşılayan en
+ince çözünürlüğü okur.
+
+Okuyanlar: /runs/{id}/series, canlı grafik sayfasının geçmiş yüklemesi ve
+run detay sayfası (örnek sayısı nokta bütçesini aşan run'larda enerji serisi,
+bölge senaryoları ve metrik tablosu özetlerden hesaplanır; bkz.
+load_chart_rollups).
+
+Var olan veriler için rebuild_rollups() ham tablodan SQL ile yeniden üretir.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import Integer, case, delete, func, literal, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+RESOLUTIONS_S = (1, 10, 60)
+
+ROLLUP_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(ts: datetime, resolution_s: int) -> datetime:
+    seconds = int((ts - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % resolution_s)
+
+
+# ============================
+# Artımlı güncelleme (ingest)
+# ============================
+def _aggregate(columns: dict) -> list[dict]:
+    """
+    Kolonları (bkz. ingest.rows_to_columns) (run, çözünürlük, kova) bazında
+    kısmi özetlere indirger; gruplama NumPy ile (sıralama + reduceat).
+    """
+    run_ids = columns["run_id"]
+    ts_us = columns["ts"].astype("datetime64[us]").astype(np.int64)
+
+    result = []
+    for res in RESOLUTIONS_S:
+        step = res * 1_000_000
+        buckets = ts_us // step * step
+        order = np.lexsort((buckets, run_ids))
+        runs, bucks = run_ids[order], buckets[order]
+        starts = np.flatnonzero(np.r_[True, (runs[1:] != runs[:-1]) | (bucks[1:] != bucks[:-1])])
+        counts = np.diff(np.r_[starts, len(runs)])
+
+        stats = {}
+        for field in ROLLUP_FIELDS:
+            values = columns[field][order]
+            valid = ~np.isnan(values)
+            n = np.add.reduceat(valid.astype(np.int64), starts)
+            stats[field] = (
+                n,
+                np.add.reduceat(np.where(valid, values, 0.0), starts),
+                np.minimum.reduceat(np.where(valid, values, np.inf), starts),
+                np.maximum.reduceat(np.where(valid, values, -np.inf), starts),
+            )
+
+        for i, start in enumerate(starts.tolist()):
+            entry = {
+                "run_id": int(runs[start]),
+                "resolution_s": res,
+                "bucket_ts": _EPOCH + timedelta(microseconds=int(bucks[start])),
+                "count": int(counts[i]),
+            }
+            for field, (n, total, mn, mx) in stats.items():
+                has = n[i] > 0
+                entry[f"{field}_min"] = float(mn[i]) if has else None
+                entry[f"{field}_max"] = float(mx[i]) if has else None
+                entry[f"{field}_sum"] = float(total[i])
+                entry[f"{field}_n"] = int(n[i])
+            result.append(entry)
+
+    # Sabit sıra: eşzamanlı upsert'lerde deadlock olmasın
+    result.sort(key=lambda e: (e["run_id"], e["resolution_s"], e["bucket_ts"]))
+    return result
+
+
+def _null_safe(pick, current, new):
+    """min/max birleşimi; NULL taraf yok sayılır (Postgres / SQLite aynı davranır)."""
+    return case(
+        (current.is_(None), new),
+        (new.is_(None), current),
+        (pick(new, current), new),
+        else_=current,
+    )
+
+
+def _upsert_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = models.MetricRollup.__table__
+    stmt = insert(table)
+    excluded = stmt.excluded
+
+    updates = {"count": table.c["count"] + excluded["count"]}
+    for field in ROLLUP_FIELDS:
+        mn, mx = table.c[f"{field}_min"], table.c[f"{field}_max"]
+        updates[f"{field}_min"] = _null_safe(lambda a, b: a < b, mn, excluded[f"{field}_min"])
+        updates[f"{field}_max"] = _null_safe(lambda a, b: a > b, mx, excluded[f"{field}_max"])
+        updates[f"{field}_sum"] = table.c[f"{field}_sum"] + excluded[f"{field}_sum"]
+        updates[f"{field}_n"] = table.c[f"{field}_n"] + excluded[f"{field}_n"]
+
+    return stmt.on_conflict_do_update(
+        index_elements=["run_id", "resolution_s", "bucket_ts"],
+        set_=updates,
+    )
+
+
+def update_rollups(db: Session, columns: dict):
+    """Yeni yazılan örnekleri (kolon biçiminde) özet tablosuna ekler; commit çağırmaz."""
+    if not len(columns["run_id"]):
+        return
+    entries = _aggregate(columns)
+    db.execute(_upsert_statement(db.get_bind().dialect.name), entries)
+
+
+# ============================
+# Ham tablodan yeniden üretim
+# ============================
+def _bucket_expr(dialect: str, resolution_s: int):
+    ts = models.Metric.ts
+    if dialect == "postgresql":
+        epoch = func.floor(func.extract("epoch", ts) / resolution_s) * resolution_s
+        return func.timezone("UTC", func.to_timestamp(epoch))
+    # SQLAlchemy'nin SQLite DateTime metin biçimiyle aynı olmalı (upsert anahtarı)
+    epoch = func.cast(func.strftime("%s", ts), Integer) // resolution_s * resolution_s
+    return func.strftime("%Y-%m-%d %H:%M:%S.000000", epoch, literal("unixepoch"))
+
+
+def rebuild_rollups(db: Session, run_id: int | None = None):
+    """
+    Bir run'ın (ya da run_id=None ise tüm run'ların) özetlerini ham metrics
+    tablosundan tek SQL ile yeniden hesaplar; commit çağırmaz.
+    """
+    rollup = models.MetricRollup.__table__
+    metric = models.Metric
+    dialect = db.get_bind().dialect.name
+
+    cleanup = delete(rollup)
+    if run_id is not None:
+        cleanup = cleanup.where(rollup.c.run_id == run_id)
+    db.execute(cleanup)
+
+    for res in RESOLUTIONS_S:
+        bucket = _bucket_expr(dialect, res).label("bucket_ts")
+        columns = [
+            metric.run_id,
+            literal(res).label("resolution_s"),
+            bucket,
+            func.count().label("count"),
+        ]
+        for field in ROLLUP_FIELDS:
+            col = getattr(metric, field)
+            columns += [
+                func.min(col).label(f"{field}_min"),
+                func.max(col).label(f"{field}_max"),
+                func.coalesce(func.sum(col), 0.0).label(f"{field}_sum"),
+                func.count(col).label(f"{field}_n"),
+            ]
+
+        query = select(*columns).where(metric.ts.is_not(None))
+        if run_id is not None:
+            query = query.where(metric.run_id == run_id)
+        query = query.group_by(metric.run_id, bucket)
+
+        db.execute(rollup.insert().from_select([c.name for c in columns], query))
+
+
+# ============================
+# Okuma
+# ============================
+def pick_resolution(start: datetime, end: datetime, max_points: int) -> int:
+    """Aralığı max_points içinde karşılayan en ince çözünürlük (yoksa en kaba)."""
+    span_s = max((end - start).total_seconds(), 1.0)
+    for res in RESOLUTIONS_S:
+        if span_s / res <= max_points:
+            return res
+    return RESOLUTIONS_S[-1]
+
+
+def load_rollup_series(db: Session, run_id: int, resolution_s: int, start: datetime, end: datetime) -> list:
+    rollup = models.MetricRollup
+    return (
+        db.query(rollup)
+        .filter(
+            rollup.run_id == run_id,
+            rollup.resolution_s == resolution_s,
+            rollup.bucket_ts >= bucket_start(start, resolution_s),
+            rollup.bucket_ts <= end,
+        )
+        .order_by(rollup.bucket_ts.asc())
+        .all()
+    )
+
+
+def load_chart_rollups(db: Session, run_id: int, max_points: int):
+    """
+    Run'ın tamamını max_points içinde karşılayan özetler:
+    (çözünürlük, toplam örnek sayısı, kovalar). Özet yoksa ya da örnek sayısı
+    zaten max_points'i aşmıyorsa None döner (ham seri ucuz ve kesin).
+
+    Aralık en kaba çözünürlükten okunur (istemci saatine göre ts'ler run'ın
+    started_at / ended_at aralığı dışında kalabilir).
+    """
+    rollup = models.MetricRollup
+    coarsest = RESOLUTIONS_S[-1]
+    first, last, total = db.query(
+        func.min(rollup.bucket_ts), func.max(rollup.bucket_ts), func.sum(rollup.count)
+    ).filter(rollup.run_id == run_id, rollup.resolution_s == coarsest).one()
+
+    if first is None or not total or total <= max_points:
+        return None
+
+    resolution_s = pick_resolution(first, last + timedelta(seconds=coarsest), max_points)
+    buckets = (
+        db.query(rollup)
+        .filter(rollup.run_id == run_id, rollup.resolution_s == resolution_s)
+        .order_by(rollup.bucket_ts.asc())
+        .all()
+    )
+    return resolution_s, int(total), buckets
+
+
+def _avg(r, field: str):
+    n = getattr(r, f"{field}_n")
+    return getattr(r, f"{field}_sum") / n if n else None
+
+
+def rollup_arrays(buckets: list, resolution_s: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Enerji hesabı için (kova ortası epoch saniye, ortalama GPU gücü W);
+    series_arrays'in özet karşılığı (boş güç değeri 0 sayılır).
+    """
+    ts_s = np.array(
+        [(r.bucket_ts - _EPOCH).total_seconds() + resolution_s / 2.0 for r in buckets],
+        dtype=np.float64,
+    )
+    power = np.array([_avg(r, "gpu_power_w") or 0.0 for r in buckets], dtype=np.float64)
+    return ts_s, power
+
+
+def rollup_row(r):
+    """Kovayı metrik satırı gibi (ts + kolon ortalamaları) gösterir; tablolar için."""
+    row = SimpleNamespace(ts=r.bucket_ts)
+    for field in ROLLUP_FIELDS:
+        avg = _avg(r, field)
+        setattr(row, field, round(avg, 3) if avg is not None else None)
+    return row
+
+
+def rollup_point(r) -> dict:
+    point = {"time": r.bucket_ts.isoformat(), "count": r.count}
+    for field, short in zip(ROLLUP_FIELDS, ("cpu", "gpu", "power", "ram")):
+        point[f"{short}_avg"] = _avg(r, field)
+        point[f"{short}_min"] = getattr(r, f"{field}_min")
+        point[f"{short}_max"] = getattr(r, f"{field}_max")
+    return point
@@ -0,0 +1,132 @@
+# app/utils/run_cache.py
+"""
+Ingest yolunda run kontrolü için süreç içi cache.
+
+Her örnekte "run var mı, açık mı?" diye DB'ye gitmek yerine run durumları
+(açık / bitmiş / yok) TTL'li bir LRU cache'te tutulur. create_run ve stop_run
+cache'i doğrudan günceller; diğer worker süreçlerindeki değişiklikler en geç
+TTL kadar sonra görülür (yok bilgisi için daha kısa TTL kullanılır).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.utils.ingest import RunState, load_run_states
+
+RUN_CACHE_TTL_S = float(os.getenv("RUN_CACHE_TTL_S", "30"))
+RUN_CACHE_MISSING_TTL_S = float(os.getenv("RUN_CACHE_MISSING_TTL_S", "5"))
+RUN_CACHE_MAX_SIZE = int(os.getenv("RUN_CACHE_MAX_SIZE", "10000"))
+
+# get() için "cache'te yok" işareti (None = run DB'de yok)
+MISS = object()
+
+
+class RunStateCache:
+    def __init__(
+        self,
+        ttl_s: float = RUN_CACHE_TTL_S,
+        missing_ttl_s: float = RUN_CACHE_MISSING_TTL_S,
+        max_size: int = RUN_CACHE_MAX_SIZE,
+    ):
+        self._ttl_s = ttl_s
+        self._missing_ttl_s = missing_ttl_s
+        self._max_size = max_size
+
+        self._entries: "OrderedDict[int, tuple[RunState | None, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -----------------------------
+    # Temel işlemler
+    # -----------------------------
+    def get(self, run_id: int):
+        """RunState, run yoksa None, cache'te değilse MISS döner."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(run_id)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[run_id]
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(run_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, run_id: int, state: RunState | None):
+        ttl = self._missing_ttl_s if state is None else self._ttl_s
+        with self._lock:
+            self._entries[run_id] = (state, time.monotonic() + ttl)
+            self._entries.move_to_end(run_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def mark_open(self, run_id: int, started_at: datetime | None):
+        self.set(run_id, RunState(True, started_at))
+
+    def mark_ended(self, run_id: int, started_at: datetime | None):
+        self.set(run_id, RunState(False, started_at))
+
+    def invalidate(self, run_id: int):
+        with self._lock:
+            self._entries.pop(run_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # -----------------------------
+    # Ingest yardımcısı
+    # -----------------------------
+    def resolve(self, db: Session, run_ids: Iterable[int]) -> Dict[int, RunState]:
+        """
+        load_run_states ile aynı şekilde {run_id: RunState} döner (olmayan run
+        sözlükte yer almaz), ama sadece cache'te olmayan id'ler için tek bir
+        sorgu atar.
+        """
+        result: Dict[int, RunState] = {}
+        unknown = []
+
+        for run_id in set(run_ids):
+            state = self.get(run_id)
+            if state is MISS:
+                unknown.append(run_id)
+            elif state is not None:
+                result[run_id] = state
+
+        if unknown:
+            loaded = load_run_states(db, unknown)
+            for run_id in unknown:
+                state = loaded.get(run_id)
+                self.set(run_id, state)
+                if state is not None:
+                    result[run_id] = state
+
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Uygulama genelinde tek cache
+run_cache = RunStateCache()
@@ -0,0 +1,84 @@
+# app/utils/run_detail_cache.py
+"""
+Bitmiş run'ların detay sayfası için türetilmiş veri cache'i.
+
+Run bittikten sonra metrik serisi değişmez; sayfadaki kümülatif enerji
+serisi, bölge senaryoları, GreenScore ve render edilmiş metrik tablosu
+sadece emisyon kaydına bağlıdır. Bunlar (run_id, emisyon sürümü,
+max_points) anahtarıyla LRU cache'te tutulur:
+
+  - Emission.version her emisyon yazımında artar (upsert_emission ve toplu
+    recalc); yeni sürüm yeni anahtar demektir, bu yüzden başka worker
+    süreçlerinde de eski sonuç kullanılmaz.
+  - /emissions/recalc uçları ayrıca bu süreçteki girdileri siler (bellek
+    hemen boşalır).
+  - Bitmemiş run'lar cache'lenmez.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+RUN_DETAIL_CACHE_SIZE = int(os.getenv("RUN_DETAIL_CACHE_SIZE", "64"))
+
+
+class RunDetailCache:
+    def __init__(self, max_size: int = RUN_DETAIL_CACHE_SIZE):
+        self._max_size = max_size
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(run_id: int, emission_version: Optional[int], *extra: Hashable) -> tuple:
+        return (run_id, emission_version, *extra)
+
+    def get(self, key: tuple):
+        """Cache'teki değer, yoksa None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: Any):
+        if self._max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, run_ids: Iterable[int]):
+        """Verilen run'ların tüm sürümlerini siler."""
+        run_ids = set(run_ids)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in run_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Uygulama genelinde tek cache
+run_detail_cache = RunDetailCache()
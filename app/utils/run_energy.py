@@ -0,0 +1,238 @@
+# app/utils/run_energy.py
+"""
+Run başına ingest sırasında güncellenen enerji toplamları (run_energy).
+
+store_metrics her yazımda ilgili run'ın satırını kilitler (Postgres'te
+SELECT ... FOR UPDATE) ve yeni örnekleri gerçek zaman farklarıyla
+emission_calc'taki kurala göre (varsayılan yamuk) toplama ekler: enerji (Wh),
+örnek sayısı, son ts ve son güç. Her aralığın CO2'si de o an geçerli karbon
+yoğunluğuyla (DEFAULT_REGION, bkz. app/utils/carbon_intensity.py) eklenir.
+stop_run bu satırdan Emission kaydını metrikleri taramadan oluşturur;
+önce bu süreçteki ingest kuyruğunun stop'tan önce kabul ettiği örnekler
+yazılır (IngestQueue.barrier). Başka worker'ların eski run cache'iyle
+stop'tan sonra yazdığı örnekler sample_count'u finalized_count'tan
+uzaklaştırır; arka plan thread'i (start_finalizer) bu run'ların Emission
+kaydını FINALIZE_RECHECK_S aralığında yeniden yazar.
+
+Son ts'ten eski bir örnek gelirse (ör. istemci spool'unun geç gönderimi)
+doğru entegrasyon yapılamaz; out_of_order sayacı artar ve toplam, run
+sonlandırılırken ham seriden yeniden hesaplanır (rebuild_run_energy).
+Tam yeniden hesaplama ayrıca /emissions/recalc ile elle çalıştırılır.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.archive import load_series
+from app.utils.carbon_intensity import DEFAULT_REGION, intensity_at
+from app.utils.dashboard_summary import record_emissions
+from app.utils.emission_calc import calculate_emission, emission_for_series, interval_energies_wh, series_arrays
+from app.utils.series import POWER_COLUMNS
+
+# run_energy.emission_kg bu bölgenin yoğunluğuyla tutulur
+ACCUMULATOR_REGION = DEFAULT_REGION
+
+# Stop'tan sonra örnek almış run'ların yeniden sonlandırılma aralığı; 0 = kapalı
+FINALIZE_RECHECK_S = float(os.getenv("FINALIZE_RECHECK_S", "60"))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _insert_missing_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(models.RunEnergy.__table__).on_conflict_do_nothing(index_elements=["run_id"])
+
+
+def _reset(state: models.RunEnergy):
+    state.sample_count = 0
+    state.energy_wh = 0.0
+    state.emission_kg = 0.0
+    state.first_ts = None
+    state.last_ts = None
+    state.last_power_w = None
+    state.out_of_order = 0
+
+
+def _to_datetime(ts_us) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(ts_us))
+
+
+def _accumulate(state: models.RunEnergy, ts_us: np.ndarray, power_w: np.ndarray):
+    """Bir run'ın örneklerini (epoch µs, güç W dizileri) ts sırasıyla toplama ekler."""
+    order = np.argsort(ts_us, kind="stable")
+    ts_us = ts_us[order]
+    power_w = np.nan_to_num(power_w[order], nan=0.0)
+    state.sample_count += len(ts_us)
+
+    if state.last_ts is None:
+        state.first_ts = _to_datetime(ts_us[0])
+        prev_us, prev_power = ts_us[:1], power_w[:1]
+        ts_us, power_w = ts_us[1:], power_w[1:]
+    else:
+        last_us = np.datetime64(state.last_ts, "us").astype(np.int64)
+        late = ts_us < last_us
+        state.out_of_order += int(late.sum())
+        ts_us, power_w = ts_us[~late], power_w[~late]
+        prev_us, prev_power = np.array([last_us]), np.array([state.last_power_w or 0.0])
+
+    points_us = np.concatenate([prev_us, ts_us])
+    points_s = points_us / 1e6
+    points_w = np.concatenate([prev_power, power_w])
+    if len(points_s) >= 2:
+        energies = interval_energies_wh(points_s, points_w)
+        factors = intensity_at(ACCUMULATOR_REGION, points_s[:-1])
+        state.energy_wh += float(energies.sum())
+        state.emission_kg = (state.emission_kg or 0.0) + float((energies / 1000.0 * factors).sum())
+
+    state.last_ts = _to_datetime(points_us[-1])
+    state.last_power_w = float(points_w[-1])
+    state.updated_at = datetime.utcnow()
+
+
+def update_run_energy(db: Session, columns: dict):
+    """Yeni yazılan örnekleri (kolon biçiminde) run toplamlarına ekler; commit çağırmaz."""
+    if not len(columns["run_id"]):
+        return
+
+    run_ids_col = columns["run_id"]
+    ts_us = columns["ts"].astype("datetime64[us]").astype(np.int64)
+    run_ids = np.unique(run_ids_col).tolist()
+
+    db.execute(
+        _insert_missing_statement(db.get_bind().dialect.name),
+        [{"run_id": run_id} for run_id in run_ids],
+    )
+
+    # Sabit sıra: eşzamanlı yazımlarda deadlock olmasın
+    states = db.execute(
+        select(models.RunEnergy)
+        .where(models.RunEnergy.run_id.in_(run_ids))
+        .order_by(models.RunEnergy.run_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalars().all()
+
+    for state in states:
+        mask = run_ids_col == state.run_id
+        _accumulate(state, ts_us[mask], columns["gpu_power_w"][mask])
+    db.flush()
+
+
+def rebuild_run_energy(db: Session, run) -> models.RunEnergy:
+    """Run'ın toplamlarını ham seriden (ya da arşivden) baştan hesaplar; commit çağırmaz."""
+    state = db.get(models.RunEnergy, run.id, with_for_update=True)
+    if state is None:
+        state = models.RunEnergy(run_id=run.id)
+        db.add(state)
+
+    _reset(state)
+    metrics = [m for m in load_series(db, run, POWER_COLUMNS) if m.ts is not None]
+    if metrics:
+        ts_s, power_w = series_arrays(metrics)
+        state.sample_count = len(metrics)
+        state.energy_wh, state.emission_kg = emission_for_series(ts_s, power_w, ACCUMULATOR_REGION)
+        state.first_ts = metrics[0].ts
+        state.last_ts = metrics[-1].ts
+        state.last_power_w = float(power_w[-1])
+    state.updated_at = datetime.utcnow()
+    db.flush()
+    return state
+
+
+def upsert_emission(db: Session, run_id: int, energy_kwh: float, emission_kg: float, region: str = "TR") -> models.Emission:
+    """Run'ın Emission kaydını günceller, yoksa oluşturur; commit çağırmaz."""
+    record_emissions(db, [{"run_id": run_id, "energy_kwh": energy_kwh, "emission_kg": emission_kg}])
+
+    emission = (
+        db.query(models.Emission)
+        .filter(models.Emission.run_id == run_id)
+        .first()
+    )
+
+    if emission is None:
+        emission = models.Emission(run_id=run_id)
+        db.add(emission)
+
+    emission.energy_kwh = energy_kwh
+    emission.emission_kg = emission_kg
+    emission.region_code = region
+    emission.version = (emission.version or 0) + 1
+    return emission
+
+
+def finalize_run_energy(db: Session, run, region: str = "TR") -> models.Emission:
+    """
+    stop_run için: toplamlardan Emission kaydını yazar. Toplam yoksa ya da
+    sırası bozuk örnek geldiyse önce ham seriden yeniden hesaplanır.
+    """
+    state = db.get(models.RunEnergy, run.id)
+    if state is None or state.out_of_order:
+        state = rebuild_run_energy(db, run)
+
+    energy_kwh = state.energy_wh / 1000.0
+    if region == ACCUMULATOR_REGION:
+        emission_kg = state.emission_kg
+    else:
+        emission_kg = calculate_emission(energy_kwh, region)
+    state.finalized_count = state.sample_count
+    return upsert_emission(db, run.id, energy_kwh, emission_kg, region)
+
+
+# ============================
+# Stop sonrası gelen örnekler
+# ============================
+def refinalize_late_runs(db: Session, limit: int = 100) -> int:
+    """
+    Emission'ı yazıldıktan sonra örnek almış bitmiş run'ları yeniden
+    sonlandırır (bölge mevcut Emission kaydından); her run ayrı commit.
+    """
+    run_ids = db.execute(
+        select(models.RunEnergy.run_id)
+        .join(models.Run, models.Run.id == models.RunEnergy.run_id)
+        .where(
+            models.Run.ended_at.isnot(None),
+            models.RunEnergy.finalized_count.isnot(None),
+            models.RunEnergy.sample_count != models.RunEnergy.finalized_count,
+        )
+        .order_by(models.RunEnergy.run_id)
+        .limit(limit)
+    ).scalars().all()
+
+    for run_id in run_ids:
+        run = db.get(models.Run, run_id)
+        emission = db.query(models.Emission).filter(models.Emission.run_id == run_id).first()
+        finalize_run_energy(db, run, region=(emission.region_code if emission else None) or "TR")
+        db.commit()
+    return len(run_ids)
+
+
+def _finalize_loop():
+    from app.database import SessionLocal
+
+    while True:
+        time.sleep(FINALIZE_RECHECK_S)
+        db = SessionLocal()
+        try:
+            count = refinalize_late_runs(db)
+            if count:
+                print(f"[RUN_ENERGY] Stop sonrası örnek alan {count} run yeniden hesaplandı")
+        except Exception as e:
+            db.rollback()
+            print("[RUN_ENERGY] Yeniden sonlandırma hatası:", e)
+        finally:
+            db.close()
+
+
+def start_finalizer():
+    """Uygulama açılışında çağrılır; FINALIZE_RECHECK_S=0 ise thread başlamaz."""
+    if FINALIZE_RECHECK_S > 0:
+        threading.Thread(target=_finalize_loop, daemon=True).start()
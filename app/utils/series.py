@@ -0,0 +1,101 @@
+# app/utils/series.py
+"""
+Run'a ait metrik serilerini okuyan ortak sorgular.
+
+ORM nesnesi yerine sadece gereken kolonlar seçilir; (run_id, ts) index'i
+sayesinde sorgu sadece o run'ın satırlarını ts sırasıyla okur.
+
+Sorgulara run'ın zaman penceresi (started_at .. ended_at) ts aralığı olarak
+eklenir; metrics bölümlü tabloysa (bkz. app/utils/partitions.py) planner
+sadece ilgili bölümleri tarar.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+Metric = models.Metric
+
+# Grafik / tablo için tam seri
+SERIES_COLUMNS = (
+    Metric.id,
+    Metric.run_id,
+    Metric.ts,
+    Metric.cpu_util,
+    Metric.gpu_util,
+    Metric.gpu_power_w,
+    Metric.mem_used_mb,
+)
+
+# Canlı grafik (/runs/{id}/live) için; id imleç (since) olarak kullanılır
+LIVE_COLUMNS = (
+    Metric.id,
+    Metric.ts,
+    Metric.cpu_util,
+    Metric.gpu_util,
+    Metric.mem_used_mb,
+    Metric.gpu_power_w,
+)
+
+# Enerji hesabı için (Postgres'te index-only scan)
+POWER_COLUMNS = (Metric.ts, Metric.gpu_power_w)
+
+
+# İstemci saat farkları için pencereye eklenen pay
+TS_WINDOW_SLACK = timedelta(hours=12)
+
+
+def run_time_window(run) -> tuple[datetime | None, datetime | None]:
+    """Run'ın metriklerinin düşebileceği [başlangıç, bitiş) ts aralığı."""
+    start = run.started_at - TS_WINDOW_SLACK if run.started_at else None
+    end = run.ended_at + TS_WINDOW_SLACK if run.ended_at else None
+    return start, end
+
+
+def load_run_window(db: Session, run_id: int) -> tuple[datetime | None, datetime | None]:
+    row = db.execute(
+        select(models.Run.started_at, models.Run.ended_at).where(models.Run.id == run_id)
+    ).first()
+    return run_time_window(row) if row else (None, None)
+
+
+def run_series_query(run_id: int, columns=SERIES_COLUMNS, start=None, end=None):
+    query = select(*columns).where(Metric.run_id == run_id)
+    if start is not None:
+        query = query.where(Metric.ts >= start)
+    if end is not None:
+        query = query.where(Metric.ts < end)
+    return query.order_by(Metric.ts.asc())
+
+
+def run_series_since_query(run_id: int, columns, since_id: int | None, limit: int, start=None, end=None):
+    """
+    İmleçli okuma: since_id verilirse ondan sonra yazılan en fazla limit satır
+    (id sırasıyla), verilmezse son limit satır (id azalan; çağıran ters çevirir).
+    (run_id, id) index'i sayesinde maliyet seri uzunluğundan bağımsızdır.
+    """
+    query = select(*columns).where(Metric.run_id == run_id)
+    if start is not None:
+        query = query.where(Metric.ts >= start)
+    if end is not None:
+        query = query.where(Metric.ts < end)
+
+    if since_id is None:
+        return query.order_by(Metric.id.desc()).limit(limit)
+    return query.where(Metric.id > since_id).order_by(Metric.id.asc()).limit(limit)
+
+
+def load_run_series(db: Session, run_id: int, columns=SERIES_COLUMNS, window=None) -> list:
+    """
+    Run'ın metriklerini ts sırasıyla Row listesi olarak döner.
+    window verilmezse run'ın zaman penceresi DB'den okunur.
+    """
+    start, end = window if window is not None else load_run_window(db, run_id)
+    return db.execute(run_series_query(run_id, columns, start, end)).all()
+
+
+def load_power_series(db: Session, run_id: int, window=None) -> list:
+    """Enerji hesabı için (ts, gpu_power_w) satırları."""
+    return load_run_series(db, run_id, POWER_COLUMNS, window)
@@ -0,0 +1,110 @@
+# app/utils/wire_format.py
+"""
+Metrik paketleri için kolon bazlı ikili format (application/x-green-metrics).
+
+Yerleşim (little-endian):
+    başlık : magic b"GMB1" | version u8 | flags u8 | reserved u16 | n u32
+    kolonlar (her biri n eleman, arka arkaya):
+        ts           int64    UTC epoch mikro saniye
+        run_id       int32
+        cpu_util     float32  (NaN = boş)
+        gpu_util     float32
+        gpu_power_w  float32
+        mem_used_mb  float32
+
+Değerler float32 taşınır ve bu hassasiyette saklanır (sunucu yuvarlama
+yapmaz; ör. 12.3 → 12.300000190734863). Tam hassasiyet gereken istemciler
+JSON /metrics/batch'i kullanmalı.
+
+Gövde Content-Encoding ile gzip veya zstd sıkıştırılmış olabilir.
+Çözme NumPy ile yapılır; satır başına Python nesnesi oluşturulmaz.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+try:  # zstd isteğe bağlı
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+CONTENT_TYPE = "application/x-green-metrics"
+
+MAGIC = b"GMB1"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")
+
+VALUE_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+COLUMNS = (
+    ("ts", np.dtype("<i8")),
+    ("run_id", np.dtype("<i4")),
+) + tuple((name, np.dtype("<f4")) for name in VALUE_FIELDS)
+
+# Sıkıştırma bombasına karşı açılmış gövde için üst sınır
+MAX_DECODED_BYTES = 64 * 1024 * 1024
+
+
+def decompress(body: bytes, content_encoding: str | None) -> bytes:
+    encoding = (content_encoding or "identity").strip().lower()
+
+    if encoding in ("", "identity"):
+        return body
+    if encoding == "gzip":
+        d = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        data = d.decompress(body, MAX_DECODED_BYTES + 1)
+        if d.unconsumed_tail:
+            raise ValueError("Paket çok büyük")
+        return data
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd desteği için 'zstandard' paketi kurulu değil")
+        return zstandard.ZstdDecompressor().decompress(body, max_output_size=MAX_DECODED_BYTES)
+
+    raise ValueError(f"Desteklenmeyen Content-Encoding: {content_encoding}")
+
+
+def decode_metric_batch(body: bytes, content_encoding: str | None = None) -> dict[str, np.ndarray]:
+    """
+    İkili paketi {kolon_adı: np.ndarray} sözlüğüne çevirir.
+    Bozuk paketlerde ValueError fırlatır.
+    """
+    data = decompress(body, content_encoding)
+    if len(data) > MAX_DECODED_BYTES:
+        raise ValueError("Paket çok büyük")
+    if len(data) < HEADER.size:
+        raise ValueError("Paket başlığı eksik")
+
+    magic, version, _flags, _reserved, n = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Geçersiz paket (magic)")
+    if version != VERSION:
+        raise ValueError(f"Desteklenmeyen paket sürümü: {version}")
+
+    expected = HEADER.size + n * sum(dtype.itemsize for _, dtype in COLUMNS)
+    if len(data) != expected:
+        raise ValueError(f"Paket boyutu hatalı: {len(data)} != {expected}")
+
+    columns = {}
+    offset = HEADER.size
+    for name, dtype in COLUMNS:
+        columns[name] = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += n * dtype.itemsize
+
+    return columns
+
+
+def select_columns(columns: dict[str, np.ndarray], mask: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    mask ile seçilen satırları ingest.store_metric_columns'un beklediği
+    kolonlara çevirir (run_id int64, ts datetime64[us], değerler float64,
+    NaN = boş). Satır başına nesne oluşturulmaz.
+    """
+    selected = {
+        "run_id": columns["run_id"][mask].astype(np.int64),
+        "ts": columns["ts"][mask].astype("datetime64[us]"),
+    }
+    for name in VALUE_FIELDS:
+        selected[name] = columns[name][mask].astype(np.float64)
+    return selected
@@ -0,0 +1,140 @@
+# benchmarks/bench_archive.py
+"""
+Bitmiş run arşivinin (bkz. app/utils/archive.py) boyutu ve okuma süresi,
+ham metrics satırlarıyla karşılaştırmalı.
+
+Veritabanına doğrudan bağlanır (app/database.py). --run-id verilmezse
+--samples örnekli bitmiş bir run eklenir (model_name="bench-archive");
+değerler gerçek eğitim ölçümlerine benzer (1 sn aralık, yavaş değişen güç
++ gürültü, tam sayı kullanım yüzdeleri, basamaklı bellek) ki sıkıştırma
+oranı rastgele veriye göre iyimser ya da kötümser olmasın. Run arşivlenir
+(ham satırlar silinmez) ve ölçülür:
+  - boyut: ham satırların tablodaki yeri (Postgres: pg_column_size, SQLite:
+    dbstat varsa tablonun run'a düşen payı), arşivin sıkıştırılmamış kolon
+    boyutu ve GRA1 blob boyutu,
+  - okuma: blob'u kolonlara çözme, load_series arşivden (süreç cache'i
+    boşken ve doluyken; satır nesneleri dahil) ile ham (run_id, ts) sorgusu.
+
+    python benchmarks/bench_archive.py --samples 1000000
+    python benchmarks/bench_archive.py --run-id 42 --repeat 10
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from common import summary, timed
+
+from app import models
+from app.database import SessionLocal
+from app.utils import archive
+from app.utils.ingest import bulk_insert_metric_columns
+from app.utils.series import SERIES_COLUMNS, load_run_series, run_time_window
+
+BENCH_MODEL = "bench-archive"
+INSERT_CHUNK_ROWS = 100_000
+
+
+def realistic_columns(run_id: int, t0: datetime, offset: int, n: int, rng) -> dict:
+    t = np.arange(offset, offset + n)
+    power = 220.0 + 40.0 * np.sin(t / 900.0) + rng.normal(0.0, 6.0, n)
+    return {
+        "run_id": np.full(n, run_id, dtype=np.int64),
+        "ts": np.datetime64(t0, "us") + (t * 1_000_000).astype("timedelta64[us]"),
+        "cpu_util": np.clip(np.round(35.0 + rng.normal(0.0, 8.0, n)), 0, 100),
+        "gpu_util": np.clip(np.round(92.0 + rng.normal(0.0, 4.0, n)), 0, 100),
+        "gpu_power_w": np.round(power, 2),
+        "mem_used_mb": 18_432.0 + 256.0 * (t // 3600 % 4),
+    }
+
+
+def populate(db, samples: int) -> models.Run:
+    rng = np.random.default_rng(0)
+    t0 = datetime.utcnow() - timedelta(seconds=samples + 3600)
+    run = models.Run(model_name=BENCH_MODEL, started_at=t0, ended_at=t0 + timedelta(seconds=samples))
+    db.add(run)
+    db.commit()
+
+    for offset in range(0, samples, INSERT_CHUNK_ROWS):
+        n = min(INSERT_CHUNK_ROWS, samples - offset)
+        bulk_insert_metric_columns(db, realistic_columns(run.id, t0, offset, n, rng))
+        db.commit()
+        print(f"\r[BENCH] {offset + n}/{samples} örnek yazıldı", end="", flush=True)
+    print()
+    return run
+
+
+def raw_table_bytes(db, run_id: int) -> int | None:
+    """Ham satırların tablodaki yaklaşık yeri (index'ler hariç); ölçülemezse None."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return db.execute(
+            text("SELECT sum(pg_column_size(m.*)) FROM metrics m WHERE run_id = :r"), {"r": run_id}
+        ).scalar()
+    if dialect == "sqlite":
+        try:
+            table = db.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = 'metrics'")).scalar()
+        except Exception:
+            db.rollback()
+            return None   # dbstat derlenmemiş
+        total = db.execute(text("SELECT count(*) FROM metrics")).scalar()
+        rows = db.execute(text("SELECT count(*) FROM metrics WHERE run_id = :r"), {"r": run_id}).scalar()
+        return int(table * rows / total) if total else None
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--run-id", type=int, help="var olan bitmiş run (verilmezse yeni run eklenir)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        run = db.get(models.Run, args.run_id) if args.run_id else populate(db, args.samples)
+        if run is None or run.ended_at is None:
+            raise SystemExit("run yok ya da bitmemiş")
+
+        stored = archive.archive_run(db, run, purge_raw=False)
+        db.commit()
+        stats = archive.archive_stats(stored)
+
+        mb = lambda b: f"{b / 1e6:8.2f} MB" if b is not None else "       ? MB"
+        raw = raw_table_bytes(db, run.id)
+        print(f"run {run.id}: {stats['n_rows']:,} satır, codec {stats['codec']}")
+        print(f"ham satırlar (tablo)      {mb(raw)}")
+        print(f"arşiv, sıkıştırılmamış    {mb(stats['raw_bytes'])}")
+        print(f"arşiv blob (GRA1)         {mb(stats['stored_bytes'])}   "
+              f"{stats['bytes_per_row']} B/satır"
+              + (f", ham tablonun 1/{raw / stats['stored_bytes']:.1f}'i" if raw else ""))
+
+        window = run_time_window(run)
+
+        def clear_cache():
+            with archive._cache_lock:
+                archive._cache.clear()
+
+        def decode():
+            clear_cache()
+            archive.load_archived_columns(db, run.id)
+
+        def cold():
+            clear_cache()
+            archive.load_series(db, run)
+
+        samples = timed(decode, args.repeat, warmup=1)
+        print(f"arşiv → kolonlar (çözme)          {summary(samples)}")
+        samples = timed(cold, args.repeat, warmup=1)
+        print(f"load_series, arşiv (cache boş)    {summary(samples)}")
+        samples = timed(lambda: archive.load_series(db, run), args.repeat, warmup=1)
+        print(f"load_series, arşiv (cache dolu)   {summary(samples)}")
+        samples = timed(lambda: load_run_series(db, run.id, SERIES_COLUMNS, window), args.repeat, warmup=1)
+        print(f"ham (run_id, ts) sorgusu          {summary(samples)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_columnar.py
+"""
+Seri uçlarında satır (varsayılan) ve shape=columnar cevapları
+(bkz. app/utils/fast_json.py): süre ve cevap boyutu.
+
+Çalışan sunucuya karşı (bkz. benchmarks/common.py). --run-id verilmezse
+yeni bir run açılıp --samples örnek /metrics/batch ile yazılır.
+  - GET /metrics/by_run/{id}           (bütün seri)
+  - GET /runs/{id}/live?limit=5000     (canlı kuyruğun en uzun sayfası)
+
+Sonunda sadece kodlama süresi süreç içinde ölçülür: MetricResponse
+listesi (pydantic dump_json) ile kolon sözlüğü (fast_json.dumps; kullanılan
+kodlayıcı, orjson ya da standart json, satırın sonunda yazılır).
+
+    BENCH_NAME=... BENCH_API_KEY=... python benchmarks/bench_columnar.py --samples 100000
+"""
+import argparse
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from pydantic import TypeAdapter
+
+from common import login, summary, timed, url
+
+from app import schemas
+from app.utils.fast_json import ENCODER, dumps, to_columns
+
+BATCH_SIZE = 5000
+FIELDS = ("id", "run_id", "ts", "cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+
+def sample(run_id: int, i: int, t0: datetime) -> dict:
+    return {
+        "run_id": run_id,
+        "cpu_util": float(i % 100),
+        "gpu_util": float((i * 7) % 100),
+        "gpu_power_w": 100.0 + i % 50,
+        "mem_used_mb": 2048.0,
+        "ts": (t0 + timedelta(milliseconds=100 * i)).isoformat(),
+    }
+
+
+def populate(session, samples: int) -> int:
+    res = session.post(url("/runs/"), json={"model_name": "bench-columnar"})
+    res.raise_for_status()
+    run_id = res.json()["id"]
+
+    t0 = datetime.utcnow()
+    for offset in range(0, samples, BATCH_SIZE):
+        items = [sample(run_id, i, t0) for i in range(offset, min(samples, offset + BATCH_SIZE))]
+        session.post(url("/metrics/batch"), json={"items": items}).raise_for_status()
+    return run_id
+
+
+def bench_http(session, path: str, repeat: int):
+    for shape in ("rows", "columnar"):
+        sep = "&" if "?" in path else "?"
+        full = url(f"{path}{sep}shape={shape}")
+        size = len(session.get(full).content)
+        samples = timed(lambda: session.get(full).raise_for_status(), repeat, warmup=1)
+        print(f"{path:<32} {shape:<9} {size / 1e6:6.2f} MB   {summary(samples)}")
+
+
+def bench_encode(n: int, repeat: int):
+    t0 = datetime.utcnow()
+    tuples = [
+        (i, 1, t0 + timedelta(milliseconds=100 * i), float(i % 100), float((i * 7) % 100), 100.0 + i % 50, 2048.0)
+        for i in range(n)
+    ]
+    rows = [SimpleNamespace(**dict(zip(FIELDS, t))) for t in tuples]
+    adapter = TypeAdapter(list[schemas.MetricResponse])
+
+    samples = timed(lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True)), repeat, warmup=1)
+    print(f"kodlama {n:,} satır  MetricResponse   {summary(samples)}")
+    samples = timed(lambda: dumps(to_columns(tuples, FIELDS)), repeat, warmup=1)
+    print(f"kodlama {n:,} satır  columnar         {summary(samples)}   ({ENCODER})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--run-id", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    session = login()
+    run_id = args.run_id or populate(session, args.samples)
+
+    bench_http(session, f"/metrics/by_run/{run_id}", args.repeat)
+    bench_http(session, f"/runs/{run_id}/live?limit=5000", args.repeat)
+    bench_encode(args.samples, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_downsample.py
+"""
+Seyreltme gecikmesi (bkz. app/utils/downsample.py).
+
+Sunucu gerektirmez. Dört grafik kolonlu sentetik seri üzerinde her yöntem
+için downsample_indices süresi, ayrıca satır nesnelerinden (ORM satırı
+gibi) downsample_rows süresi ölçülür; seçilen nokta sayısı ve tepelerin
+korunduğu da yazılır.
+
+    python benchmarks/bench_downsample.py --samples 100000 1000000 --max-points 2000
+"""
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from common import summary, timed
+
+from app.utils.downsample import CHART_FIELDS, METHODS, downsample_indices, downsample_rows
+
+Row = namedtuple("Row", ("ts", *CHART_FIELDS))
+
+
+def make_series(n: int):
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 2.0, n)) + 1.7e9
+    columns = [rng.normal(50.0, 10.0, n) for _ in CHART_FIELDS]
+    for y in columns:
+        y[rng.integers(1, n - 1, 5)] = 1000.0   # tek noktalık tepeler
+    return x, columns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--max-points", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in args.samples:
+        x, columns = make_series(n)
+        print(f"{n:,} nokta x {len(columns)} kolon → {args.max_points}")
+        for method in METHODS:
+            keep = downsample_indices(x, columns, args.max_points, method)
+            peaks = all(np.max(y[keep]) == np.max(y) for y in columns)
+            samples = timed(lambda: downsample_indices(x, columns, args.max_points, method), args.repeat, warmup=1)
+            print(f"  {method:7s} indices  {summary(samples)}   seçilen={len(keep)} tepeler={peaks}")
+
+        rows = [Row(*r) for r in zip(x.tolist(), *(y.tolist() for y in columns))]
+        samples = timed(lambda: downsample_rows(rows, args.max_points, CHART_FIELDS, x_field="ts"), max(args.repeat // 5, 1))
+        print(f"  rows (lttb)     {summary(samples)}")
+
+
+if __name__ == "__main__":
+    main()
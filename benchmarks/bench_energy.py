@@ -0,0 +1,58 @@
+# benchmarks/bench_energy.py
+"""
+Enerji entegrasyon motorunun hızı (bkz. app/utils/emission_calc.py).
+
+Sunucu gerektirmez; sentetik seriler üzerinde:
+  - tek seri integrate_energy_wh ve cumulative_energy_wh (NumPy),
+  - integrate_runs ile çok run'ın tek seferde entegrasyonu,
+  - karşılaştırma için saf Python döngüsü (yamuk kuralı).
+
+    python benchmarks/bench_energy.py --samples 10000000 --runs 1000
+"""
+import argparse
+
+import numpy as np
+
+from common import summary, timed
+
+from app.utils.emission_calc import cumulative_energy_wh, integrate_energy_wh, integrate_runs
+
+
+def python_loop_wh(ts_s, power_w) -> float:
+    total = 0.0
+    for i in range(1, len(ts_s)):
+        total += (power_w[i - 1] + power_w[i]) / 2.0 * (ts_s[i] - ts_s[i - 1]) / 3600.0
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=10_000_000)
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--loop-samples", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Düzensiz örnekleme (0.5–3 sn) ve 50–300 W güç
+    ts_s = np.cumsum(rng.uniform(0.5, 3.0, args.samples)) + 1.7e9
+    power_w = rng.uniform(50.0, 300.0, args.samples)
+    run_ids = rng.integers(0, args.runs, args.samples)
+
+    print(f"{args.samples:,} örnek, {args.runs} run")
+    print(f"integrate_energy_wh   {summary(timed(lambda: integrate_energy_wh(ts_s, power_w), args.repeat, warmup=1))}")
+    print(f"cumulative_energy_wh  {summary(timed(lambda: cumulative_energy_wh(ts_s, power_w), args.repeat, warmup=1))}")
+    print(f"integrate_runs        {summary(timed(lambda: integrate_runs(run_ids, ts_s, power_w), args.repeat, warmup=1))}")
+
+    n = args.loop_samples
+    ts_list, power_list = ts_s[:n].tolist(), power_w[:n].tolist()
+    print(f"python döngüsü ({n:,}) {summary(timed(lambda: python_loop_wh(ts_list, power_list), 1))}")
+
+    # Aynı sonucu verdiğini de kontrol et
+    expected = python_loop_wh(ts_list, power_list)
+    got = integrate_energy_wh(ts_s[:n], power_w[:n])
+    print(f"fark: {abs(expected - got):.3e} Wh")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_ingest.py
+"""
+Metrik yazma hızı: örnek başına POST /metrics/ ile toplu POST /metrics/batch.
+
+Çalışan sunucuya karşı (bkz. benchmarks/common.py); her mod için yeni bir
+run açılır, ardışık isteklerle örnek / sn ölçülür. Run'lar sonunda durdurulur.
+
+    BENCH_NAME=... BENCH_API_KEY=... python benchmarks/bench_ingest.py \\
+        --single 2000 --batch-sizes 100 500 1000 --batches 20
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from common import login, url
+
+
+def sample(run_id: int, i: int, t0: datetime) -> dict:
+    return {
+        "run_id": run_id,
+        "cpu_util": float(i % 100),
+        "gpu_util": float((i * 7) % 100),
+        "gpu_power_w": 100.0 + i % 50,
+        "mem_used_mb": 2048.0,
+        "ts": (t0 + timedelta(milliseconds=10 * i)).isoformat(),
+    }
+
+
+def new_run(session, label: str) -> int:
+    res = session.post(url("/runs/"), json={"model_name": f"bench-ingest-{label}"})
+    res.raise_for_status()
+    return res.json()["id"]
+
+
+def bench_single(session, n: int) -> float:
+    run_id = new_run(session, "single")
+    t0 = datetime.utcnow()
+    start = time.perf_counter()
+    for i in range(n):
+        body = sample(run_id, i, t0)
+        body.pop("ts")   # tekli uç sunucu zamanını kullanır
+        session.post(url("/metrics/"), json=body).raise_for_status()
+    elapsed = time.perf_counter() - start
+    session.post(url(f"/runs/{run_id}/stop"))
+    return n / elapsed
+
+
+def bench_batch(session, batch_size: int, batches: int) -> tuple[float, int]:
+    run_id = new_run(session, f"batch{batch_size}")
+    t0 = datetime.utcnow()
+    payloads = [
+        {"items": [sample(run_id, b * batch_size + i, t0) for i in range(batch_size)]}
+        for b in range(batches)
+    ]
+    accepted = 0
+    start = time.perf_counter()
+    for payload in payloads:
+        res = session.post(url("/metrics/batch"), json=payload)
+        res.raise_for_status()
+        accepted += res.json()["accepted"]
+    elapsed = time.perf_counter() - start
+    session.post(url(f"/runs/{run_id}/stop"))
+    return accepted / elapsed, accepted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--single", type=int, default=2000, help="tekli uçla gönderilecek örnek sayısı")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--batches", type=int, default=20)
+    args = parser.parse_args()
+
+    session = login()
+
+    single = bench_single(session, args.single)
+    print(f"POST /metrics/          tekli      {single:9.0f} örnek/sn")
+    for size in args.batch_sizes:
+        rate, accepted = bench_batch(session, size, args.batches)
+        print(f"POST /metrics/batch    {size:5d}'lik  {rate:9.0f} örnek/sn   (x{rate / single:.1f}, kabul={accepted})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_pagination.py
+"""
+Run listesinde keyset sayfa ile OFFSET sayfasının derinliğe göre maliyeti
+(bkz. app/utils/pagination.py).
+
+Veritabanına doğrudan bağlanır (app/database.py). --populate sentetik
+run'lar ekler (model_name="bench-pagination"). Her sıralama (id,
+started_at, -started_at) için sayfa başı, ortası ve sonu ölçülür:
+  - keyset: paginate() o derinlikteki satırın imleciyle (GET /runs/ ile aynı),
+  - OFFSET: aynı sıralamayla ORDER BY ... OFFSET derinlik LIMIT n.
+
+    python benchmarks/bench_pagination.py --populate --runs 200000
+    python benchmarks/bench_pagination.py --limit 1000 --repeat 20
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from common import summary, timed
+
+from app import models
+from app.database import SessionLocal
+from app.routes.runs import RUN_SORTS
+from app.utils.pagination import encode_cursor, paginate, parse_sort
+
+BENCH_MODEL = "bench-pagination"
+INSERT_CHUNK_ROWS = 10_000
+SORTS = ("id", "started_at", "-started_at")
+
+
+def populate(db, runs: int):
+    t0 = datetime.utcnow() - timedelta(minutes=runs)
+    for offset in range(0, runs, INSERT_CHUNK_ROWS):
+        rows = [
+            # started_at id sırasıyla aynı olmasın diye karıştırılır
+            {"model_name": BENCH_MODEL, "started_at": t0 + timedelta(minutes=(i * 7919) % runs), "ended_at": None}
+            for i in range(offset, min(runs, offset + INSERT_CHUNK_ROWS))
+        ]
+        db.execute(insert(models.Run), rows)
+        db.commit()
+        print(f"\r[BENCH] {offset + len(rows)}/{runs} run yazıldı", end="", flush=True)
+    print()
+
+
+def ordered(sort: str):
+    columns, desc = parse_sort(sort, RUN_SORTS)
+    return columns, [c.desc() if desc else c.asc() for c in columns]
+
+
+def cursor_at(db, sort: str, depth: int):
+    """depth satır atlandıktan sonraki sayfanın imleci (derinlik 0'da None)."""
+    if depth == 0:
+        return None
+    columns, order = ordered(sort)
+    row = db.execute(select(*columns).order_by(*order).offset(depth - 1).limit(1)).one()
+    return encode_cursor(sort, list(row))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--populate", action="store_true")
+    parser.add_argument("--runs", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.populate:
+            populate(db, args.runs)
+
+        total = db.query(func.count(models.Run.id)).scalar()
+        depths = sorted({0, total // 2, max(0, total - args.limit)})
+        print(f"{total:,} run, sayfa {args.limit} satır")
+
+        for sort in SORTS:
+            _, order = ordered(sort)
+            for depth in depths:
+                cursor = cursor_at(db, sort, depth)
+
+                def keyset():
+                    paginate(db, models.Run, RUN_SORTS, sort, args.limit, cursor)
+                    db.expunge_all()
+
+                def offset():
+                    db.execute(select(models.Run).order_by(*order).offset(depth).limit(args.limit + 1)).scalars().all()
+                    db.expunge_all()
+
+                print(f"{sort:<12} derinlik {depth:>9,}   keyset  {summary(timed(keyset, args.repeat, warmup=2))}")
+                print(f"{'':<12} {'':>18}   OFFSET  {summary(timed(offset, args.repeat, warmup=2))}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/bench_partitions.py
+"""
+metrics tablosunda yazma ve zaman aralığı okuma hızı (bkz.
+app/utils/partitions.py). Aynı script iki kurulumda çalıştırılıp
+karşılaştırılır: METRICS_PARTITIONING=0 (düz tablo) ve =1 (bölümlü).
+
+Veritabanına doğrudan bağlanır (app/database.py):
+  - --populate: son --months aya yayılmış sentetik run'lar ekler
+    (model_name="bench-partitions"; ham satırlar bulk_insert_metric_columns
+    ile yazılır) ve yazma hızını (satır / sn) ölçer. Bölümlü tabloda geçmiş
+    aylar için bölümler önce oluşturulur.
+  - zaman aralığı sorgusu (count + avg, --range-days gün) ve run
+    penceresiyle seri okuma (uygulamanın sorgusu) süreleri; Postgres'te
+    planın taradığı bölüm sayısı da yazılır (pruning).
+
+    python benchmarks/bench_partitions.py --populate --months 6 --runs 60 --samples-per-run 100000
+    python benchmarks/bench_partitions.py --queries 20
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from common import summary, timed
+
+from app import models
+from app.database import SessionLocal, engine
+from app.utils.ingest import VALUE_FIELDS, bulk_insert_metric_columns
+from app.utils.partitions import ensure_partitions, is_partitioned
+from app.utils.series import SERIES_COLUMNS, load_run_window, run_series_query
+
+BENCH_MODEL = "bench-partitions"
+INSERT_CHUNK_ROWS = 50_000
+
+Metric = models.Metric
+
+
+def layout() -> str:
+    if engine.dialect.name != "postgresql":
+        return f"düz ({engine.dialect.name})"
+    with engine.connect() as conn:
+        return "bölümlü" if is_partitioned(conn) else "düz"
+
+
+# ============================
+# Yazma
+# ============================
+def populate(db, months: int, runs: int, samples_per_run: int) -> float:
+    """Run'ları son months aya eşit aralıkla yayar; satır / sn döner."""
+    now = datetime.utcnow()
+    first = now - timedelta(days=30 * months)
+    step = (now - first - timedelta(seconds=samples_per_run)) / max(runs, 1)
+
+    if layout() == "bölümlü":
+        with engine.begin() as conn:
+            ensure_partitions(conn, since=first.date())
+
+    rng = np.random.default_rng(0)
+    written, elapsed = 0, 0.0
+    for r in range(runs):
+        started = first + step * r
+        run = models.Run(model_name=BENCH_MODEL, started_at=started, ended_at=started + timedelta(seconds=samples_per_run))
+        db.add(run)
+        db.commit()
+
+        for offset in range(0, samples_per_run, INSERT_CHUNK_ROWS):
+            n = min(INSERT_CHUNK_ROWS, samples_per_run - offset)
+            columns = {
+                "run_id": np.full(n, run.id, dtype=np.int64),
+                "ts": np.datetime64(started, "us") + (np.arange(offset, offset + n) * 1_000_000).astype("timedelta64[us]"),
+            }
+            for name in VALUE_FIELDS:
+                columns[name] = rng.uniform(0.0, 300.0, n)
+
+            t0 = time.perf_counter()
+            bulk_insert_metric_columns(db, columns)
+            db.commit()
+            elapsed += time.perf_counter() - t0
+            written += n
+        print(f"\r[BENCH] {r + 1}/{runs} run, {written / elapsed:,.0f} satır/sn", end="", flush=True)
+    print()
+    return written / elapsed
+
+
+# ============================
+# Okuma
+# ============================
+def range_query(start: datetime, end: datetime):
+    return (
+        select(func.count(), func.avg(Metric.gpu_power_w))
+        .where(Metric.ts >= start, Metric.ts < end)
+    )
+
+
+def scanned_partitions(db, query) -> int | None:
+    """Postgres planının dokunduğu tablo sayısı; diğer veritabanlarında None."""
+    if engine.dialect.name != "postgresql":
+        return None
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+
+    names = set()
+    def walk(node):
+        if "Relation Name" in node:
+            names.add(node["Relation Name"])
+        for child in node.get("Plans", ()):
+            walk(child)
+    walk(plan[0]["Plan"])
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--populate", action="store_true")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=60)
+    parser.add_argument("--samples-per-run", type=int, default=100_000)
+    parser.add_argument("--range-days", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"metrics düzeni: {layout()}")
+    db = SessionLocal()
+    try:
+        if args.populate:
+            rate = populate(db, args.months, args.runs, args.samples_per_run)
+            print(f"yazma: {rate:,.0f} satır/sn")
+
+        first, last = db.query(func.min(Metric.ts), func.max(Metric.ts)).one()
+        if first is None:
+            raise SystemExit("metrics boş; önce --populate ile veri ekleyin")
+        span = last - first - timedelta(days=args.range_days)
+
+        random.seed(0)
+        windows = [first + span * random.random() for _ in range(args.queries)]
+        queries = iter([range_query(w, w + timedelta(days=args.range_days)) for w in windows] * 2)
+        samples = timed(lambda: db.execute(next(queries)).one(), args.queries, warmup=1)
+        touched = scanned_partitions(db, range_query(windows[0], windows[0] + timedelta(days=args.range_days)))
+        note = f"   taranan tablo: {touched}" if touched is not None else ""
+        print(f"{args.range_days} günlük aralık (count/avg)   {summary(samples)}{note}")
+
+        run_ids = [r for (r,) in db.query(models.Run.id).filter(models.Run.model_name == BENCH_MODEL)]
+        if run_ids:
+            picked = random.sample(run_ids, min(args.queries, len(run_ids)))
+            series = iter([run_series_query(r, SERIES_COLUMNS, *load_run_window(db, r)) for r in picked] * 2)
+            samples = timed(lambda: db.execute(next(series)).all(), len(picked), warmup=1)
+            print(f"run penceresiyle seri okuma       {summary(samples)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# benchmarks/bench_principal_cache.py
+"""
+Sık yoklanan uçlarda principal cache etkisi (bkz. app/utils/principal_cache.py).
+
+Aynı script iki kez, sunucu farklı ayarla başlatılarak çalıştırılır:
+
+    PRINCIPAL_CACHE_TTL_S=0 uvicorn app.main:app     # cache kapalı
+    uvicorn app.main:app                             # varsayılan (30 sn)
+
+    BENCH_NAME=... BENCH_API_KEY=... python benchmarks/bench_principal_cache.py
+
+Her uç için ardışık isteklerde req/s ve gecikme yazılır.
+"""
+import argparse
+
+from common import login, rate, summary, timed, url
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--run-id", type=int, help="/runs/{id}/live için (verilmezse yeni run açılır)")
+    args = parser.parse_args()
+
+    session = login()
+    run_id = args.run_id or session.post(url("/runs/"), json={"model_name": "bench-principal"}).json()["id"]
+
+    # Bearer başlığı olmadan: cookie oturumu (tarayıcı gibi)
+    cookie_only = {"Authorization": None}
+    paths = [
+        ("/monitor/live", cookie_only),
+        (f"/runs/{run_id}/live?limit=1", cookie_only),
+        ("/users/", {}),
+    ]
+    for path, headers in paths:
+        samples = timed(lambda: session.get(url(path), headers=headers), args.requests, warmup=50)
+        print(f"{path:28s} {rate(samples)}   {summary(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_series_queries.py
+"""
+(run_id, ts) / (run_id, id) index'lerinin seri okumalarına etkisi
+(bkz. app/utils/series.py).
+
+Veritabanına doğrudan bağlanır (app/database.py). --populate sentetik run'lar
+ve metrikler ekler (model_name="bench-series"). Ham satırlar
+bulk_insert_metric_columns ile yazılır; rollup / özet tabloları
+güncellenmez (panel sayaçlarını reconcile-dashboard düzeltir).
+
+Her sorgu iki kez ölçülür; tablo ya da index değiştirilmez:
+  - index ile: uygulamanın sorgusu aynen,
+  - index'siz: Postgres'te aynı transaction'da SET LOCAL enable_indexscan /
+    enable_indexonlyscan / enable_bitmapscan = off, SQLite'ta NOT INDEXED.
+
+    python benchmarks/bench_series_queries.py --populate --runs 1000 --samples-per-run 50000   # 50M satır
+    python benchmarks/bench_series_queries.py --queries 10
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects import sqlite
+
+from common import summary, timed
+
+from app import models
+from app.database import SessionLocal
+from app.utils.ingest import VALUE_FIELDS, bulk_insert_metric_columns
+from app.utils.series import LIVE_COLUMNS, POWER_COLUMNS, SERIES_COLUMNS, load_run_window, run_series_query, run_series_since_query
+
+BENCH_MODEL = "bench-series"
+INSERT_CHUNK_ROWS = 100_000
+
+
+# ============================
+# Veri
+# ============================
+def populate(db, runs: int, samples_per_run: int):
+    rng = np.random.default_rng(0)
+    t0 = datetime.utcnow() - timedelta(seconds=samples_per_run)
+    for r in range(runs):
+        run = models.Run(model_name=BENCH_MODEL, started_at=t0, ended_at=t0 + timedelta(seconds=samples_per_run))
+        db.add(run)
+        db.commit()
+
+        for offset in range(0, samples_per_run, INSERT_CHUNK_ROWS):
+            n = min(INSERT_CHUNK_ROWS, samples_per_run - offset)
+            columns = {
+                "run_id": np.full(n, run.id, dtype=np.int64),
+                "ts": np.datetime64(t0, "us") + (np.arange(offset, offset + n) * 1_000_000).astype("timedelta64[us]"),
+            }
+            for name in VALUE_FIELDS:
+                columns[name] = rng.uniform(0.0, 300.0, n)
+            bulk_insert_metric_columns(db, columns)
+            db.commit()
+        print(f"\r[BENCH] {r + 1}/{runs} run yazıldı", end="", flush=True)
+    print()
+
+
+def bench_run_ids(db, count: int) -> list[int]:
+    ids = [r for (r,) in db.query(models.Run.id).filter(models.Run.model_name == BENCH_MODEL)]
+    if not ids:
+        raise SystemExit("bench run'ı yok; önce --populate ile veri ekleyin")
+    random.seed(0)
+    return random.sample(ids, min(count, len(ids)))
+
+
+# ============================
+# Sorgular
+# ============================
+QUERIES = {
+    "tam seri (by_run / run_detail)": lambda run_id, w: run_series_query(run_id, SERIES_COLUMNS, *w),
+    "güç serisi (stop_run / recalc)": lambda run_id, w: run_series_query(run_id, POWER_COLUMNS, *w),
+    "canlı son 600 (live)": lambda run_id, w: run_series_since_query(run_id, LIVE_COLUMNS, None, 600, *w),
+}
+
+
+def execute(db, query, indexed: bool) -> int:
+    if indexed:
+        return len(db.execute(query).all())
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        for setting in ("enable_indexscan", "enable_indexonlyscan", "enable_bitmapscan"):
+            db.execute(text(f"SET LOCAL {setting} = off"))
+        try:
+            return len(db.execute(query).all())
+        finally:
+            db.rollback()
+    if dialect == "sqlite":
+        compiled = query.compile(dialect=sqlite.dialect(paramstyle="named"))
+        sql = str(compiled).replace("FROM metrics", "FROM metrics NOT INDEXED", 1)
+        params = [bindparam(k, v, type_=compiled.binds[k].type) for k, v in compiled.params.items()]
+        return len(db.execute(text(sql).bindparams(*params)).all())
+    raise SystemExit(f"{dialect} için index'siz ölçüm desteklenmiyor")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--populate", action="store_true")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--samples-per-run", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=10, help="ölçülecek run sayısı")
+    parser.add_argument("--skip-unindexed", action="store_true", help="index'siz ölçümü atla (büyük tablolarda uzun sürer)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.populate:
+            populate(db, args.runs, args.samples_per_run)
+
+        total = db.query(models.Metric.id).count()
+        run_ids = bench_run_ids(db, args.queries)
+        windows = {run_id: load_run_window(db, run_id) for run_id in run_ids}
+        print(f"metrics: {total:,} satır, {len(run_ids)} run üzerinde")
+
+        modes = (True,) if args.skip_unindexed else (True, False)
+        for name, build in QUERIES.items():
+            for indexed in modes:
+                ids = iter(run_ids * 2)
+                samples = timed(
+                    lambda: execute(db, build(run_id := next(ids), windows[run_id]), indexed),
+                    len(run_ids),
+                    warmup=1,
+                )
+                print(f"{name:32s} {'index' if indexed else 'index yok':9s} {summary(samples)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_wire_format.py
+"""
+JSON ile ikili paket (application/x-green-metrics) karşılaştırması.
+
+Sunucu gerektirmeyen kısım, aynı örnekler için şunları ölçer:
+  - istemcide kodlama: json.dumps ile client/wire_format.encode_samples
+    (sıkıştırmasız / gzip / zstd);
+  - sunucuda çözme: MetricBatchCreate doğrulaması ile
+    decode_metric_batch + select_columns (satır başına nesne yok);
+  - gövde boyutu.
+
+--http verilirse aynı örnekler çalışan sunucuya /metrics/batch ve
+/metrics/batch/packed ile gönderilip uçtan uca örnek / sn de ölçülür.
+
+    python benchmarks/bench_wire_format.py --samples 50000
+    BENCH_NAME=... BENCH_API_KEY=... python benchmarks/bench_wire_format.py --http
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from common import ROOT, login, summary, timed, url
+
+sys.path.insert(0, os.path.join(ROOT, "client"))
+
+from wire_format import encode_samples, zstandard  # noqa: E402  (client/wire_format.py)
+
+from app.schemas import MetricBatchCreate  # noqa: E402
+from app.utils import wire_format  # noqa: E402
+
+
+def make_samples(n: int, run_id: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    t0 = time.time()
+    return [
+        {
+            "ts": t0 + i * 0.01,
+            "run_id": run_id,
+            "cpu_util": round(float(v[0]), 1),
+            "gpu_util": round(float(v[1]), 1),
+            "gpu_power_w": round(float(v[2]), 2),
+            "mem_used_mb": None if i % 50 == 0 else round(float(v[3]), 1),
+        }
+        for i, v in enumerate(rng.uniform(0, 300, (n, 4)))
+    ]
+
+
+def json_body(samples: list[dict]) -> bytes:
+    items = [
+        {**s, "ts": datetime.fromtimestamp(s["ts"], timezone.utc).isoformat()}
+        for s in samples
+    ]
+    return json.dumps({"items": items}).encode()
+
+
+def parse_json(body: bytes):
+    return MetricBatchCreate.model_validate_json(body).items
+
+
+def parse_packed(body: bytes, encoding):
+    columns = wire_format.decode_metric_batch(body, encoding)
+    return wire_format.select_columns(columns, np.ones(len(columns["ts"]), dtype=bool))
+
+
+def offline(samples: list[dict], repeat: int):
+    compressions = [None, "gzip"] + (["zstd"] if zstandard is not None else [])
+
+    body = json_body(samples)
+    print(f"json              {len(body) / 1e6:7.2f} MB")
+    print(f"  kodlama         {summary(timed(lambda: json_body(samples), repeat))}")
+    print(f"  çözme           {summary(timed(lambda: parse_json(body), repeat, warmup=1))}")
+
+    for compression in compressions:
+        packed, headers = encode_samples(samples, compression)
+        encoding = headers.get("Content-Encoding")
+        print(f"packed {compression or '':10s} {len(packed) / 1e6:7.2f} MB")
+        print(f"  kodlama         {summary(timed(lambda: encode_samples(samples, compression), repeat))}")
+        print(f"  çözme           {summary(timed(lambda: parse_packed(packed, encoding), repeat, warmup=1))}")
+
+
+def over_http(samples: list[dict], batch_size: int):
+    session = login()
+    for mode in ("json", "packed"):
+        run_id = session.post(url("/runs/"), json={"model_name": f"bench-wire-{mode}"}).json()["id"]
+        batch = [{**s, "run_id": run_id} for s in samples]
+        chunks = [batch[i:i + batch_size] for i in range(0, len(batch), batch_size)]
+
+        accepted = 0
+        start = time.perf_counter()
+        for chunk in chunks:
+            if mode == "json":
+                res = session.post(url("/metrics/batch"), data=json_body(chunk),
+                                   headers={"Content-Type": "application/json"})
+                res.raise_for_status()
+                accepted += res.json()["accepted"]
+            else:
+                body, headers = encode_samples(chunk)
+                res = session.post(url("/metrics/batch/packed"), data=body, headers=headers)
+                res.raise_for_status()
+                accepted += res.json()["accepted"]
+        elapsed = time.perf_counter() - start
+        session.post(url(f"/runs/{run_id}/stop"))
+        print(f"HTTP {mode:6s}  {accepted / elapsed:9.0f} örnek/sn   (kabul={accepted}, {batch_size}'lik paketler)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--http", action="store_true", help="çalışan sunucuya da gönder")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    samples = make_samples(args.samples, run_id=1)
+    print(f"{args.samples:,} örnek")
+    offline(samples, args.repeat)
+    if args.http:
+        over_http(samples, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
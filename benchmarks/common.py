@@ -0,0 +1,69 @@
+# benchmarks/common.py
+"""
+Benchmark script'lerinin ortak yardımcıları.
+
+Script'ler çalışan bir sunucuya HTTP ile bağlanır (veritabanı ayarı
+app/database.py'deki gibi sunucuya aittir):
+
+    BENCH_URL      (varsayılan http://127.0.0.1:8000)
+    BENCH_NAME     kullanıcı adı
+    BENCH_API_KEY  API anahtarı
+
+Saf hesaplama benchmark'ları (ör. seyreltme, enerji entegrasyonu) ise
+app.utils modüllerini doğrudan çağırır; sunucu gerektirmez.
+"""
+import os
+import statistics
+import sys
+import time
+
+# python benchmarks/xxx.py ile çalıştırıldığında app / client import edilebilsin
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCH_URL = os.getenv("BENCH_URL", "http://127.0.0.1:8000")
+BENCH_NAME = os.getenv("BENCH_NAME", "")
+BENCH_API_KEY = os.getenv("BENCH_API_KEY", "")
+
+
+def login():
+    """Cookie oturumu (/login) ve Bearer token (/auth/login) ile requests.Session."""
+    import requests
+
+    if not BENCH_NAME or not BENCH_API_KEY:
+        sys.exit("BENCH_NAME ve BENCH_API_KEY ayarlanmalı")
+
+    session = requests.Session()
+    session.post(f"{BENCH_URL}/login", data={"name": BENCH_NAME, "api_key": BENCH_API_KEY}, allow_redirects=False)
+    res = session.post(f"{BENCH_URL}/auth/login", json={"name": BENCH_NAME, "api_key": BENCH_API_KEY})
+    res.raise_for_status()
+    session.headers["Authorization"] = f"Bearer {res.json()['access_token']}"
+    return session
+
+
+def url(path: str) -> str:
+    return f"{BENCH_URL}{path}"
+
+
+def timed(fn, n: int, warmup: int = 0) -> list[float]:
+    """fn'i n kez çalıştırır; her çağrının süresi (ms)."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"median {statistics.median(ordered):8.2f} ms   p99 {p99:8.2f} ms   n={len(ordered)}"
+
+
+def rate(samples: list[float]) -> str:
+    """Ardışık isteklerde saniyedeki istek sayısı."""
+    return f"{len(samples) / (sum(samples) / 1000.0):7.0f} req/s"
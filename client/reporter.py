@@ -0,0 +1,375 @@
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from spool import MetricSpool, run_dir
+from wire_format import encode_samples
+
+# ======================================
+# 📡 ARKA PLAN METRİK GÖNDERİCİ
+# ======================================
+# Eğitim döngüsü ne ölçüm yapar ne de ağ beklemesine girer:
+#  - sampler thread: kendi zamanlayıcısıyla örnek alıp kuyruğa koyar
+#  - sender thread:  kuyruğu toplu halde /metrics/batch'e yollar
+#                    (keep-alive Session + üstel geri çekilmeli tekrar)
+#
+# spool_dir verilirse örnekler önce diske (MetricSpool, run başına ayrı
+# dizin: spool_dir/run-<id>) yazılır ve API ulaşılamadığında kaybolmaz;
+# bağlantı gelince diskteki segmentler toplu olarak yeniden gönderilir ve
+# sadece sunucu paketi kabul edince (200; tek tek reddedilen örnekler dahil)
+# silinir. Çökmüş eski run'ların dizinleri de kendi run'ları adına gönderilir.
+#
+# wire_format="packed" ile paketler JSON yerine kolon bazlı ikili formatta
+# (/metrics/batch/packed) gönderilir; compression ile gzip/zstd seçilebilir.
+#
+# ingest_token (POST /runs/ cevabı) verilirse paketler X-Ingest-Token ile
+# gönderilir; süresinin son TOKEN_RENEW_FRACTION kısmına girilince
+# /runs/{id}/ingest-token ile yenilenir. 401/403 gelirse (ör. kesinti token
+# süresinden uzun sürdü) token kullanıcı kimliğiyle yeniden alınır, oturum
+# da düşmüşse login_fn ile yeniden giriş yapılır; bu sırada segmentler
+# diskte kalır.
+
+TOKEN_RENEW_FRACTION = 0.2
+
+
+class MetricReporter:
+    def __init__(
+        self,
+        api_url,
+        run_id,
+        headers,
+        sample_fn,
+        interval_s=2.0,
+        batch_size=100,
+        flush_interval_s=5.0,
+        max_queue=10000,
+        max_retries=5,
+        backoff_base_s=0.5,
+        backoff_max_s=30.0,
+        spool_dir=None,
+        replay_max_rows=2000,
+        wire_format="json",
+        compression=None,
+        ingest_token=None,
+        ingest_token_expires_at=None,
+        login_fn=None,
+    ):
+        self.api_url = api_url
+        self.run_id = run_id
+        self.sample_fn = sample_fn
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.replay_max_rows = replay_max_rows
+        self.wire_format = wire_format
+        self.compression = compression
+        self.login_fn = login_fn
+
+        self.spool_root = spool_dir
+        self.spool = MetricSpool(run_dir(spool_dir, run_id)) if spool_dir else None
+        self._failures = 0
+        self._next_attempt = 0.0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sampler_loop, daemon=True)
+        self._sender = threading.Thread(target=self._sender_loop, daemon=True)
+
+        # Tek bağlantı havuzu: her gönderimde yeni TCP/TLS bağlantısı açılmaz
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # run_id → (token, bitiş epoch sn, ömür sn)
+        self._tokens = {}
+        if ingest_token:
+            self._set_token(run_id, ingest_token, ingest_token_expires_at)
+
+        self.sent = 0
+        self.dropped = 0
+
+    # -----------------------------
+    # Yaşam döngüsü
+    # -----------------------------
+    def start(self):
+        self._sampler.start()
+        self._sender.start()
+        print(f"📡 Metrik gönderici başladı (her {self.interval_s}s örnek, {self.batch_size}'lik paketler)")
+
+    def stop(self, timeout=30.0):
+        """Örneklemeyi durdurur, kuyrukta kalanları gönderip bekler."""
+        self._stop.set()
+        self._sampler.join(timeout)
+        self._sender.join(timeout)
+        self.session.close()
+        print(f"📡 Metrik gönderici durdu → gönderilen: {self.sent}, düşen: {self.dropped}")
+
+    # -----------------------------
+    # Örnekleme
+    # -----------------------------
+    def _sampler_loop(self):
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            try:
+                sample = self.sample_fn()
+                sample["run_id"] = self.run_id
+                self._queue.put_nowait(sample)
+            except queue.Full:
+                self.dropped += 1
+            except Exception as e:
+                print("⚠️ Metrik örneği alınamadı:", e)
+
+            elapsed = time.monotonic() - t0
+            self._stop.wait(max(0.0, self.interval_s - elapsed))
+
+    # -----------------------------
+    # Gönderim
+    # -----------------------------
+    def _sender_loop(self):
+        while True:
+            stopping = self._stop.is_set()
+            batch = self._collect_batch()
+
+            if self.spool is None:
+                if batch:
+                    self._send_with_retry(batch)
+                elif stopping:
+                    break
+                continue
+
+            self.spool.append(batch)
+            if stopping or time.monotonic() >= self._next_attempt:
+                self._replay()
+            if stopping and not batch:
+                break
+
+        if self.spool is not None:
+            pending = self.spool.has_pending()
+            self.spool.close(remove_if_empty=True)
+            if pending:
+                print(f"💾 Gönderilemeyen metrikler diskte bekliyor: {self.spool.directory}")
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if self._stop.is_set():
+                remaining = 0
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _to_json_item(sample):
+        item = dict(sample)
+        item["ts"] = datetime.fromtimestamp(sample["ts"], timezone.utc).isoformat()
+        return item
+
+    def _set_token(self, run_id, token, expires_at):
+        ttl_s = max(expires_at - time.time(), 0.0) if expires_at is not None else 0.0
+        self._tokens[run_id] = (token, expires_at, ttl_s)
+
+    def _token_headers(self, run_id):
+        # Token yoksa başlık gönderilmez; sunucu isterse 401 → _refresh_token
+        entry = self._tokens.get(run_id)
+        return {"X-Ingest-Token": entry[0]} if entry else {}
+
+    def _renew_token_if_needed(self, run_id):
+        entry = self._tokens.get(run_id)
+        if entry is None or entry[1] is None:
+            return
+        _, expires_at, ttl_s = entry
+        if time.time() < expires_at - ttl_s * TOKEN_RENEW_FRACTION:
+            return
+        try:
+            self._refresh_token(run_id)
+        except requests.HTTPError as e:
+            print("⚠️ Ingest token yenilenemedi:", e)
+
+    def _refresh_token(self, run_id):
+        """
+        /runs/{id}/ingest-token: geçerli token varsa onunla, yoksa kullanıcı
+        kimliğiyle (Authorization) yeni token alır. Oturum düşmüşse login_fn
+        ile bir kez yeniden giriş yapılır.
+        True: yeni token alındı; False: run kapalı / yok (örnekler artık
+        yazılamaz). Geçici hatalarda requests.HTTPError.
+        """
+        url = f"{self.api_url}/runs/{run_id}/ingest-token"
+        r = self.session.post(url, headers=self._token_headers(run_id), timeout=10)
+        if r.status_code == 401 and self.login_fn is not None:
+            self.session.headers.update(self.login_fn())
+            r = self.session.post(url, timeout=10)
+
+        if r.status_code == 200:
+            body = r.json()
+            self._set_token(run_id, body["ingest_token"], body["ingest_token_expires_at"])
+            return True
+        if r.status_code in (404, 409):
+            self._tokens.pop(run_id, None)
+            return False
+        raise requests.HTTPError(f"ingest token: {r.status_code} {r.text}")
+
+    def _send(self, batch, run_id):
+        headers = self._token_headers(run_id)
+        if self.wire_format == "packed":
+            body, packed_headers = encode_samples(batch, self.compression)
+            headers.update(packed_headers)
+            return self.session.post(
+                f"{self.api_url}/metrics/batch/packed", data=body, headers=headers, timeout=10
+            )
+        items = [self._to_json_item(s) for s in batch]
+        return self.session.post(f"{self.api_url}/metrics/batch", json={"items": items}, headers=headers, timeout=10)
+
+    def _post_batch(self, batch, run_id=None):
+        """
+        Paketi gönderir. True: kabul edildi (tek tek reddedilen örnekler
+        dahil); False: kalıcı olarak reddedildi. Tekrar denenmesi gereken
+        durumlarda (bağlantı, 429 / 5xx, yenilenemeyen token) istisna fırlatır.
+        """
+        run_id = self.run_id if run_id is None else run_id
+        self._renew_token_if_needed(run_id)
+        r = self._send(batch, run_id)
+
+        if r.status_code in (401, 403):
+            # Token süresi dolmuş / kapsam dışı: yenileyip bir kez daha dene
+            if not self._refresh_token(run_id):
+                print(f"⚠️ Run {run_id} kapalı ya da yok; metrikler yazılamaz:", r.status_code, r.text)
+                return False
+            r = self._send(batch, run_id)
+
+        if r.status_code == 200:
+            body = r.json()
+            if body.get("rejected"):
+                print(f"⚠️ {body['rejected']} metrik reddedildi")
+            return True
+        if r.status_code in (401, 403, 429) or r.status_code >= 500:
+            raise requests.HTTPError(f"{r.status_code} {r.text}")
+
+        # Diğer 4xx: tekrar denemenin anlamı yok
+        print("⚠️ Metrik paketi kabul edilmedi:", r.status_code, r.text)
+        return False
+
+    def _send_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._post_batch(batch):
+                    self.sent += len(batch)
+                else:
+                    self.dropped += len(batch)
+                return
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    print("⚠️ Metrik paketi gönderilemedi, düşürülüyor:", e)
+                    self.dropped += len(batch)
+                    return
+
+                time.sleep(self._backoff_delay(attempt))
+
+    def _backoff_delay(self, attempt):
+        delay = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)  # jitter
+
+    # -----------------------------
+    # Spool'dan yeniden gönderim
+    # -----------------------------
+    def _replay(self):
+        """
+        Diskteki segmentleri en eskiden başlayarak toplu gönderir: önce bu
+        run'ınkileri, sonra sahipsiz (çökmüş) run dizinlerini, her biri kendi
+        run'ı adına. Hata olursa kalanlar diskte kalır ve geri çekilme süresi
+        kadar beklenir.
+        """
+        self.spool.seal()
+
+        try:
+            self._replay_spool(self.spool, self.run_id)
+            for run_id, orphan in MetricSpool.orphans(self.spool_root, exclude=self.spool.directory):
+                try:
+                    self._replay_spool(orphan, run_id)
+                finally:
+                    orphan.close(remove_if_empty=True)
+        except requests.RequestException as e:
+            if self._failures == 0:
+                print("⚠️ API'ye ulaşılamıyor, metrikler diske yazılıyor:", e)
+            self._next_attempt = time.monotonic() + self._backoff_delay(self._failures)
+            self._failures += 1
+            return
+
+        if self._failures:
+            print("✅ API'ye yeniden ulaşıldı, biriken metrikler gönderildi")
+        self._failures = 0
+
+    def _replay_spool(self, spool, run_id):
+        """
+        Segmentleri en eskiden başlayarak gönderir. Küçük segmentler
+        replay_max_rows'a kadar tek pakette birleştirilir; her segment
+        ancak kendi örneklerinin hepsi kabul edilince silinir.
+        """
+        group, rows = [], 0
+        for path in spool.segments():
+            segment = spool.read(path)
+            if group and rows + len(segment) > self.replay_max_rows:
+                self._ship_group(spool, run_id, group)
+                group, rows = [], 0
+
+            if len(segment) > self.replay_max_rows:
+                self._ship_segment(spool, run_id, path, segment)
+                continue
+            group.append((path, segment))
+            rows += len(segment)
+
+        if group:
+            self._ship_group(spool, run_id, group)
+
+    def _ship_group(self, spool, run_id, group):
+        """Tek pakette gönderilen segmentler: hepsi birlikte kabul ya da ret."""
+        samples = [s for _, segment in group for s in segment]
+        accepted = self._post_batch(samples, run_id)
+
+        # Kalıcı olarak reddedilenler kenara alınır (sonsuza dek tekrar
+        # denenmez, veri de kaybolmaz)
+        for path, _ in group:
+            if accepted:
+                spool.ack(path)
+            else:
+                spool.reject(path)
+
+        if accepted:
+            self.sent += len(samples)
+        else:
+            self.dropped += len(samples)
+
+    def _ship_segment(self, spool, run_id, path, samples):
+        """
+        replay_max_rows'tan büyük segment: parça parça gönderilir, kabul
+        edilen kayıt sayısı spool'a yazılır. Hata olursa sonraki deneme
+        kabul edilen parçalardan sonra devam eder.
+        """
+        start = spool.progress(path)
+        for i in range(start, len(samples), self.replay_max_rows):
+            chunk = samples[i:i + self.replay_max_rows]
+            if not self._post_batch(chunk, run_id):
+                # Kabul edilmiş baştaki kayıtlar sayılmaz; sadece kalanlar düşer
+                spool.reject(path)
+                self.dropped += len(samples) - i
+                return
+            spool.set_progress(path, i + len(chunk))
+            self.sent += len(chunk)
+
+        spool.ack(path)
@@ -0,0 +1,258 @@
+import glob
+import math
+import os
+import struct
+import time
+
+try:  # dizin kilidi POSIX'te; yoksa her dizini tek süreç kullanıyor varsayılır
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# ======================================
+# 💾 DİSK SPOOL (append-only)
+# ======================================
+# Her örnek sabit uzunlukta ikili kayıt olarak aktif segmente eklenir:
+#   ts_us (int64, UTC epoch mikro saniye) | run_id (int32) |
+#   cpu_util, gpu_util, gpu_power_w, mem_used_mb (float32, None → NaN)
+#
+# Aktif segment "*.open" uzantılıdır. seal() ile kapatılıp "*.seg" olur;
+# sunucu bir segmenti kabul edince (ack) dosya silinir; kalıcı olarak
+# reddedilen segment silinmez, "*.rejected" olarak kenara alınır.
+#
+# Bir segment birden fazla pakette gönderiliyorsa, sunucunun kabul ettiği
+# kayıt sayısı "<segment>.sent" dosyasına yazılır (progress / set_progress);
+# gönderim yarıda kesilirse tekrar deneme bu kayıtlardan sonra devam eder,
+# kabul edilmiş örnekler ikinci kez gönderilmez.
+#
+# Her run kendi dizinini kullanır (run_dir) ve dizini açık tuttuğu sürece
+# ".lock" dosyasını kilitler. Süreç çökerse dizin sahipsiz kalır; sonraki
+# bir gönderici orphans() ile kilidi alıp açık kalan segmenti kapatır ve o
+# run adına yeniden gönderir.
+
+RECORD = struct.Struct("<qiffff")
+VALUE_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+
+def _to_f32(value):
+    return math.nan if value is None else float(value)
+
+
+def _from_f32(value):
+    return None if math.isnan(value) else value
+
+
+def run_dir(root, run_id):
+    return os.path.join(root, f"run-{run_id}")
+
+
+class SpoolLocked(Exception):
+    """Dizin başka bir süreç tarafından kullanılıyor."""
+
+
+class MetricSpool:
+    def __init__(
+        self,
+        directory,
+        fsync_every=100,
+        fsync_interval_s=2.0,
+        max_segment_bytes=4 * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self.max_segment_bytes = max_segment_bytes
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = self._acquire_lock()
+
+        self._file = None
+        self._path = None
+        self._bytes = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._seq = self._last_sequence()
+
+        self._recover()
+
+    # -----------------------------
+    # Kilit / sahipsiz dizinler
+    # -----------------------------
+    def _acquire_lock(self):
+        lock = open(os.path.join(self.directory, ".lock"), "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                raise SpoolLocked(self.directory)
+        return lock
+
+    @classmethod
+    def orphans(cls, root, exclude=None):
+        """
+        root altındaki, çalışan bir süreç tarafından tutulmayan run dizinleri:
+        (run_id, MetricSpool) çiftleri. Çağıran işi bitince close() etmeli.
+        """
+        for path in sorted(glob.glob(os.path.join(root, "run-*"))):
+            if exclude is not None and os.path.abspath(path) == os.path.abspath(exclude):
+                continue
+            try:
+                run_id = int(os.path.basename(path).split("-", 1)[1])
+                yield run_id, cls(path)
+            except (ValueError, SpoolLocked):
+                continue
+
+    # -----------------------------
+    # Segment isimleri
+    # -----------------------------
+    def _last_sequence(self):
+        seqs = [0]
+        for path in glob.glob(os.path.join(self.directory, "segment-*.*")):
+            name = os.path.basename(path).split(".")[0]
+            try:
+                seqs.append(int(name.split("-")[1]))
+            except (IndexError, ValueError):
+                continue
+        return max(seqs)
+
+    def _recover(self):
+        """Önceki süreçten açık kalan segmentleri (yarım kaydı atarak) kapatır."""
+        for path in sorted(glob.glob(os.path.join(self.directory, "segment-*.open"))):
+            size = os.path.getsize(path)
+            whole = size - size % RECORD.size
+            if whole != size:
+                with open(path, "r+b") as f:
+                    f.truncate(whole)
+            if whole == 0:
+                os.remove(path)
+            else:
+                os.replace(path, path[: -len(".open")] + ".seg")
+
+    # -----------------------------
+    # Yazma
+    # -----------------------------
+    def append(self, samples):
+        if not samples:
+            return
+
+        if self._file is None:
+            self._seq += 1
+            self._path = os.path.join(self.directory, f"segment-{self._seq:08d}.open")
+            self._file = open(self._path, "ab")
+            self._bytes = 0
+
+        data = b"".join(
+            RECORD.pack(
+                int(round(s["ts"] * 1_000_000)),
+                int(s["run_id"]),
+                *(_to_f32(s.get(f)) for f in VALUE_FIELDS),
+            )
+            for s in samples
+        )
+        self._file.write(data)
+        self._bytes += len(data)
+        self._unsynced += len(samples)
+
+        if (
+            self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval_s
+        ):
+            self._sync()
+
+        if self._bytes >= self.max_segment_bytes:
+            self.seal()
+
+    def _sync(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def seal(self):
+        """Aktif segmenti kapatıp gönderilmeye hazır hale getirir."""
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        os.replace(self._path, self._path[: -len(".open")] + ".seg")
+        self._file = None
+        self._path = None
+
+    def close(self, remove_if_empty=False):
+        """Segmenti kapatır ve kilidi bırakır; istenirse boş dizini siler."""
+        self.seal()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+        if remove_if_empty and not self.segments() and not self.rejected():
+            try:
+                os.remove(os.path.join(self.directory, ".lock"))
+                os.rmdir(self.directory)
+            except OSError:
+                pass
+
+    # -----------------------------
+    # Okuma / onay
+    # -----------------------------
+    def segments(self):
+        """Kapatılmış segmentler, en eskiden yeniye."""
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.seg")))
+
+    def has_pending(self):
+        return self._file is not None or bool(self.segments())
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        data = data[: len(data) - len(data) % RECORD.size]
+
+        samples = []
+        for ts_us, run_id, *values in RECORD.iter_unpack(data):
+            sample = {"ts": ts_us / 1_000_000, "run_id": run_id}
+            for field, value in zip(VALUE_FIELDS, values):
+                sample[field] = _from_f32(value)
+            samples.append(sample)
+        return samples
+
+    def progress(self, path):
+        """Segmentin baştan kaç kaydı sunucuda kabul edildi (kısmi gönderim)."""
+        try:
+            with open(path + ".sent") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def set_progress(self, path, rows):
+        tmp = path + ".sent.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(rows))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path + ".sent")
+
+    def ack(self, path):
+        """Sunucunun kabul ettiği segmenti siler."""
+        for name in (path, path + ".sent"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def reject(self, path):
+        """
+        Kalıcı olarak reddedilen segmenti silmeden kenara alır (elle
+        incelenebilir). Kısmen kabul edildiyse ".sent" de yanında kalır.
+        """
+        rejected = path[: -len(".seg")] + ".rejected"
+        for src, dst in ((path, rejected), (path + ".sent", rejected + ".sent")):
+            try:
+                os.replace(src, dst)
+            except FileNotFoundError:
+                pass
+
+    def rejected(self):
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.rejected")))
@@ -8,6 +8,8 @@ from torchvision import datasets, transforms
 import json
 import os
 
+from reporter import MetricReporter
+
 # ======================================
 # 🔧 CONFIG.json OKU
 # ======================================
@@ -20,6 +22,16 @@ EMAIL = CONFIG.get("email", "")
 API_KEY = CONFIG["api_key"]
 MODEL_NAME = "pytorch-mnist-demo"
 
+# Metrik örnekleme aralığı (saniye) – eğitim döngüsünden bağımsız
+METRIC_INTERVAL_S = float(CONFIG.get("metric_interval_s", 2.0))
+
+# API'ye ulaşılamazken metriklerin biriktirileceği klasör
+SPOOL_DIR = CONFIG.get("spool_dir") or os.path.join(os.path.dirname(__file__), "spool")
+
+# Metrik paket formatı: "json" ya da "packed" (ikili, kolon bazlı)
+WIRE_FORMAT = CONFIG.get("wire_format", "json")
+WIRE_COMPRESSION = CONFIG.get("wire_compression")  # None | "gzip" | "zstd"
+
 # ======================================
 # 🔌 GPU İSTATİSTİĞİ İÇİN NVML (NVIDIA)
 # ======================================
@@ -116,46 +128,31 @@ def start_run(headers):
     run_id = data["id"]
 
     print(f"🚀 Run başladı → ID: {run_id}")
-    return run_id
+    return run_id, data.get("ingest_token"), data.get("ingest_token_expires_at")
 
 # ======================================
-# 3) METRİK GÖNDER
+# 3) METRİK ÖRNEĞİ (reporter thread'inde çağrılır)
 # ======================================
-def send_metric(run_id, headers):
+def collect_sample():
     """
-    ÖNEMLİ: GPU util'i okumadan önce 0.3s beklemek GPU'yu kaçırıyordu.
-    Bu yüzden CPU ölçümünü bloklamıyoruz.
+    Reporter'ın sampler thread'i tarafından çağrılır; eğitim döngüsünü
+    bloklamaz. torch.cuda.synchronize() YOK: NVML sürücüden okur,
+    CUDA kuyruğunu boşaltmaya gerek yok.
     """
-    # GPU ölçümünü ÖNCE al (beklemesiz)
-    if torch.cuda.is_available():
-        # CUDA işlerini bitirip ölçüme yakınlaştırır
-        torch.cuda.synchronize()
-
     gpu_util, gpu_watt = get_gpu_stats()
 
     # CPU ölçümünü bloklamadan al
     cpu = psutil.cpu_percent(interval=0.0)  # 0.0 -> beklemez
     mem_used = psutil.virtual_memory().used / 1024 / 1024
 
-    payload = {
-        "run_id": run_id,
+    return {
+        "ts": time.time(),
         "cpu_util": float(cpu),
         "gpu_util": float(gpu_util),
         "gpu_power_w": float(gpu_watt),
         "mem_used_mb": float(mem_used),
     }
 
-    r = requests.post(
-        f"{API_URL}/metrics/",
-        json=payload,
-        headers=headers
-    )
-
-    if r.status_code not in (200, 201):
-        print("⚠️ Metrik hatası:", r.status_code, r.text)
-    else:
-        print("📡 Metrik gönderildi:", payload)
-
 # ======================================
 # 4) MODEL EĞİT
 # ======================================
@@ -172,7 +169,7 @@ class Net(nn.Module):
         x = self.relu(self.fc1(x))
         return self.fc2(x)
 
-def train_model(run_id, headers):
+def train_model():
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"🖥️ Eğitim cihazı: {device}")
 
@@ -214,7 +211,6 @@ def train_model(run_id, headers):
 
             if i % 100 == 0:
                 print(f"Epoch {epoch+1}/{EPOCHS} | Loss: {loss.item():.4f}")
-                send_metric(run_id, headers)
 
     print("🎉 Eğitim bitti!")
     return model
@@ -235,6 +231,24 @@ def finish_run(run_id, headers):
 if __name__ == "__main__":
     init_nvml()
     headers = login()
-    run_id = start_run(headers)
-    train_model(run_id, headers)
+    run_id, ingest_token, ingest_token_expires_at = start_run(headers)
+
+    reporter = MetricReporter(
+        API_URL, run_id, headers, collect_sample,
+        interval_s=METRIC_INTERVAL_S,
+        spool_dir=SPOOL_DIR,
+        wire_format=WIRE_FORMAT,
+        compression=WIRE_COMPRESSION,
+        ingest_token=ingest_token,
+        ingest_token_expires_at=ingest_token_expires_at,
+        # Uzun kesintiden sonra token / oturum yeniden alınabilsin
+        login_fn=login,
+    )
+    reporter.start()
+    try:
+        train_model()
+    finally:
+        # Kuyrukta kalan metrikler run durdurulmadan önce gönderilsin
+        reporter.stop()
+
     finish_run(run_id, headers)
@@ -0,0 +1,62 @@
+import gzip
+import struct
+
+import numpy as np
+
+try:  # zstd isteğe bağlı
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ======================================
+# 📦 İKİLİ METRİK PAKETİ (application/x-green-metrics)
+# ======================================
+# Sunucudaki app/utils/wire_format.py ile aynı yerleşim:
+#   başlık : b"GMB1" | version u8 | flags u8 | reserved u16 | n u32
+#   kolonlar: ts int64 (UTC epoch µs) | run_id int32 |
+#             cpu_util, gpu_util, gpu_power_w, mem_used_mb float32 (None → NaN)
+# Değerler sunucuda float32 hassasiyetinde saklanır; tam hassasiyet için
+# wire_format="json".
+
+CONTENT_TYPE = "application/x-green-metrics"
+
+MAGIC = b"GMB1"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")
+
+VALUE_FIELDS = ("cpu_util", "gpu_util", "gpu_power_w", "mem_used_mb")
+
+
+def _value(v):
+    return np.nan if v is None else v
+
+
+def encode_samples(samples, compression=None):
+    """
+    Örnek listesini ikili pakete çevirir.
+    (gövde, ek_headerlar) döner; compression: None | "gzip" | "zstd".
+    """
+    n = len(samples)
+    ts = np.fromiter((round(s["ts"] * 1_000_000) for s in samples), dtype="<i8", count=n)
+    run_id = np.fromiter((s["run_id"] for s in samples), dtype="<i4", count=n)
+    values = [
+        np.fromiter((_value(s.get(f)) for s in samples), dtype="<f4", count=n)
+        for f in VALUE_FIELDS
+    ]
+
+    body = b"".join(
+        [HEADER.pack(MAGIC, VERSION, 0, 0, n), ts.tobytes(), run_id.tobytes()]
+        + [col.tobytes() for col in values]
+    )
+
+    headers = {"Content-Type": CONTENT_TYPE}
+    if compression == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    elif compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd için 'zstandard' paketi kurulu değil")
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        headers["Content-Encoding"] = "zstd"
+
+    return body, headers
@@ -0,0 +1,45 @@
+# tests/conftest.py
+"""
+Ortak fixture'lar. Testler uygulamanın veritabanına bağlanmaz: her test
+bellek içi SQLite'ta tabloları baştan kurar.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def make_run(db):
+    """Veritabanına run ekler; ended=True ise bitmiş olarak."""
+
+    def make(ended: bool = False) -> models.Run:
+        run = models.Run(model_name="test", started_at=datetime(2026, 1, 1))
+        if ended:
+            run.ended_at = datetime(2026, 1, 1, 1)
+        db.add(run)
+        db.commit()
+        return run
+
+    return make
@@ -0,0 +1,96 @@
+# tests/test_downsample.py
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from app.utils.downsample import METHODS, downsample_indices, downsample_rows
+
+
+def _series(n: int, n_columns: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.5, 2.0, n))
+    columns = []
+    for _ in range(n_columns):
+        y = rng.normal(50.0, 5.0, n)
+        # Tek noktalık tepe ve dip: seyreltmede kaybolmamalı
+        y[rng.integers(1, n - 1)] = 500.0
+        y[rng.integers(1, n - 1)] = -100.0
+        y[rng.random(n) < 0.01] = np.nan
+        columns.append(y)
+    return x, columns
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("max_points", [3, 5, 7, 12, 100, 1000])
+@pytest.mark.parametrize("n_columns", [1, 4])
+def test_indices_fit_budget(method, max_points, n_columns):
+    x, columns = _series(20_000, n_columns)
+
+    keep = downsample_indices(x, columns, max_points, method)
+
+    assert len(keep) <= max_points
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("max_points", [10, 100, 1000])
+def test_global_peaks_survive(method, max_points):
+    x, columns = _series(20_000, 4)
+
+    keep = downsample_indices(x, columns, max_points, method)
+
+    for y in columns:
+        assert np.nanmax(y[keep]) == np.nanmax(y)
+        assert np.nanmin(y[keep]) == np.nanmin(y)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_small_budget_keeps_maxima_first(method):
+    x, columns = _series(5_000, 4)
+
+    keep = downsample_indices(x, columns, 6, method)
+
+    assert len(keep) == 6
+    for y in columns:
+        assert np.nanmax(y[keep]) == np.nanmax(y)
+
+
+def test_short_series_is_returned_unchanged():
+    x = np.arange(10.0)
+    assert downsample_indices(x, [x], 10).tolist() == list(range(10))
+
+
+def test_constant_columns_fall_back_to_even_spacing():
+    x = np.arange(1000.0)
+    keep = downsample_indices(x, [np.full(1000, 3.0), np.full(1000, np.nan)], 50)
+    assert len(keep) == 50 and keep[0] == 0 and keep[-1] == 999
+
+
+def test_unknown_method():
+    x = np.arange(10.0)
+    with pytest.raises(ValueError):
+        downsample_indices(x, [x], 5, method="nope")
+
+
+Row = namedtuple("Row", "ts cpu_util gpu_util")
+
+
+def test_downsample_rows_keeps_peaks_and_order():
+    x, (cpu, gpu) = _series(5_000, 2)
+    rows = [Row(t, None if np.isnan(c) else c, g) for t, c, g in zip(x, cpu, gpu)]
+
+    out = downsample_rows(rows, 5, ("cpu_util", "gpu_util"))
+
+    assert len(out) <= 5
+    assert out[0] is rows[0] and out[-1] is rows[-1]
+    assert max(r.cpu_util for r in out if r.cpu_util is not None) == np.nanmax(cpu)
+    assert max(r.gpu_util for r in out) == np.nanmax(gpu)
+    assert [r.ts for r in out] == sorted(r.ts for r in out)
+
+
+def test_downsample_rows_dicts_and_no_limit():
+    rows = [{"ts": float(i), "cpu_util": float(i % 7)} for i in range(100)]
+    assert downsample_rows(rows, None, ("cpu_util",)) is rows
+    assert len(downsample_rows(rows, 10, ("cpu_util",))) <= 10
@@ -0,0 +1,49 @@
+# tests/test_ingest_columns.py
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import models
+from app.utils.ingest import VALUE_FIELDS, bulk_insert_metric_columns
+
+
+def _columns(run_id: int, n: int, start: int = 0) -> dict:
+    t0 = datetime(2026, 1, 1)
+    columns = {
+        "run_id": np.full(n, run_id, dtype=np.int64),
+        "ts": np.array([t0 + timedelta(seconds=start + i) for i in range(n)], dtype="datetime64[us]"),
+    }
+    for name in VALUE_FIELDS:
+        columns[name] = np.arange(start, start + n, dtype=np.float64)
+    return columns
+
+
+def _stored(db, ids):
+    rows = db.query(models.Metric).filter(models.Metric.id.in_(ids)).all()
+    by_id = {r.id: r for r in rows}
+    return [by_id[i] for i in ids]
+
+
+def test_ids_follow_input_order(db, make_run):
+    run = make_run()
+    ids = bulk_insert_metric_columns(db, _columns(run.id, 50))
+    db.commit()
+
+    assert ids == sorted(ids) and len(set(ids)) == 50
+    assert [r.cpu_util for r in _stored(db, ids)] == [float(i) for i in range(50)]
+
+
+def test_ids_match_rows_after_gaps_and_explicit_ids(db, make_run):
+    run = make_run()
+    db.add(models.Metric(id=1000, run_id=run.id, ts=datetime(2026, 1, 1), cpu_util=-1.0))
+    db.commit()
+    first = bulk_insert_metric_columns(db, _columns(run.id, 5))
+    db.query(models.Metric).filter(models.Metric.id == first[2]).delete()
+    db.commit()
+
+    ids = bulk_insert_metric_columns(db, _columns(run.id, 20, start=100))
+    db.commit()
+
+    assert min(ids) > 1000
+    assert [r.cpu_util for r in _stored(db, ids)] == [float(100 + i) for i in range(20)]
+    assert [r.ts for r in _stored(db, ids)] == [datetime(2026, 1, 1) + timedelta(seconds=100 + i) for i in range(20)]
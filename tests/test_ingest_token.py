@@ -0,0 +1,187 @@
+# tests/test_ingest_token.py
+import base64
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.routes import runs as runs_routes
+from app.utils.ingest_token import (
+    INGEST_TOKEN_MAX_LIFETIME_S,
+    INGEST_TOKEN_TTL_S,
+    _b64encode,
+    _sign,
+    can_renew,
+    check_scope,
+    mint_ingest_token,
+    verify_ingest_token,
+)
+from app.utils.run_cache import RunStateCache
+
+
+def _payload(token: str) -> dict:
+    body = token.split(".")[0]
+    return json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+
+
+def _status(excinfo) -> int:
+    return excinfo.value.status_code
+
+
+# ============================
+# Üretme / doğrulama
+# ============================
+def test_roundtrip():
+    token, expires_at = mint_ingest_token(5, 9)
+
+    claims = verify_ingest_token(token)
+
+    assert (claims.run_id, claims.device_id, claims.expires_at) == (5, 9, expires_at)
+    assert claims.issued_at == pytest.approx(time.time(), abs=2)
+    assert expires_at == claims.issued_at + INGEST_TOKEN_TTL_S
+
+
+def test_expired_token_is_rejected():
+    token, expires_at = mint_ingest_token(5, None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        verify_ingest_token(token, now=expires_at)
+    assert _status(excinfo) == 401
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda t: t[:-2] + ("AA" if not t.endswith("AA") else "BB"),   # imza
+    lambda t: _b64encode(b'{"r":6,"d":null,"e":9999999999}') + "." + t.split(".")[1],   # payload
+    lambda t: "not-a-token",
+    lambda t: t.replace(".", ""),
+])
+def test_tampered_token_is_rejected(mangle):
+    token, _ = mint_ingest_token(5, None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        verify_ingest_token(mangle(token))
+    assert _status(excinfo) == 401
+
+
+def test_scope():
+    token, _ = mint_ingest_token(5, None)
+    claims = verify_ingest_token(token)
+
+    check_scope(claims, [5, 5])
+    check_scope(None, [1, 2])           # token'sız istek kapsam kontrolüne girmez
+    with pytest.raises(HTTPException) as excinfo:
+        check_scope(claims, [5, 6])
+    assert _status(excinfo) == 403
+
+
+# ============================
+# Yenileme zinciri
+# ============================
+def test_renewal_keeps_chain_start_and_is_capped():
+    issued_at = int(time.time()) - INGEST_TOKEN_MAX_LIFETIME_S + 60
+
+    token, expires_at = mint_ingest_token(5, None, issued_at=issued_at)
+    claims = verify_ingest_token(token)
+
+    assert claims.issued_at == issued_at
+    assert expires_at == issued_at + INGEST_TOKEN_MAX_LIFETIME_S   # TTL değil, sınır
+    assert can_renew(claims)
+    assert not can_renew(claims, now=expires_at)
+
+
+def test_unlimited_lifetime():
+    token, _ = mint_ingest_token(5, None, issued_at=0, max_lifetime_s=0)
+    claims = verify_ingest_token(token)
+
+    assert can_renew(claims, max_lifetime_s=0)
+    assert not can_renew(claims)
+
+
+def test_legacy_token_without_chain_start():
+    expires_at = int(time.time()) + 100
+    payload = _b64encode(json.dumps({"r": 5, "d": None, "e": expires_at}).encode())
+
+    claims = verify_ingest_token(f"{payload}.{_sign(payload)}")
+
+    assert claims.issued_at == expires_at - INGEST_TOKEN_TTL_S
+
+
+# ============================
+# POST /runs/{id}/ingest-token
+# ============================
+@pytest.fixture
+def renew(db, monkeypatch):
+    monkeypatch.setattr(runs_routes, "run_cache", RunStateCache())
+    # Bearer doğrulaması: sadece "Bearer ok" geçerli
+    def current_user(authorization):
+        if authorization != "Bearer ok":
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return object()
+    monkeypatch.setattr(runs_routes, "get_current_user", current_user)
+
+    def call(run_id: int, token: str | None = None, bearer: str | None = None) -> dict:
+        headers = []
+        if token:
+            headers.append((b"x-ingest-token", token.encode()))
+        if bearer:
+            headers.append((b"authorization", bearer.encode()))
+        request = Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+        return runs_routes.renew_ingest_token(run_id, request, db)
+
+    return call
+
+
+def test_renew_with_valid_token(make_run, renew):
+    run = make_run()
+    old, _ = mint_ingest_token(run.id, 3, issued_at=int(time.time()) - 3600)
+
+    body = renew(run.id, token=old)
+
+    claims = verify_ingest_token(body["ingest_token"])
+    assert (claims.run_id, claims.device_id) == (run.id, 3)
+    assert claims.issued_at == _payload(old)["i"]
+
+
+def test_renew_other_runs_token_is_forbidden(make_run, renew):
+    run, other = make_run(), make_run()
+    token, _ = mint_ingest_token(other.id, None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        renew(run.id, token=token)
+    assert _status(excinfo) == 403
+
+
+def test_renew_past_lifetime_requires_user(make_run, renew):
+    run = make_run()
+    # Hâlâ geçerli ama zincir ömrü dolmuş token
+    stale, _ = mint_ingest_token(
+        run.id, None, issued_at=int(time.time()) - INGEST_TOKEN_MAX_LIFETIME_S, max_lifetime_s=0
+    )
+
+    with pytest.raises(HTTPException) as excinfo:
+        renew(run.id, token=stale)
+    assert _status(excinfo) == 401
+
+    body = renew(run.id, token=stale, bearer="Bearer ok")
+    assert verify_ingest_token(body["ingest_token"]).issued_at == pytest.approx(time.time(), abs=2)
+
+
+def test_renew_expired_token_falls_back_to_user(make_run, renew):
+    run = make_run()
+    expired, _ = mint_ingest_token(run.id, None, ttl_s=-1)
+
+    with pytest.raises(HTTPException):
+        renew(run.id, token=expired)
+    assert "ingest_token" in renew(run.id, token=expired, bearer="Bearer ok")
+
+
+@pytest.mark.parametrize("ended, code", [(True, 409), (None, 404)])
+def test_renew_closed_or_missing_run(make_run, renew, ended, code):
+    run_id = make_run(ended=True).id if ended else 999
+    token, _ = mint_ingest_token(run_id, None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        renew(run_id, token=token)
+    assert _status(excinfo) == code
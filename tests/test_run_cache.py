@@ -0,0 +1,203 @@
+# tests/test_run_cache.py
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models
+from app.database import get_db
+from app.routes import metrics as metrics_routes
+from app.routes import runs as runs_routes
+from app.utils import run_cache as run_cache_module
+from app.utils.ingest import RunState
+from app.utils.run_cache import MISS, RunStateCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(run_cache_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """resolve'un attığı load_run_states çağrıları (her biri tek sorgu)."""
+    calls = []
+    original = run_cache_module.load_run_states
+
+    def counting(db, run_ids):
+        calls.append(sorted(run_ids))
+        return original(db, run_ids)
+
+    monkeypatch.setattr(run_cache_module, "load_run_states", counting)
+    return calls
+
+
+def test_resolve_loads_unknown_runs_once(db, make_run, queries):
+    cache = RunStateCache()
+    run = make_run()
+
+    assert cache.resolve(db, [run.id, run.id]) == {run.id: RunState(True, run.started_at)}
+    assert cache.resolve(db, [run.id]) == {run.id: RunState(True, run.started_at)}
+
+    assert queries == [[run.id]]
+    assert cache.stats()["hits"] == 1
+
+
+def test_resolve_batches_only_cache_misses(db, make_run, queries):
+    cache = RunStateCache()
+    a, b = make_run(), make_run(ended=True)
+    cache.resolve(db, [a.id])
+
+    states = cache.resolve(db, [a.id, b.id])
+
+    assert states[a.id].is_open and not states[b.id].is_open
+    assert queries == [[a.id], [b.id]]
+
+
+def test_missing_run_is_cached_with_short_ttl(db, clock, queries):
+    cache = RunStateCache(ttl_s=30, missing_ttl_s=5)
+
+    assert cache.resolve(db, [999]) == {}
+    assert cache.get(999) is None          # DB'de yok bilgisi cache'te
+    assert cache.resolve(db, [999]) == {}
+    assert len(queries) == 1
+
+    clock.now += 5
+    assert cache.get(999) is MISS
+    cache.resolve(db, [999])
+    assert len(queries) == 2
+
+
+def test_entries_expire_after_ttl(db, make_run, clock, queries):
+    cache = RunStateCache(ttl_s=30)
+    run = make_run()
+    cache.resolve(db, [run.id])
+
+    clock.now += 29.9
+    cache.resolve(db, [run.id])
+    assert len(queries) == 1
+
+    clock.now += 0.1
+    assert cache.get(run.id) is MISS
+    cache.resolve(db, [run.id])
+    assert len(queries) == 2
+
+
+def test_mark_ended_is_seen_without_a_query(db, make_run, queries):
+    cache = RunStateCache()
+    run = make_run()
+    cache.resolve(db, [run.id])
+
+    cache.mark_ended(run.id, run.started_at)
+
+    assert cache.resolve(db, [run.id]) == {run.id: RunState(False, run.started_at)}
+    assert len(queries) == 1
+
+
+def test_mark_open_caches_new_run():
+    cache = RunStateCache()
+    started = datetime(2026, 1, 1)
+
+    cache.mark_open(7, started)
+
+    assert cache.get(7) == RunState(True, started)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RunStateCache(max_size=2)
+    cache.mark_open(1, None)
+    cache.mark_open(2, None)
+    cache.get(1)
+
+    cache.mark_open(3, None)
+
+    assert cache.get(2) is MISS
+    assert cache.get(1) is not MISS and cache.get(3) is not MISS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_forces_reload(db, make_run, queries):
+    cache = RunStateCache()
+    run = make_run()
+    cache.resolve(db, [run.id])
+
+    cache.invalidate(run.id)
+    cache.resolve(db, [run.id])
+
+    assert len(queries) == 2
+
+
+# ============================
+# Route'lar: create_run / stop_run paylaşılan cache'i günceller
+# ============================
+@pytest.fixture
+def api(db, monkeypatch):
+    """runs + metrics router'ları test veritabanıyla; paylaşılan cache yerine taze bir cache."""
+    cache = RunStateCache()
+    monkeypatch.setattr(runs_routes, "run_cache", cache)
+    monkeypatch.setattr(metrics_routes, "run_cache", cache)
+
+    db.add(models.User(name="u", api_key_hash="x"))
+    db.add(models.Device(gpu_name="gpu"))
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(runs_routes.router)
+    app.include_router(metrics_routes.router)
+    app.dependency_overrides[get_db] = lambda: db
+
+    # runs tablosunu okuyan SELECT'ler
+    run_selects = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM runs" in statement:
+            run_selects.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app) as client:
+            yield client, cache, run_selects
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _metric(run_id: int) -> dict:
+    return {"run_id": run_id, "cpu_util": 10.0, "gpu_util": 50.0, "gpu_power_w": 200.0, "mem_used_mb": 1024.0}
+
+
+def test_create_run_marks_run_open_for_ingest(api, queries):
+    client, cache, run_selects = api
+    run_id = client.post("/runs/", json={"model_name": "m"}).json()["id"]
+    assert cache.get(run_id).is_open
+
+    run_selects.clear()
+    res = client.post("/metrics/", json=_metric(run_id))
+
+    assert res.status_code == 201
+    assert run_selects == [] and queries == []
+
+
+def test_stop_run_rejects_later_samples_from_cache(api, queries):
+    client, cache, run_selects = api
+    run_id = client.post("/runs/", json={"model_name": "m"}).json()["id"]
+    assert client.post(f"/runs/{run_id}/stop").status_code == 200
+    assert not cache.get(run_id).is_open
+
+    run_selects.clear()
+    res = client.post("/metrics/", json=_metric(run_id))
+
+    assert res.status_code == 409
+    assert run_selects == [] and queries == []
@@ -0,0 +1,103 @@
+# tests/test_spool_replay.py
+"""
+İstemci spool'unun yeniden gönderimi (client/reporter.py): yarıda kesilen
+gönderim kabul edilmiş örnekleri tekrar göndermemeli, kalıcı ret sadece
+ilgili segmenti etkilemeli.
+"""
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client"))
+
+from reporter import MetricReporter  # noqa: E402
+
+
+class FakeServer:
+    """_post_batch yerine: paketleri kaydeder; fail_on / refuse_on çağrılarında hata / ret."""
+
+    def __init__(self, fail_on=(), refuse_on=()):
+        self.calls = 0
+        self.stored = []
+        self.fail_on = set(fail_on)
+        self.refuse_on = set(refuse_on)
+
+    def __call__(self, batch, run_id=None):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise requests.ConnectionError("bağlantı koptu")
+        if self.calls in self.refuse_on:
+            return False
+        self.stored.extend(s["ts"] for s in batch)
+        return True
+
+
+def _samples(start, n):
+    return [{"ts": float(i), "run_id": 1, "cpu_util": 1.0} for i in range(start, start + n)]
+
+
+@pytest.fixture
+def reporter(tmp_path):
+    rep = MetricReporter(
+        "http://api.invalid", 1, {}, sample_fn=dict,
+        spool_dir=str(tmp_path), replay_max_rows=10,
+    )
+    yield rep
+    rep.spool.close()
+    rep.session.close()
+
+
+def _write_segments(spool, sizes):
+    start = 0
+    for n in sizes:
+        spool.append(_samples(start, n))
+        spool.seal()
+        start += n
+    return start
+
+
+def test_failure_mid_segment_resumes_without_duplicates(reporter):
+    total = _write_segments(reporter.spool, [35])
+    server = FakeServer(fail_on={3})
+    reporter._post_batch = server
+
+    with pytest.raises(requests.ConnectionError):
+        reporter._replay_spool(reporter.spool, 1)
+    assert reporter.spool.segments()   # segment diskte kaldı
+
+    reporter._replay_spool(reporter.spool, 1)
+    assert server.stored == [float(i) for i in range(total)]
+    assert reporter.spool.segments() == []
+    assert reporter.sent == total and reporter.dropped == 0
+
+
+def test_failure_mid_replay_acks_shipped_segments(reporter):
+    total = _write_segments(reporter.spool, [6, 6, 6, 6])   # 6 + 6 > 10: her segment ayrı pakette
+    server = FakeServer(fail_on={2})
+    reporter._post_batch = server
+
+    with pytest.raises(requests.ConnectionError):
+        reporter._replay_spool(reporter.spool, 1)
+    assert len(reporter.spool.segments()) == 3   # ilk paket kabul edildi, silindi
+
+    reporter._replay_spool(reporter.spool, 1)
+    assert server.stored == [float(i) for i in range(total)]
+    assert reporter.spool.segments() == []
+
+
+def test_refused_chunk_rejects_only_its_segment(reporter):
+    _write_segments(reporter.spool, [8, 25])
+    # 1: ilk segment, 2: ikinci segmentin ilk parçası, 3: ret
+    server = FakeServer(refuse_on={3})
+    reporter._post_batch = server
+
+    reporter._replay_spool(reporter.spool, 1)
+
+    rejected = reporter.spool.rejected()
+    assert len(rejected) == 1
+    assert reporter.spool.progress(rejected[0]) == 10
+    assert reporter.spool.segments() == []
+    assert reporter.sent == 8 + 10
+    assert reporter.dropped == 15